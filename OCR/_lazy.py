@@ -0,0 +1,47 @@
+"""Deferred imports so heavy dependencies load on first use, not at import."""
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported the first time an attribute is used.
+
+    Lets `cv2 = lazy_import('cv2')` replace `import cv2` at the top of a
+    module without changing any of the code that uses it.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    Return a lazily imported module.
+
+    Args:
+        name: Fully qualified module name (e.g. 'cv2', 'numpy')
+
+    Returns:
+        LazyModule: Proxy that imports the module on first attribute access
+    """
+    return LazyModule(name)
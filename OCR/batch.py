@@ -0,0 +1,570 @@
+"""Resumable, checkpointed batch OCR jobs backed by a sqlite manifest."""
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import sqlite3
+import subprocess
+import time
+
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+# Taken from the queue by a distributed worker but not started yet (see distributed.py)
+CLAIMED = 'claimed'
+
+# Extensions of the layout files process_file can write next to the .txt/.json
+FORMAT_EXTENSIONS = {'hocr': '.hocr', 'alto': '.alto.xml', 'pdf': '.pdf'}
+
+# Rollback journal, not WAL: WAL needs shared memory between the processes
+# using the file, which breaks on the network filesystems a manifest shared
+# with distributed.py workers lives on. Every opener sets the same mode.
+JOURNAL_MODE = 'DELETE'
+
+FILES_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS files ('
+    ' path TEXT PRIMARY KEY,'
+    ' status TEXT NOT NULL,'
+    ' attempts INTEGER NOT NULL DEFAULT 0,'
+    ' error TEXT,'
+    ' elapsed REAL,'
+    ' updated REAL)'
+)
+
+
+def _process_context():
+    """Multiprocessing context whose workers don't inherit OpenCV's thread pool."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def output_paths(output_dir, path):
+    """
+    Return the (.txt, .json) output paths for an input file.
+
+    Names are <stem>-<hash>, the hash taken over the absolute input path,
+    so 'a/scan.png', 'b/scan.png' and 'a/scan.jpg' get separate outputs.
+    """
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:10]
+    stem = f'{os.path.splitext(os.path.basename(path))[0]}-{digest}'
+    return os.path.join(output_dir, stem + '.txt'), os.path.join(output_dir, stem + '.json')
+
+
+def _write_atomic(path, data):
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def process_file(path, output_dir, method='none', lang='eng', tables=False, index=None,
+                 auto_orient=False, output_format=None):
+    """
+    Preprocess and OCR one file and write its outputs atomically.
+
+    Re-running on the same file overwrites the outputs with identical
+    content, so a retried or resumed item never leaves partial files.
+
+    Args:
+        path: Input image path
+        output_dir: Directory for the .txt and .json outputs (see output_paths)
+        method: 'none', 'adaptive', 'otsu', 'sauvola', 'fixed' or 'optimal'
+        lang: Language code (default 'eng' for English)
+        tables: Table mode: read ruled tables (table_extractor) instead of
+                the page text, writing one <stem>_table<n>.csv per table
+        index: Optional page_cache.PerceptualHashIndex; a page matching one
+               already in it reuses that page's result instead of OCR
+        auto_orient: Rotate sideways/upside-down pages upright first (an extra OSD pass)
+        output_format: Also write the page as 'hocr', 'alto' or 'pdf'
+                       (output_writers) to <stem> plus its FORMAT_EXTENSIONS
+                       entry; not available in table mode
+
+    Returns:
+        dict: Summary with word count and average confidence (table and
+              cell counts in table mode, plus 'reused' with an index)
+    """
+    from PIL import Image
+    from .image_preprocessor import correct_orientation
+    from .text_extractor import extract_text_with_confidence
+    from .ensemble import PREPROCESSING_VARIANTS
+
+    if tables and output_format:
+        raise ValueError("Table mode has no word boxes to write as hOCR, ALTO or PDF")
+    if tables:
+        from .table_extractor import extract_tables
+
+        def recognize(page):
+            # Ruling detection binarizes on its own; the page is not preprocessed
+            return {'tables': extract_tables(page, lang=lang, max_workers=1)}
+    else:
+        def recognize(page):
+            if method != 'none':
+                page = PREPROCESSING_VARIANTS[method](page)
+            return extract_text_with_confidence(page, lang=lang, auto_orient=False)
+
+    img = Image.open(path).convert('RGB')
+    if auto_orient:
+        img = correct_orientation(img)
+    if index is not None:
+        result, reused = index.get_or_compute(img, recognize)
+    else:
+        result, reused = recognize(img), False
+
+    text_path, json_path = output_paths(output_dir, path)
+    if tables:
+        from .table_extractor import table_to_csv
+
+        found = result['tables']
+        csvs = [table_to_csv(table) for table in found]
+        for number, table_csv in enumerate(csvs, 1):
+            _write_atomic(f'{text_path[:-4]}_table{number}.csv', table_csv)
+        _write_atomic(text_path, '\n'.join(csvs))
+        _write_atomic(json_path, json.dumps(result))
+        summary = {'tables': len(found), 'cells': sum(len(table['cells']) for table in found)}
+    else:
+        _write_atomic(text_path, result['text'])
+        _write_atomic(json_path, json.dumps(result))
+        if output_format:
+            _write_layout(f'{text_path[:-4]}{FORMAT_EXTENSIONS[output_format]}',
+                          output_format, result, img, os.path.basename(path))
+        summary = {'words': len(result['words_with_confidence']),
+                   'average_confidence': result['average_confidence']}
+    if index is not None:
+        summary['reused'] = reused
+    return summary
+
+
+def _write_layout(target, output_format, result, img, image_name):
+    """Write one page as hOCR, ALTO or a searchable PDF, replacing target atomically."""
+    from .output_writers import open_writer
+
+    tmp_path = f'{target}.tmp{os.getpid()}'
+    with open_writer(output_format, tmp_path) as writer:
+        # The PDF writer embeds the image; the XML writers only record its name
+        writer.add_result(result, image=img if output_format == 'pdf' else image_name)
+    os.replace(tmp_path, target)
+
+
+def _copy_outputs(output_dir, source, path):
+    """
+    Give path the outputs already written for source (a duplicate page).
+
+    Returns:
+        bool: False if source has no outputs to copy
+    """
+    source_text, _ = output_paths(output_dir, source)
+    if not os.path.exists(source_text):
+        return False
+    source_stem, stem = source_text[:-4], output_paths(output_dir, path)[0][:-4]
+    for name in glob.glob(glob.escape(source_stem) + '[._]*'):
+        target = stem + name[len(source_stem):]
+        shutil.copyfile(name, f'{target}.tmp{os.getpid()}')
+        os.replace(f'{target}.tmp{os.getpid()}', target)
+    return True
+
+
+def _append_result(store, output_dir, path):
+    """Append a finished file's result, read back from its outputs, to a ResultStore once."""
+    if path in store:
+        return
+    text_path, json_path = output_paths(output_dir, path)
+    with open(json_path, encoding='utf-8') as f:
+        result = json.load(f)
+    if 'words_with_confidence' not in result:
+        # Table mode: the store keeps the tables' CSV text
+        with open(text_path, encoding='utf-8') as f:
+            result = f.read()
+    store.append(path, result)
+
+
+def _serve(conn, output_dir, options):
+    """Long-lived worker loop: process each path received on conn until None or EOF."""
+    # Own process group, so a timeout kill also takes down the tesseract
+    # child; there are no process groups on Windows (see _kill_tree)
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    from .image_preprocessor import configure_worker
+    configure_worker(num_threads=1)
+    try:
+        while True:
+            try:
+                path = conn.recv()
+            except EOFError:
+                break
+            if path is None:
+                break
+            try:
+                conn.send(('ok', process_file(path, output_dir, **options)))
+            except Exception as e:
+                conn.send(('error', f'{type(e).__name__}: {e}'))
+    finally:
+        conn.close()
+
+
+def _kill_tree(process):
+    """Kill a worker process together with any Tesseract subprocess it started."""
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+    else:
+        # taskkill /T walks the child tree, which is how the tesseract.exe
+        # started by pytesseract goes down with the worker
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        process.kill()
+    process.join()
+
+
+class _WorkerProcess:
+    """
+    One long-lived worker process, fed a file at a time over a pipe.
+
+    Workers import OpenCV, numpy and pytesseract once and then serve files
+    until stopped; only a worker that times out or dies is replaced.
+    """
+
+    def __init__(self, context, output_dir, options):
+        self._context = context
+        self._args = (output_dir, options)
+        self.path = None
+        self.started = None
+        self._spawn()
+
+    def _spawn(self):
+        self._conn, child = self._context.Pipe()
+        self.process = self._context.Process(target=_serve, args=(child,) + self._args)
+        self.process.start()
+        child.close()
+
+    def submit(self, path):
+        """Start work on path."""
+        self.path = path
+        self.started = time.perf_counter()
+        self._conn.send(path)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def result(self, timeout=0):
+        """
+        Return (outcome, payload) once the current file finishes, else None.
+
+        A worker that exits mid-file is reported as an error and replaced.
+        """
+        if not self._conn.poll(timeout):
+            return None
+        try:
+            outcome = self._conn.recv()
+        except EOFError:
+            self.process.join()
+            outcome = ('error', f'Worker died (exit code {self.process.exitcode})')
+            self._spawn()
+        self.path = None
+        return outcome
+
+    def restart(self):
+        """Kill the worker, abandoning its current file, and start a fresh one."""
+        self.kill()
+        self._spawn()
+
+    def kill(self):
+        self._conn.close()
+        _kill_tree(self.process)
+        self.path = None
+
+    def stop(self, timeout=5.0):
+        """Ask an idle worker to exit, killing it if it does not."""
+        try:
+            self._conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            _kill_tree(self.process)
+        self._conn.close()
+
+
+class BatchJob:
+    """
+    Batch OCR over many files that survives crashes and restarts.
+
+    Every file's status lives in a sqlite manifest. On restart, completed
+    files are skipped, files left 'running' by a crash are retried, and
+    failures are retried up to max_attempts. Files are fed to a pool of
+    long-lived worker processes with a per-file timeout; a stuck worker
+    (and its Tesseract subprocess) is killed and replaced, and the file
+    counted as failed.
+
+    With an index, each file is hashed before it is queued; a file whose
+    page matches one the job already finished gets a copy of that file's
+    outputs instead of an OCR run. With a store, every finished file's
+    result is also appended to a result_store.ResultStore; the job process
+    is the store's only writer.
+    """
+
+    def __init__(self, manifest_path, output_dir, method='none', lang='eng',
+                 workers=None, timeout=120.0, max_attempts=3, tables=False, index=None, store=None,
+                 auto_orient=False, output_format=None):
+        """
+        Args:
+            manifest_path: sqlite file recording per-file status
+            output_dir: Directory for the per-file .txt/.json outputs
+            method: Preprocessing method (see process_file)
+            lang: Language code (default 'eng' for English)
+            workers: Concurrent worker processes (default: CPU count)
+            timeout: Seconds allowed per file before its worker is killed
+            max_attempts: Attempts per file before it stays failed
+            tables: Table mode (see process_file)
+            index: Optional page_cache.PerceptualHashIndex of finished
+                   pages; its results are input paths, so save it and
+                   pass it again to keep reusing pages across runs
+            store: Optional result_store.ResultStore receiving each
+                   finished file's result under its absolute input path
+            auto_orient: Rotate pages upright first (see process_file)
+            output_format: Extra 'hocr', 'alto' or 'pdf' output per file (see process_file)
+        """
+        self.manifest_path = manifest_path
+        self.output_dir = output_dir
+        self.method = method
+        self.lang = lang
+        self.tables = tables
+        self.auto_orient = auto_orient
+        self.output_format = output_format
+        self.index = index
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._db = sqlite3.connect(manifest_path)
+        self._db.execute(f'PRAGMA journal_mode={JOURNAL_MODE}')
+        self._db.execute(FILES_SCHEMA)
+        self._db.commit()
+
+    def add(self, paths):
+        """Register input files; files already in the manifest keep their status."""
+        now = time.time()
+        self._db.executemany('INSERT OR IGNORE INTO files (path, status, updated) VALUES (?, ?, ?)',
+                             [(os.path.abspath(p), PENDING, now) for p in paths])
+        self._db.commit()
+
+    def _set(self, path, status, error=None, elapsed=None, attempt=False):
+        self._db.execute(
+            'UPDATE files SET status = ?, error = ?, elapsed = ?, updated = ?,'
+            ' attempts = attempts + ? WHERE path = ?',
+            (status, error, elapsed, time.time(), 1 if attempt else 0, path)
+        )
+        self._db.commit()
+
+    def counts(self):
+        """Return the number of files per status."""
+        rows = self._db.execute('SELECT status, COUNT(*) FROM files GROUP BY status').fetchall()
+        counts = {PENDING: 0, CLAIMED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def failures(self):
+        """Return (path, attempts, error) for files that failed."""
+        return self._db.execute('SELECT path, attempts, error FROM files WHERE status = ?',
+                                (FAILED,)).fetchall()
+
+    def _todo(self):
+        rows = self._db.execute(
+            'SELECT path FROM files WHERE status = ? OR (status = ? AND attempts < ?) ORDER BY path',
+            (PENDING, FAILED, self.max_attempts)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def run(self, on_progress=None, poll_interval=0.05):
+        """
+        Process every pending file, resuming from the manifest.
+
+        Args:
+            on_progress: Optional callback receiving a stats dict (done,
+                         failed, remaining, pages_per_second, eta_seconds)
+                         after each file finishes
+            poll_interval: Seconds between checks on running workers
+
+        Returns:
+            dict: Final status counts plus throughput
+        """
+        # Anything still 'running' (or claimed) was interrupted by a crash or restart
+        self._db.execute('UPDATE files SET status = ? WHERE status IN (?, ?)', (PENDING, RUNNING, CLAIMED))
+        self._db.commit()
+
+        todo = self._todo()
+        context = _process_context()
+        options = {'method': self.method, 'lang': self.lang, 'tables': self.tables,
+                   'auto_orient': self.auto_orient, 'output_format': self.output_format}
+        pool = []
+        keys = {}
+        finished = 0
+        start = time.perf_counter()
+
+        def busy():
+            return sum(1 for worker in pool if worker.path is not None)
+
+        def finish(path, status, error, elapsed):
+            nonlocal finished
+            key = keys.pop(path, None)
+            if status == FAILED:
+                attempts = self._db.execute('SELECT attempts FROM files WHERE path = ?', (path,)).fetchone()[0]
+                if attempts < self.max_attempts:
+                    # Retry after the rest of the queue, keeping the last error
+                    self._set(path, PENDING, error=error, elapsed=elapsed)
+                    todo.append(path)
+                    return
+            else:
+                if key is not None:
+                    self.index.add(result=path, **key)
+                if self.store is not None:
+                    _append_result(self.store, self.output_dir, path)
+            self._set(path, status, error=error, elapsed=elapsed)
+            finished += 1
+            if on_progress:
+                on_progress(self._stats(finished, len(todo) + busy(), start))
+
+        def next_path():
+            """Pop the next file that needs OCR, finishing duplicates on the way."""
+            while todo:
+                path = todo.pop(0)
+                self._set(path, RUNNING, attempt=True)
+                if self.index is None:
+                    return path
+                started = time.perf_counter()
+                try:
+                    key = self.index.page_key(path)
+                except ValueError:
+                    # Unreadable here; the worker reports the real error
+                    return path
+                source, _ = self.index.lookup(**key)
+                if source is not None and _copy_outputs(self.output_dir, source, path):
+                    finish(path, DONE, None, time.perf_counter() - started)
+                    continue
+                keys[path] = key
+                return path
+            return None
+
+        try:
+            while todo or busy():
+                for worker in pool:
+                    if worker.path is None:
+                        path = next_path()
+                        if path is not None:
+                            worker.submit(path)
+                while len(pool) < self.workers:
+                    path = next_path()
+                    if path is None:
+                        break
+                    worker = _WorkerProcess(context, self.output_dir, options)
+                    pool.append(worker)
+                    worker.submit(path)
+
+                time.sleep(poll_interval)
+                for worker in pool:
+                    if worker.path is None:
+                        continue
+                    path, elapsed = worker.path, worker.elapsed()
+                    outcome = worker.result()
+                    if outcome is not None:
+                        status, payload = outcome
+                        finish(path, DONE if status == 'ok' else FAILED,
+                               None if status == 'ok' else payload, elapsed)
+                    elif elapsed > self.timeout:
+                        worker.restart()
+                        finish(path, FAILED, f'Timed out after {self.timeout}s', elapsed)
+        finally:
+            for worker in pool:
+                if worker.path is not None:
+                    self._set(worker.path, PENDING)
+                    worker.kill()
+                else:
+                    worker.stop()
+
+        return self._stats(finished, 0, start)
+
+    def _stats(self, finished, remaining, start):
+        elapsed = time.perf_counter() - start
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        counts = self.counts()
+        return {
+            'done': counts[DONE],
+            'failed': counts[FAILED],
+            'remaining': remaining,
+            'pages_per_second': rate,
+            'eta_seconds': remaining / rate if rate > 0 else None
+        }
+
+    def close(self):
+        """Close the manifest."""
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main(argv=None):
+    """Run a resumable batch: python -m OCR.batch MANIFEST OUTPUT_DIR IMAGES..."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resumable batch OCR")
+    parser.add_argument('manifest', help="sqlite manifest path (reuse it to resume)")
+    parser.add_argument('output_dir', help="Directory for .txt/.json outputs")
+    parser.add_argument('images', nargs='*', help="Input images to add to the job")
+    parser.add_argument('--method', default='none', choices=['none', 'adaptive', 'otsu', 'sauvola', 'fixed', 'optimal'])
+    parser.add_argument('--lang', default='eng')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=120.0, help="Seconds per file")
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--tables', action='store_true', help="Table mode: write ruled tables as CSV")
+    parser.add_argument('--auto-orient', action='store_true', help="Rotate sideways/upside-down pages upright")
+    parser.add_argument('--dedupe', metavar='INDEX',
+                        help="Perceptual-hash index (.npz, created if missing): near-duplicate pages "
+                             "reuse an earlier page's outputs")
+    parser.add_argument('--store', metavar='DIR', help="Also append every result to this result store")
+    parser.add_argument('--format', dest='output_format', choices=sorted(FORMAT_EXTENSIONS),
+                        help="Also write each page as hOCR, ALTO XML or a searchable PDF")
+    args = parser.parse_args(argv)
+    if args.tables and args.output_format:
+        parser.error("--format is not available with --tables")
+
+    index = None
+    if args.dedupe:
+        from .page_cache import PerceptualHashIndex
+        index = PerceptualHashIndex.load(args.dedupe) if os.path.exists(args.dedupe) else PerceptualHashIndex()
+    store = None
+    if args.store:
+        from .result_store import ResultStore
+        store = ResultStore(args.store)
+
+    def report(stats):
+        eta = f"{stats['eta_seconds']:.0f}s" if stats['eta_seconds'] is not None else '?'
+        print(f"done {stats['done']}  failed {stats['failed']}  remaining {stats['remaining']}  "
+              f"{stats['pages_per_second']:.2f} pages/s  ETA {eta}", flush=True)
+
+    with BatchJob(args.manifest, args.output_dir, method=args.method, lang=args.lang,
+                  workers=args.workers, timeout=args.timeout, max_attempts=args.max_attempts,
+                  tables=args.tables, index=index, store=store, auto_orient=args.auto_orient,
+                  output_format=args.output_format) as job:
+        job.add(args.images)
+        try:
+            report(job.run(on_progress=report))
+        finally:
+            if index is not None:
+                index.save(args.dedupe)
+            if store is not None:
+                store.close()
+        for path, attempts, error in job.failures():
+            print(f"FAILED ({attempts} attempts) {path}: {error}")
+
+
+if __name__ == "__main__":
+    main()
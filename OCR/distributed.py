@@ -0,0 +1,579 @@
+"""Multi-node batch OCR: workers pull tasks from a shared sqlite queue."""
+from contextlib import contextmanager
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from .batch import (PENDING, CLAIMED, RUNNING, DONE, FAILED, FILES_SCHEMA, JOURNAL_MODE,
+                    _WorkerProcess, _append_result, _process_context)
+
+
+DEFAULT_SETTINGS = {
+    'output_dir': None,
+    'method': 'none',
+    'lang': 'eng',
+    'timeout': 120.0,
+    'max_attempts': 3,
+    'lease': 30.0,
+    'tables': False,
+    'auto_orient': False
+}
+
+
+def open_queue(manifest_path, busy_timeout=60.0):
+    """
+    Open (creating if needed) the shared task queue.
+
+    The queue is a batch.py manifest with a few extra columns plus a
+    workers table, so BatchJob can resume a job that was started here and
+    vice versa. Both use the same rollback journal (batch.JOURNAL_MODE);
+    put the file on a filesystem with working POSIX locks for
+    multi-machine runs.
+
+    Args:
+        manifest_path: sqlite file shared by the coordinator and all workers
+        busy_timeout: Seconds to wait for another node's write lock
+
+    Returns:
+        sqlite3.Connection: Autocommit connection (see _transaction)
+    """
+    db = sqlite3.connect(manifest_path, timeout=busy_timeout, isolation_level=None)
+    db.execute(f'PRAGMA journal_mode={JOURNAL_MODE}')
+    # Workers often start together; migrate under the write lock so only
+    # one of them adds the columns
+    with _transaction(db):
+        db.execute(FILES_SCHEMA)
+        columns = {row[1] for row in db.execute('PRAGMA table_info(files)')}
+        for column, kind in (('owner', 'TEXT'), ('result', 'TEXT'), ('stored', 'INTEGER NOT NULL DEFAULT 0')):
+            if column not in columns:
+                db.execute(f'ALTER TABLE files ADD COLUMN {column} {kind}')
+        db.execute('CREATE INDEX IF NOT EXISTS files_status ON files (status, owner)')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS workers ('
+            ' id TEXT PRIMARY KEY,'
+            ' host TEXT,'
+            ' pid INTEGER,'
+            ' started REAL,'
+            ' heartbeat REAL,'
+            ' current TEXT,'
+            ' done INTEGER NOT NULL DEFAULT 0,'
+            ' failed INTEGER NOT NULL DEFAULT 0)'
+        )
+        db.execute('CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)')
+    return db
+
+
+@contextmanager
+def _transaction(db):
+    """Hold the database write lock for a read-modify-write step."""
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+    db.execute('COMMIT')
+
+
+def read_settings(db):
+    """Return the job settings stored by the coordinator."""
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update({key: json.loads(value) for key, value in db.execute('SELECT key, value FROM settings')})
+    return settings
+
+
+def requeue_dead(db, lease, max_attempts):
+    """
+    Put the tasks of workers whose heartbeat is older than lease back in the queue.
+
+    Claimed tasks return to 'pending' unchanged. A task that was running
+    counts as a failed attempt, so a page that crashes every worker that
+    takes it ends up 'failed' after max_attempts instead of cycling forever.
+
+    Returns:
+        int: Number of tasks re-queued or failed
+    """
+    with _transaction(db):
+        now = time.time()
+        dead = [row[0] for row in db.execute('SELECT id FROM workers WHERE heartbeat < ?', (now - lease,))]
+        # Tasks owned by a worker that has no row at all (e.g. deleted by hand) are orphans too
+        orphans = db.execute(
+            'SELECT path, status, attempts, owner FROM files WHERE status IN (?, ?)'
+            ' AND (owner IS NULL OR owner NOT IN (SELECT id FROM workers WHERE heartbeat >= ?))',
+            (CLAIMED, RUNNING, now - lease)
+        ).fetchall()
+        for path, status, attempts, owner in orphans:
+            if status == RUNNING:
+                error = f'Worker {owner} stopped sending heartbeats'
+                new_status = FAILED if attempts >= max_attempts else PENDING
+            else:
+                error, new_status = None, PENDING
+            db.execute('UPDATE files SET status = ?, owner = NULL, error = COALESCE(?, error), updated = ?'
+                       ' WHERE path = ?', (new_status, error, now, path))
+        db.executemany('DELETE FROM workers WHERE id = ?', [(worker_id,) for worker_id in dead])
+    return len(orphans)
+
+
+def queue_counts(db):
+    """Return the number of tasks per status."""
+    counts = {PENDING: 0, CLAIMED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+    counts.update(dict(db.execute('SELECT status, COUNT(*) FROM files GROUP BY status').fetchall()))
+    return counts
+
+
+class Coordinator:
+    """
+    Owns a distributed batch job: its inputs, settings and progress.
+
+    The coordinator never talks to workers directly. It writes the task
+    list and job settings into the shared queue, then watches progress and
+    re-queues the tasks of workers whose heartbeats stop. Workers can join
+    or leave at any time, from any machine that can reach the queue file,
+    the inputs and the output directory under the same paths.
+
+    A result store has a single writer, so with a store the coordinator
+    appends each finished file's result while it waits, reading it back
+    from the shared output directory.
+    """
+
+    def __init__(self, manifest_path, output_dir, method='none', lang='eng',
+                 timeout=120.0, max_attempts=3, lease=30.0, tables=False, store=None,
+                 auto_orient=False):
+        """
+        Args:
+            manifest_path: Shared sqlite queue
+            output_dir: Shared directory for the per-file .txt/.json outputs
+            method: Preprocessing method (see batch.process_file)
+            lang: Language code (default 'eng' for English)
+            timeout: Seconds a worker allows per file before killing it
+            max_attempts: Attempts per file before it stays failed
+            lease: Seconds without a heartbeat after which a worker counts as dead
+            tables: Table mode (see batch.process_file)
+            store: Optional result_store.ResultStore receiving each
+                   finished file's result under its absolute input path
+            auto_orient: Rotate pages upright first (see batch.process_file)
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = os.path.abspath(output_dir)
+        self.store = store
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._db = open_queue(manifest_path)
+        settings = {
+            'output_dir': self.output_dir,
+            'method': method,
+            'lang': lang,
+            'timeout': timeout,
+            'max_attempts': max_attempts,
+            'lease': lease,
+            'tables': tables,
+            'auto_orient': auto_orient
+        }
+        with _transaction(self._db):
+            self._db.executemany('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
+                                 [(key, json.dumps(value)) for key, value in settings.items()])
+
+    def add(self, paths):
+        """Queue input files; files already in the queue keep their status."""
+        now = time.time()
+        with _transaction(self._db):
+            self._db.executemany('INSERT OR IGNORE INTO files (path, status, updated) VALUES (?, ?, ?)',
+                                 [(os.path.abspath(p), PENDING, now) for p in paths])
+
+    def retry_failed(self):
+        """Queue failed files again with a fresh attempt budget."""
+        with _transaction(self._db):
+            self._db.execute('UPDATE files SET status = ?, attempts = 0 WHERE status = ?', (PENDING, FAILED))
+
+    def counts(self):
+        """Return the number of tasks per status."""
+        return queue_counts(self._db)
+
+    def workers(self):
+        """Return live workers as dicts (id, host, pid, heartbeat age, current file, done, failed)."""
+        now = time.time()
+        rows = self._db.execute('SELECT id, host, pid, heartbeat, current, done, failed FROM workers'
+                                ' ORDER BY id').fetchall()
+        return [{'id': worker_id, 'host': host, 'pid': pid, 'heartbeat_age': now - heartbeat,
+                 'current': current, 'done': done, 'failed': failed}
+                for worker_id, host, pid, heartbeat, current, done, failed in rows]
+
+    def failures(self):
+        """Return (path, attempts, error) for files that failed."""
+        return self._db.execute('SELECT path, attempts, error FROM files WHERE status = ?',
+                                (FAILED,)).fetchall()
+
+    def collect(self):
+        """
+        Append files finished since the last call to the result store.
+
+        Returns:
+            int: Number of results appended
+        """
+        paths = [row[0] for row in self._db.execute('SELECT path FROM files WHERE status = ? AND stored = 0',
+                                                    (DONE,))]
+        for path in paths:
+            _append_result(self.store, self.output_dir, path)
+            self._db.execute('UPDATE files SET stored = 1 WHERE path = ?', (path,))
+        return len(paths)
+
+    def wait(self, on_progress=None, poll_interval=2.0):
+        """
+        Block until no task is pending, claimed or running.
+
+        Args:
+            on_progress: Optional callback receiving a stats dict (counts,
+                         workers, pages_per_second, eta_seconds) each poll
+            poll_interval: Seconds between checks
+
+        Returns:
+            dict: Final stats
+        """
+        start = time.perf_counter()
+        baseline = self.counts()
+        baseline = baseline[DONE] + baseline[FAILED]
+        while True:
+            requeue_dead(self._db, self.lease, self.max_attempts)
+            if self.store is not None:
+                self.collect()
+            counts = self.counts()
+            elapsed = time.perf_counter() - start
+            finished = counts[DONE] + counts[FAILED] - baseline
+            remaining = counts[PENDING] + counts[CLAIMED] + counts[RUNNING]
+            rate = finished / elapsed if elapsed > 0 else 0.0
+            stats = {
+                'counts': counts,
+                'workers': len(self.workers()),
+                'remaining': remaining,
+                'pages_per_second': rate,
+                'eta_seconds': remaining / rate if rate > 0 else None
+            }
+            if on_progress:
+                on_progress(stats)
+            if not remaining:
+                return stats
+            time.sleep(poll_interval)
+
+    def close(self):
+        """Close the queue."""
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class Worker:
+    """
+    Pulls tasks from the shared queue and runs preprocessing + OCR on them.
+
+    A worker claims up to prefetch pending files at a time, so it goes to
+    the queue once per few pages instead of once per page, and runs the
+    files in a long-lived child process with the job's timeout (as
+    BatchJob does), replacing the child only when it hangs or dies.
+    A background thread writes a heartbeat every heartbeat seconds; when
+    it stops for longer than the lease, the coordinator or any idle worker
+    re-queues this worker's files. When the queue runs dry, an idle worker
+    steals half of the claimed-but-unstarted files of the most loaded
+    worker, so prefetching never leaves a slow node holding the tail of
+    the job. Results are written to the shared output directory and the
+    per-file summary goes back into the queue.
+    """
+
+    def __init__(self, manifest_path, worker_id=None, output_dir=None, prefetch=2,
+                 heartbeat=5.0, poll_interval=1.0):
+        """
+        Args:
+            manifest_path: Shared sqlite queue
+            worker_id: Unique name (default: host-pid-random)
+            output_dir: Override for the job's output directory, if it is
+                        mounted under a different path on this machine
+            prefetch: Files claimed per trip to the queue
+            heartbeat: Seconds between heartbeats
+            poll_interval: Seconds between checks on an empty queue or a running file
+        """
+        self.manifest_path = manifest_path
+        self.id = worker_id or f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        self.prefetch = max(prefetch, 1)
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self._db = open_queue(manifest_path)
+        self.settings = read_settings(self._db)
+        self.output_dir = output_dir or self.settings['output_dir']
+        if not self.output_dir:
+            raise ValueError("The queue has no output directory; start a coordinator first")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._current = None
+        self._child = None
+        self._stop = threading.Event()
+
+    def _beat(self):
+        # sqlite connections are per-thread, so the heartbeat thread opens its own
+        db = open_queue(self.manifest_path)
+        try:
+            while not self._stop.wait(self.heartbeat):
+                cursor = db.execute('UPDATE workers SET heartbeat = ?, current = ? WHERE id = ?',
+                                    (time.time(), self._current, self.id))
+                if cursor.rowcount == 0:
+                    # Declared dead after a long stall; our tasks were re-queued, so rejoin
+                    self._register(db)
+        finally:
+            db.close()
+
+    def _register(self, db):
+        now = time.time()
+        db.execute('INSERT OR REPLACE INTO workers (id, host, pid, started, heartbeat) VALUES (?, ?, ?, ?, ?)',
+                   (self.id, socket.gethostname(), os.getpid(), now, now))
+
+    def _next_task(self):
+        """Start this worker's next claimed file, claiming more when it has none."""
+        with _transaction(self._db):
+            row = self._db.execute('SELECT path FROM files WHERE status = ? AND owner = ? ORDER BY path LIMIT 1',
+                                   (CLAIMED, self.id)).fetchone()
+            if row is None:
+                paths = [r[0] for r in self._db.execute(
+                    'SELECT path FROM files WHERE status = ? ORDER BY path LIMIT ?', (PENDING, self.prefetch))]
+                if not paths:
+                    return None
+                self._db.executemany('UPDATE files SET status = ?, owner = ?, updated = ? WHERE path = ?',
+                                     [(CLAIMED, self.id, time.time(), path) for path in paths])
+                row = (paths[0],)
+            self._db.execute('UPDATE files SET status = ?, attempts = attempts + 1, updated = ? WHERE path = ?',
+                             (RUNNING, time.time(), row[0]))
+            return row[0]
+
+    def _steal(self):
+        """Take half of the unstarted claimed files of the most loaded other worker."""
+        with _transaction(self._db):
+            row = self._db.execute(
+                'SELECT owner, COUNT(*) AS n FROM files WHERE status = ? AND owner != ?'
+                ' GROUP BY owner ORDER BY n DESC LIMIT 1', (CLAIMED, self.id)
+            ).fetchone()
+            if row is None:
+                return 0
+            victim, count = row
+            paths = [r[0] for r in self._db.execute(
+                'SELECT path FROM files WHERE status = ? AND owner = ? ORDER BY path DESC LIMIT ?',
+                (CLAIMED, victim, (count + 1) // 2))]
+            self._db.executemany('UPDATE files SET owner = ? WHERE path = ? AND status = ?',
+                                 [(self.id, path, CLAIMED) for path in paths])
+            return len(paths)
+
+    def _execute(self, path):
+        """Run one file in the worker's child process; returns (status, error, summary, elapsed)."""
+        if self._child is None:
+            options = {key: self.settings[key] for key in ('method', 'lang', 'tables', 'auto_orient')}
+            self._child = _WorkerProcess(_process_context(), self.output_dir, options)
+        self._child.submit(path)
+        try:
+            while True:
+                elapsed = self._child.elapsed()
+                outcome = self._child.result(min(self.poll_interval, 0.1))
+                if outcome is not None:
+                    status, payload = outcome
+                    if status == 'ok':
+                        return DONE, None, payload, elapsed
+                    return FAILED, payload, None, elapsed
+                if elapsed > self.settings['timeout']:
+                    self._child.restart()
+                    return FAILED, f"Timed out after {self.settings['timeout']}s", None, elapsed
+        except BaseException:
+            self._child.kill()
+            self._child = None
+            raise
+
+    def _finish(self, path, status, error, summary, elapsed):
+        with _transaction(self._db):
+            row = self._db.execute('SELECT attempts FROM files WHERE path = ? AND owner = ? AND status = ?',
+                                   (path, self.id, RUNNING)).fetchone()
+            if row is None:
+                # Re-queued while we were stalled; whoever holds it now records the result
+                return
+            if status == FAILED and row[0] < self.settings['max_attempts']:
+                status = PENDING
+            self._db.execute(
+                'UPDATE files SET status = ?, owner = NULL, error = ?, elapsed = ?, result = ?, updated = ?'
+                ' WHERE path = ?',
+                (status, error, elapsed, json.dumps(summary) if summary else None, time.time(), path)
+            )
+            column = 'done' if status == DONE else 'failed'
+            self._db.execute(f'UPDATE workers SET {column} = {column} + 1 WHERE id = ?', (self.id,))
+
+    def run(self, max_tasks=None, exit_when_idle=True):
+        """
+        Process files until the queue is drained.
+
+        Args:
+            max_tasks: Stop after this many files (None for no limit)
+            exit_when_idle: Return once nothing is pending, claimed or
+                            running anywhere; otherwise keep polling for
+                            new files
+
+        Returns:
+            dict: Files this worker finished as done and failed
+        """
+        self._register(self._db)
+        beat = threading.Thread(target=self._beat, daemon=True)
+        beat.start()
+        done = failed = 0
+        try:
+            while max_tasks is None or done + failed < max_tasks:
+                path = self._next_task()
+                if path is None:
+                    if self._steal():
+                        continue
+                    requeue_dead(self._db, self.settings['lease'], self.settings['max_attempts'])
+                    counts = queue_counts(self._db)
+                    if counts[PENDING]:
+                        continue
+                    if exit_when_idle and not counts[CLAIMED] and not counts[RUNNING]:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+
+                self._current = path
+                status, error, summary, elapsed = self._execute(path)
+                self._current = None
+                self._finish(path, status, error, summary, elapsed)
+                if status == DONE:
+                    done += 1
+                else:
+                    failed += 1
+        finally:
+            if self._child is not None:
+                self._child.stop()
+                self._child = None
+            self._stop.set()
+            beat.join()
+            # Hand back whatever we claimed but did not start
+            with _transaction(self._db):
+                self._db.execute('UPDATE files SET status = ?, owner = NULL WHERE owner = ? AND status = ?',
+                                 (PENDING, self.id, CLAIMED))
+                self._db.execute('DELETE FROM workers WHERE id = ?', (self.id,))
+            self._db.close()
+        return {'worker': self.id, 'done': done, 'failed': failed}
+
+
+def _run_worker(manifest_path, options):
+    """Process entry point for run_workers."""
+    return Worker(manifest_path, **options).run()
+
+
+def run_workers(manifest_path, processes=None, **options):
+    """
+    Run several workers on this machine, one process each, until the queue drains.
+
+    Args:
+        manifest_path: Shared sqlite queue
+        processes: Worker processes (default: CPU count)
+        **options: Further options for Worker
+
+    Returns:
+        list: Each worker's summary from Worker.run
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes, mp_context=_process_context()) as executor:
+        futures = [executor.submit(_run_worker, manifest_path, options) for _ in range(processes)]
+        return [future.result() for future in futures]
+
+
+def main(argv=None):
+    """
+    Distributed batch OCR over a shared queue file:
+
+        python -m OCR.distributed coordinator QUEUE OUTPUT_DIR IMAGES...
+        python -m OCR.distributed worker QUEUE [--processes 4]
+        python -m OCR.distributed status QUEUE
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Distributed batch OCR over a shared sqlite queue")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    coordinator = commands.add_parser('coordinator', help="Queue files and watch the job")
+    coordinator.add_argument('queue', help="Shared sqlite queue path")
+    coordinator.add_argument('output_dir', help="Shared directory for .txt/.json outputs")
+    coordinator.add_argument('images', nargs='*', help="Input images to add to the job")
+    coordinator.add_argument('--method', default='none',
+                             choices=['none', 'adaptive', 'otsu', 'sauvola', 'fixed', 'optimal'])
+    coordinator.add_argument('--lang', default='eng')
+    coordinator.add_argument('--timeout', type=float, default=120.0, help="Seconds per file")
+    coordinator.add_argument('--max-attempts', type=int, default=3)
+    coordinator.add_argument('--lease', type=float, default=30.0,
+                             help="Seconds without a heartbeat before a worker's files are re-queued")
+    coordinator.add_argument('--tables', action='store_true', help="Table mode: write ruled tables as CSV")
+    coordinator.add_argument('--auto-orient', action='store_true', help="Rotate sideways/upside-down pages upright")
+    coordinator.add_argument('--store', metavar='DIR', help="Also append every result to this result store")
+    coordinator.add_argument('--retry-failed', action='store_true', help="Queue failed files again")
+    coordinator.add_argument('--no-wait', action='store_true', help="Queue the files and exit")
+
+    worker = commands.add_parser('worker', help="Process files from the queue")
+    worker.add_argument('queue', help="Shared sqlite queue path")
+    worker.add_argument('--processes', type=int, default=None, help="Worker processes on this machine")
+    worker.add_argument('--output-dir', default=None, help="Local path of the shared output directory")
+    worker.add_argument('--prefetch', type=int, default=2, help="Files claimed per trip to the queue")
+    worker.add_argument('--heartbeat', type=float, default=5.0, help="Seconds between heartbeats")
+
+    status = commands.add_parser('status', help="Show queue and worker status")
+    status.add_argument('queue', help="Shared sqlite queue path")
+    args = parser.parse_args(argv)
+
+    if args.command == 'worker':
+        summaries = run_workers(args.queue, processes=args.processes, output_dir=args.output_dir,
+                                prefetch=args.prefetch, heartbeat=args.heartbeat)
+        for summary in summaries:
+            print(f"{summary['worker']}: done {summary['done']}  failed {summary['failed']}")
+        return
+
+    if args.command == 'status':
+        db = open_queue(args.queue)
+        try:
+            print('  '.join(f'{status} {count}' for status, count in queue_counts(db).items()))
+            now = time.time()
+            for worker_id, heartbeat, current, done, failed in db.execute(
+                    'SELECT id, heartbeat, current, done, failed FROM workers ORDER BY id'):
+                print(f"{worker_id}: heartbeat {now - heartbeat:.0f}s ago  done {done}  failed {failed}  "
+                      f"{current or 'idle'}")
+        finally:
+            db.close()
+        return
+
+    def report(stats):
+        counts = stats['counts']
+        eta = f"{stats['eta_seconds']:.0f}s" if stats['eta_seconds'] is not None else '?'
+        print(f"done {counts[DONE]}  failed {counts[FAILED]}  running {counts[RUNNING]}  "
+              f"remaining {stats['remaining']}  workers {stats['workers']}  "
+              f"{stats['pages_per_second']:.2f} pages/s  ETA {eta}", flush=True)
+
+    store = None
+    if args.store:
+        from .result_store import ResultStore
+        store = ResultStore(args.store)
+    try:
+        with Coordinator(args.queue, args.output_dir, method=args.method, lang=args.lang, timeout=args.timeout,
+                         max_attempts=args.max_attempts, lease=args.lease, tables=args.tables,
+                         store=store, auto_orient=args.auto_orient) as job:
+            job.add(args.images)
+            if args.retry_failed:
+                job.retry_failed()
+            if args.no_wait:
+                print('  '.join(f'{status} {count}' for status, count in job.counts().items()))
+                return
+            job.wait(on_progress=report)
+            for path, attempts, error in job.failures():
+                print(f"FAILED ({attempts} attempts) {path}: {error}")
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
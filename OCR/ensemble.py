@@ -0,0 +1,286 @@
+"""Ensemble OCR module: run several preprocessing variants and keep the best."""
+from concurrent.futures import ProcessPoolExecutor, wait
+from functools import partial
+import multiprocessing
+import os
+import threading
+import time
+
+from PIL import Image
+
+from ._lazy import lazy_import
+from .image_preprocessor import (
+    preprocess_image,
+    preprocess_with_otsu,
+    preprocess_with_fixed_threshold,
+    optimal_pipeline,
+    correct_orientation,
+    configure_worker
+)
+from .shared_pages import PageHandle, PageRing, attach
+from .text_extractor import extract_text_with_confidence
+
+np = lazy_import('numpy')
+
+
+PREPROCESSING_VARIANTS = {
+    'adaptive': partial(preprocess_image, resize_scale=2.0, denoise=True, threshold_method='adaptive'),
+    'otsu': partial(preprocess_with_otsu, resize_scale=2.0, denoise=True),
+    'sauvola': partial(preprocess_image, resize_scale=2.0, denoise=False, threshold_method='sauvola'),
+    'fixed': partial(preprocess_with_fixed_threshold, resize_scale=2.0, denoise=True),
+    'optimal': optimal_pipeline,
+}
+
+# Variants that rotate or deskew the page: their word boxes cannot be mapped
+# back onto the original page, so word-level merging leaves them out
+REORIENTING_VARIANTS = {'optimal'}
+
+
+def _process_context():
+    """Multiprocessing context whose workers don't inherit OpenCV's thread pool."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _run_variant(page, variant, lang, output=None, deadline=None):
+    """
+    Preprocess and OCR one variant inside a worker process.
+
+    The page arrives as a PageHandle into shared memory (or a PIL Image when
+    no slot was available). With an output handle, the preprocessed page is
+    written back into that slot rather than pickled into the result. With a
+    deadline (a time.time() value), the Tesseract call is killed when it
+    passes, so a stuck variant frees its worker on its own.
+    """
+    start = time.perf_counter()
+    try:
+        image = Image.fromarray(attach(page)) if isinstance(page, PageHandle) else page
+        preprocessed = PREPROCESSING_VARIANTS[variant](image)
+        remaining = 0
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise TimeoutError("deadline passed during preprocessing")
+        result = extract_text_with_confidence(preprocessed, lang=lang, auto_orient=False, timeout=remaining)
+    except Exception as e:
+        # Re-raise as a plain Exception: some library errors can't be unpickled
+        # by the coordinator and would otherwise break the whole pool
+        raise Exception(f"{variant} variant failed: {str(e)}")
+    if output is not None:
+        array = np.asarray(preprocessed.convert('L'))
+        if array.size <= output.shape[0]:
+            attach(output)[:array.size] = array.ravel()
+            result['image_shape'] = array.shape
+        else:
+            result['image'] = array
+    result['variant'] = variant
+    # Word boxes are in preprocessed-page pixels; this maps them back
+    result['scale'] = (preprocessed.width / float(image.width), preprocessed.height / float(image.height))
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+
+def _to_original(word, scale):
+    """Return a copy of a word with its position and box in original-page pixels."""
+    sx, sy = scale
+    word = dict(word, position=(int(round(word['position'][0] / sx)), int(round(word['position'][1] / sy))))
+    if 'box' in word:
+        left, top, width, height = word['box']
+        word['box'] = (int(round(left / sx)), int(round(top / sy)),
+                       int(round(width / sx)), int(round(height / sy)))
+    return word
+
+
+def merge_by_confidence(results, tolerance=6):
+    """
+    Merge variant results word by word, keeping the most confident reading.
+
+    Each variant's boxes are first mapped back to original-page pixels
+    with its 'scale', then words are matched across variants by position.
+    Variants in REORIENTING_VARIANTS are left out, since rotation and
+    deskewing move words in ways a scale cannot undo.
+
+    Args:
+        results: List of _run_variant results (extract_text_with_confidence
+                 results plus 'variant' and 'scale')
+        tolerance: Maximum distance in original-page pixels for two words to be the same word
+
+    Returns:
+        list: Merged words_with_confidence entries, in original-page
+              coordinates and reading order of the most confident variant
+    """
+    results = [r for r in results
+               if r.get('words_with_confidence') and r.get('variant') not in REORIENTING_VARIANTS]
+    if not results:
+        return []
+
+    mapped = [[_to_original(w, r.get('scale', (1.0, 1.0))) for w in r['words_with_confidence']]
+              for r in results]
+    base_index = max(range(len(results)), key=lambda i: results[i]['average_confidence'])
+    others = []
+    for i, words in enumerate(mapped):
+        if i == base_index:
+            continue
+        positions = np.array([w['position'] for w in words], dtype=np.float64)
+        confidences = np.array([w['confidence'] for w in words], dtype=np.float64)
+        others.append((words, positions, confidences))
+
+    merged = []
+    for word in mapped[base_index]:
+        best = word
+        for words, positions, confidences in others:
+            distances = np.abs(positions - word['position']).max(axis=1)
+            candidates = np.flatnonzero(distances <= tolerance)
+            if candidates.size:
+                idx = candidates[np.argmax(confidences[candidates])]
+                if confidences[idx] > best['confidence']:
+                    best = dict(words[idx], position=word['position'])
+                    for key in ('box', 'line'):
+                        if key in word:
+                            best[key] = word[key]
+        merged.append(best)
+
+    return merged
+
+
+def _release_when_done(futures, release):
+    """Call release once every future has finished (or been cancelled)."""
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def finished(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            release()
+
+    if not futures:
+        release()
+    for future in futures:
+        future.add_done_callback(finished)
+
+
+def run_ensemble(image_input, variants=None, lang='eng', timeout=30.0,
+                 max_workers=None, merge=False, return_image=False, ring=None, auto_orient=False):
+    """
+    OCR several preprocessing variants concurrently and return the best one.
+
+    The page is copied once into a shared-memory PageRing slot; every
+    variant is then preprocessed and recognized in its own worker process,
+    each limited to a single OpenCV thread, reading the page through its
+    handle instead of a pickled copy. Variants that have not finished when
+    the deadline expires are abandoned; their Tesseract calls are killed at
+    the deadline, so workers do not keep running long past it. The slots
+    an abandoned variant uses stay reserved until its worker lets go.
+
+    Args:
+        image_input: PIL Image object or file path
+        variants: Variant names from PREPROCESSING_VARIANTS (default: all)
+        lang: Language code (default 'eng' for English)
+        timeout: Latency budget in seconds for the whole ensemble
+        max_workers: Worker processes (default: one per variant, capped at CPU count)
+        merge: Return a word-level confidence-weighted merge instead of the single best variant
+        return_image: Also return the winning variant's preprocessed page as 'image'
+        ring: PageRing to reuse across calls (default: a private ring sized for this page)
+        auto_orient: Rotate sideways/upside-down pages upright first (an extra OSD pass)
+
+    Returns:
+        dict: Best (or merged) text, words_with_confidence, average_confidence,
+              winning variant, per-variant confidences and timed-out variants
+    """
+    variants = list(variants or PREPROCESSING_VARIANTS)
+    unknown = [v for v in variants if v not in PREPROCESSING_VARIANTS]
+    if unknown:
+        raise ValueError(f"Unknown preprocessing variants: {', '.join(unknown)}")
+
+    if auto_orient:
+        image = correct_orientation(image_input)
+    else:
+        image = image_input if isinstance(image_input, Image.Image) else Image.open(image_input)
+    image = image.convert('RGB')
+    workers = max_workers or min(len(variants), os.cpu_count() or 1)
+
+    array = np.asarray(image)
+    own_ring = ring is None
+    if own_ring:
+        # One input slot plus an output slot per variant; a 2x-resized gray
+        # page is 4 bytes per input pixel
+        height, width = array.shape[:2]
+        ring = PageRing(slots=1 + (len(variants) if return_image else 0),
+                        slot_bytes=max(array.nbytes, 4 * height * width))
+    handles = []
+
+    def reserve(reserve_fn, *args):
+        try:
+            handle = reserve_fn(*args)
+        except (BufferError, ValueError):
+            return None  # fall back to pickling
+        handles.append(handle)
+        return handle
+
+    results = []
+    errors = {}
+    timed_out = []
+    not_done = set()
+    futures = {}
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=_process_context(),
+                                   initializer=configure_worker)
+    try:
+        page = reserve(ring.put, array) or image
+        outputs = {v: reserve(ring.reserve, (ring.slot_bytes,)) if return_image else None
+                   for v in variants}
+        deadline = time.time() + timeout
+        futures = {executor.submit(_run_variant, page, v, lang, outputs[v], deadline): v for v in variants}
+        done, not_done = wait(futures, timeout=timeout)
+        for future in done:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors[futures[future]] = str(e)
+        timed_out = sorted(futures[f] for f in not_done)
+        for result in results:
+            if 'image_shape' in result:
+                shape = result.pop('image_shape')
+                flat = ring.view(outputs[result['variant']])[:shape[0] * shape[1]]
+                result['image'] = flat.reshape(shape).copy()
+                del flat  # the segment can't be closed while views exist
+    finally:
+        # Queued variants are cancelled; running ones stop at the deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        def release():
+            for handle in handles:
+                ring.release(handle)
+            if own_ring:
+                ring.close()
+
+        # A variant still running may yet read the page or write its output
+        # slot, so the slots are freed only after its future finishes
+        _release_when_done([future for future in futures if not future.done()], release)
+
+    if not results:
+        raise Exception(f"Ensemble OCR produced no result within {timeout}s "
+                        f"(errors: {errors}, timed out: {timed_out})")
+
+    best = max(results, key=lambda r: r['average_confidence'])
+    output = {
+        'text': best['text'],
+        'words_with_confidence': best['words_with_confidence'],
+        'average_confidence': best['average_confidence'],
+        'variant': best['variant'],
+        'variants': {r['variant']: r['average_confidence'] for r in results},
+        'errors': errors,
+        'timed_out': timed_out
+    }
+    if return_image and 'image' in best:
+        output['image'] = Image.fromarray(best['image'])
+
+    words = merge_by_confidence(results) if merge else []
+    if words:
+        output['text'] = ' '.join(w['word'] for w in words)
+        output['words_with_confidence'] = words
+        output['average_confidence'] = float(np.mean([w['confidence'] for w in words])) if words else 0.0
+        output['variant'] = 'merged'
+
+    return output
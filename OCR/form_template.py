@@ -0,0 +1,212 @@
+"""Form template mode: align a page to a template and OCR only its field zones."""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+
+from PIL import Image
+
+from ._lazy import lazy_import
+from .image_preprocessor import tesseract_config
+from .pipeline import PreprocessingPipeline, build_stages
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+pytesseract = lazy_import('pytesseract')
+
+
+def _to_bgr(image_input):
+    if isinstance(image_input, Image.Image):
+        return cv2.cvtColor(np.array(image_input.convert('RGB')), cv2.COLOR_RGB2BGR)
+    img = cv2.imread(str(image_input))
+    if img is None:
+        raise ValueError("Could not read image")
+    return img
+
+
+class FormTemplate:
+    """
+    Fixed-layout form described by named zones.
+
+    Template JSON:
+        {
+          "name": "invoice",
+          "reference_image": "blank_invoice.png",   (optional, used for alignment)
+          "fields": [
+            {"name": "invoice_no", "box": [0.70, 0.05, 0.25, 0.04],
+             "psm": 7, "whitelist": "0123456789-"},
+            ...
+          ]
+        }
+
+    Boxes are (left, top, width, height) relative to the page size, so the
+    same template works at any scan resolution.
+    """
+
+    def __init__(self, fields, name='', reference_image=None, max_features=1500):
+        """
+        Args:
+            fields: List of field dicts with 'name', relative 'box' and optional
+                    'psm' (default: chosen per crop), 'whitelist', 'lang' and 'scale'
+            name: Template name
+            reference_image: Blank/filled reference page (PIL Image or path) to align scans to
+            max_features: ORB features used for alignment
+        """
+        for field in fields:
+            if 'name' not in field or len(field.get('box', [])) != 4:
+                raise ValueError(f"Invalid template field: {field}")
+        self.name = name
+        self.fields = [dict(field) for field in fields]
+        self.max_features = max_features
+        self._reference = None
+        self._reference_features = None
+        if reference_image is not None:
+            self._set_reference(reference_image)
+
+    @classmethod
+    def from_json(cls, spec):
+        """
+        Load a template from a JSON file path or JSON string.
+
+        A relative reference_image path is resolved against the template file.
+        """
+        base_dir = ''
+        if os.path.exists(spec):
+            base_dir = os.path.dirname(os.path.abspath(spec))
+            with open(spec, 'r', encoding='utf-8') as f:
+                spec = f.read()
+        data = json.loads(spec)
+
+        reference = data.get('reference_image')
+        if reference and not os.path.isabs(reference):
+            reference = os.path.join(base_dir, reference)
+        return cls(data['fields'], name=data.get('name', ''), reference_image=reference)
+
+    def to_json(self):
+        """Serialize the template (without the reference image) to JSON."""
+        return json.dumps({'name': self.name, 'fields': self.fields})
+
+    def _set_reference(self, reference_image):
+        reference = cv2.cvtColor(_to_bgr(reference_image), cv2.COLOR_BGR2GRAY)
+        orb = cv2.ORB_create(self.max_features)
+        keypoints, descriptors = orb.detectAndCompute(reference, None)
+        self._reference = reference
+        self._reference_features = (keypoints, descriptors)
+
+    def align(self, image_input):
+        """
+        Warp a scanned page into the template's reference frame.
+
+        Uses ORB feature matching and a RANSAC homography, falling back to
+        ECC affine alignment on a downsampled copy when too few features
+        match. Without a reference image the page is returned unchanged.
+
+        Args:
+            image_input: PIL Image object or file path
+
+        Returns:
+            numpy.ndarray: Aligned BGR page
+        """
+        page = _to_bgr(image_input)
+        if self._reference is None:
+            return page
+
+        ref_h, ref_w = self._reference.shape[:2]
+        gray = cv2.cvtColor(page, cv2.COLOR_BGR2GRAY)
+
+        ref_keypoints, ref_descriptors = self._reference_features
+        orb = cv2.ORB_create(self.max_features)
+        keypoints, descriptors = orb.detectAndCompute(gray, None)
+        if descriptors is not None and ref_descriptors is not None:
+            matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+            matches = sorted(matcher.match(descriptors, ref_descriptors), key=lambda m: m.distance)
+            matches = matches[:max(int(len(matches) * 0.2), 10)]
+            if len(matches) >= 10:
+                src = np.float32([keypoints[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
+                dst = np.float32([ref_keypoints[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
+                homography, _ = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+                if homography is not None:
+                    return cv2.warpPerspective(page, homography, (ref_w, ref_h),
+                                               borderMode=cv2.BORDER_REPLICATE)
+
+        # ECC fallback on a downsampled copy, scaled back up afterwards
+        scale = min(1.0, 800.0 / max(ref_w, ref_h))
+        size = (max(int(ref_w * scale), 1), max(int(ref_h * scale), 1))
+        ref_small = cv2.resize(self._reference, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+        page_small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+        warp = np.eye(2, 3, dtype=np.float32)
+        criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 100, 1e-5)
+        resized = cv2.resize(page, (ref_w, ref_h), interpolation=cv2.INTER_AREA)
+        try:
+            _, warp = cv2.findTransformECC(ref_small, page_small, warp, cv2.MOTION_AFFINE, criteria, None, 5)
+        except cv2.error:
+            return resized
+        warp[:, 2] /= scale
+        return cv2.warpAffine(resized, warp, (ref_w, ref_h),
+                              flags=cv2.INTER_LINEAR + cv2.WARP_INVERSE_MAP,
+                              borderMode=cv2.BORDER_REPLICATE)
+
+    def crop_fields(self, aligned):
+        """Crop every field zone from an aligned BGR page."""
+        height, width = aligned.shape[:2]
+        crops = {}
+        for field in self.fields:
+            x, y, w, h = field['box']
+            left, top = int(round(x * width)), int(round(y * height))
+            right, bottom = int(round((x + w) * width)), int(round((y + h) * height))
+            crops[field['name']] = aligned[max(top, 0):min(bottom, height), max(left, 0):min(right, width)]
+        return crops
+
+    def _ocr_field(self, field, crop, lang):
+        if crop.size == 0:
+            return ''
+        pipeline = PreprocessingPipeline(build_stages(resize_scale=field.get('scale', 2.0),
+                                                      denoise=False, threshold_method='otsu'))
+        binary = pipeline.run_array(crop, cache=False)
+
+        config = tesseract_config(binary, field.get('psm', 'auto'))['config']
+        if field.get('whitelist'):
+            config += f" -c tessedit_char_whitelist={field['whitelist']}"
+        return pytesseract.image_to_string(binary, lang=field.get('lang', lang), config=config).strip()
+
+    def extract(self, image_input, lang='eng', max_workers=None):
+        """
+        Align a page and OCR only the template's field zones.
+
+        Zones are recognized concurrently; each Tesseract call runs in its own
+        subprocess, so threads are enough to keep all cores busy.
+
+        Args:
+            image_input: PIL Image object or file path
+            lang: Default language code for fields without their own 'lang'
+            max_workers: Concurrent OCR calls (default: CPU count)
+
+        Returns:
+            dict: Field name -> recognized text
+        """
+        crops = self.crop_fields(self.align(image_input))
+        workers = max_workers or os.cpu_count() or 1
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                field['name']: executor.submit(self._ocr_field, field, crops[field['name']], lang)
+                for field in self.fields
+            }
+            return {name: future.result() for name, future in futures.items()}
+
+
+def extract_form(image_input, template, lang='eng', max_workers=None):
+    """
+    Extract the fields of a fixed-layout form.
+
+    Args:
+        image_input: PIL Image object or file path
+        template: FormTemplate, template JSON file path or JSON string
+        lang: Language code (default 'eng' for English)
+        max_workers: Concurrent OCR calls (default: CPU count)
+
+    Returns:
+        dict: Field name -> recognized text
+    """
+    if not isinstance(template, FormTemplate):
+        template = FormTemplate.from_json(template)
+    return template.extract(image_input, lang=lang, max_workers=max_workers)
@@ -1,15 +1,24 @@
 """Formatting detection module for identifying text properties."""
-import pytesseract
 from PIL import Image
-import cv2
-import numpy as np
+
+from ._lazy import lazy_import
+from .image_preprocessor import tesseract_config
+
+pytesseract = lazy_import('pytesseract')
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
 
 
 class FormattingDetector:
     """Detect text formatting properties like bold, italic, alignment."""
     
-    def __init__(self):
-        self.config = r'--psm 6'
+    def __init__(self, psm='auto'):
+        """
+        Args:
+            psm: 'auto' to pick the page segmentation mode per image (see
+                 classify_layout), a PSM number, or a resolved layout dict
+        """
+        self.psm = psm
     
     def detect_formatting(self, image_input):
         """
@@ -19,7 +28,7 @@ class FormattingDetector:
             image_input: PIL Image or file path
         
         Returns:
-            dict: Contains alignment, text blocks, and detected properties
+            dict: Contains alignment, text blocks, detected properties and the layout/PSM used
         """
         if isinstance(image_input, str):
             img = Image.open(image_input)
@@ -29,42 +38,146 @@ class FormattingDetector:
         cv_img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
         
         # Get detailed OCR data
-        data = pytesseract.image_to_data(cv_img, config=self.config, output_type=pytesseract.Output.DICT)
+        layout = tesseract_config(cv_img, self.psm)
+        data = pytesseract.image_to_data(cv_img, config=layout['config'], output_type=pytesseract.Output.DICT)
         
-        # Analyze text blocks for alignment
-        alignment = self._detect_alignment(cv_img, data)
+        # Analyze text lines for alignment
+        line_alignments = self._detect_line_alignments(cv_img, data)
+        alignment = self._detect_alignment(cv_img, data, line_alignments)
         
         # Detect bold/italic characteristics
         formatting_info = self._detect_text_properties(cv_img, data)
         
         return {
             'alignment': alignment,
-            'text_blocks': self._extract_text_blocks(data),
+            'line_alignments': line_alignments,
+            'text_blocks': self._extract_text_blocks(data, line_alignments),
             'formatting': formatting_info,
-            'confidence': np.mean([int(conf) for conf in data['confidence'] if int(conf) > 0])
+            'confidence': np.mean([float(conf) for conf in data['conf'] if float(conf) > 0] or [0]),
+            'layout': layout
         }
     
-    def _detect_alignment(self, image, ocr_data):
-        """Detect text alignment (left, center, right)."""
-        width = image.shape[1]
-        x_positions = [int(x) for x in ocr_data['left']]
+    def _detect_alignment(self, image, ocr_data, line_alignments=None):
+        """Detect page-level alignment as the most common line alignment."""
+        if line_alignments is None:
+            line_alignments = self._detect_line_alignments(image, ocr_data)
         
-        if not x_positions:
+        if not line_alignments:
             return 'left'
         
-        # Calculate average x position
-        avg_x = np.mean(x_positions)
+        labels, counts = np.unique([line['alignment'] for line in line_alignments], return_counts=True)
+        return str(labels[np.argmax(counts)])
+    
+    def _detect_line_alignments(self, image, ocr_data, tolerance=0.05):
+        """
+        Detect alignment (left, center, right, justify) for every text line.
         
-        # Determine alignment based on average position
-        left_threshold = width * 0.25
-        right_threshold = width * 0.75
+        Word boxes are grouped by (block_num, par_num, line_num) and reduced
+        to one bounding box per line in a single vectorized pass. Each line's
+        margins are measured against the overall text area. A paragraph's
+        lines other than its last are 'justify' when they all span the text
+        area and the last line starts flush left. Any other line spanning it,
+        such as the widest line of centered text or a one-line paragraph,
+        takes its paragraph's alignment, or failing that its page position.
+        
+        Args:
+            image: OpenCV image the OCR data was computed on
+            ocr_data: pytesseract image_to_data dict
+            tolerance: Margin (fraction of text-area width) treated as flush
+        
+        Returns:
+            list: One dict per line with block/paragraph/line ids, bounds and alignment
+        """
+        conf = np.asarray(ocr_data.get('conf', []), dtype=np.float64)
+        if conf.size == 0:
+            return []
         
-        if avg_x < left_threshold:
+        text = np.asarray([str(t).strip() for t in ocr_data['text']])
+        valid = (conf > 30) & (text != '')
+        if not valid.any():
+            return []
+        
+        block = np.asarray(ocr_data['block_num'], dtype=np.int64)[valid]
+        par = np.asarray(ocr_data['par_num'], dtype=np.int64)[valid]
+        line = np.asarray(ocr_data['line_num'], dtype=np.int64)[valid]
+        left = np.asarray(ocr_data['left'], dtype=np.int64)[valid]
+        top = np.asarray(ocr_data['top'], dtype=np.int64)[valid]
+        right = left + np.asarray(ocr_data['width'], dtype=np.int64)[valid]
+        
+        keys = np.stack([block, par, line], axis=1)
+        line_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        n_lines = len(line_keys)
+        
+        line_left = np.full(n_lines, np.iinfo(np.int64).max)
+        line_right = np.zeros(n_lines, dtype=np.int64)
+        line_top = np.full(n_lines, np.iinfo(np.int64).max)
+        np.minimum.at(line_left, inverse, left)
+        np.maximum.at(line_right, inverse, right)
+        np.minimum.at(line_top, inverse, top)
+        
+        area_left = line_left.min()
+        area_right = line_right.max()
+        area_width = max(area_right - area_left, 1)
+        if image is not None and area_width < image.shape[1] * 0.5:
+            # Narrow text (e.g. a single short line): measure against the page
+            area_left, area_right = 0, image.shape[1]
+            area_width = max(area_right - area_left, 1)
+        
+        left_margin = (line_left - area_left) / area_width
+        right_margin = (area_right - line_right) / area_width
+        flush_left = left_margin <= tolerance
+        flush_right = right_margin <= tolerance
+        balanced = np.abs(left_margin - right_margin) <= tolerance
+        
+        both = flush_left & flush_right
+        alignment = np.select(
+            [both, flush_left, flush_right, balanced],
+            ['both', 'left', 'right', 'center'],
+            default='left'
+        ).astype(object)
+        
+        # A line flush on both sides is only justified as a non-final line of
+        # a paragraph whose non-final lines are all flush and whose last line
+        # starts flush left; otherwise it is just the widest line and takes
+        # its paragraph's other alignment.
+        # Lines come out of np.unique sorted, so paragraphs are contiguous.
+        paragraph = line_keys[:, 0] * 100000 + line_keys[:, 1]
+        bounds = np.flatnonzero(np.diff(paragraph)) + 1
+        for rows in np.split(np.arange(n_lines), bounds):
+            if len(rows) >= 2 and both[rows[:-1]].all() and alignment[rows[-1]] in ('left', 'both'):
+                alignment[rows[:-1]] = 'justify'
+                continue
+            others = [label for label in alignment[rows] if label != 'both']
+            for i in rows[both[rows]]:
+                if others:
+                    alignment[i] = max(set(others), key=others.count)
+                else:
+                    alignment[i] = self._page_alignment(image, line_left[i], line_right[i], tolerance)
+        
+        return [
+            {
+                'block_num': int(line_keys[i, 0]),
+                'par_num': int(line_keys[i, 1]),
+                'line_num': int(line_keys[i, 2]),
+                'x': int(line_left[i]),
+                'y': int(line_top[i]),
+                'width': int(line_right[i] - line_left[i]),
+                'alignment': str(alignment[i])
+            }
+            for i in range(n_lines)
+        ]
+    
+    def _page_alignment(self, image, line_left, line_right, tolerance):
+        """Align a line by its margins on the page, for lines that span their whole text area."""
+        if image is None:
             return 'left'
-        elif avg_x > right_threshold:
-            return 'right'
-        else:
+        width = max(image.shape[1], 1)
+        left_margin = line_left / width
+        right_margin = (width - line_right) / width
+        if abs(left_margin - right_margin) <= tolerance:
             return 'center'
+        return 'left' if left_margin < right_margin else 'right'
     
     def _detect_text_properties(self, image, ocr_data):
         """Detect bold and italic properties."""
@@ -110,19 +223,25 @@ class FormattingDetector:
         
         return round(np.mean(heights)) if heights else 12
     
-    def _extract_text_blocks(self, ocr_data):
+    def _extract_text_blocks(self, ocr_data, line_alignments=None):
         """Extract text with position information organized into blocks."""
         blocks = []
+        alignment_by_line = {
+            (line['block_num'], line['par_num'], line['line_num']): line['alignment']
+            for line in (line_alignments or [])
+        }
         
         for i, text in enumerate(ocr_data['text']):
-            if int(ocr_data['conf'][i]) > 30:  # Confidence threshold
+            if float(ocr_data['conf'][i]) > 30:  # Confidence threshold
+                line_key = (int(ocr_data['block_num'][i]), int(ocr_data['par_num'][i]), int(ocr_data['line_num'][i]))
                 block = {
                     'text': text,
                     'x': int(ocr_data['left'][i]),
                     'y': int(ocr_data['top'][i]),
                     'width': int(ocr_data['width'][i]),
                     'height': int(ocr_data['height'][i]),
-                    'confidence': int(ocr_data['conf'][i])
+                    'confidence': int(float(ocr_data['conf'][i])),
+                    'alignment': alignment_by_line.get(line_key, 'left')
                 }
                 blocks.append(block)
         
@@ -1,11 +1,99 @@
 """Image preprocessing module for OCR enhancement."""
-import cv2
-import numpy as np
 from PIL import Image
 import io
+import re
+import threading
 
+from ._lazy import lazy_import
 
-def preprocess_image(image_input, resize_scale=2.0, denoise=True, threshold_method='adaptive'):
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+pytesseract = lazy_import('pytesseract')
+
+
+class PreprocessingContext:
+    """
+    Reusable OpenCV resources for preprocessing.
+    
+    Caches CLAHE objects and structuring elements by their parameters so
+    batch runs don't re-create them for every page, and owns OpenCV's
+    thread configuration so process-pool workers don't oversubscribe cores.
+    CLAHE objects keep internal buffers, so they are cached per thread.
+    """
+    
+    def __init__(self, num_threads=None, use_optimized=True):
+        self._local = threading.local()
+        self._kernel_cache = {}
+        self.configure(num_threads=num_threads, use_optimized=use_optimized)
+    
+    def configure(self, num_threads=None, use_optimized=True):
+        """
+        Apply OpenCV thread and optimization settings to this process.
+        
+        Args:
+            num_threads: OpenCV worker threads (None keeps OpenCV's default,
+                         1 is best inside a process pool)
+            use_optimized: Enable OpenCV's optimized (SIMD) code paths
+        """
+        if num_threads is not None:
+            cv2.setNumThreads(int(num_threads))
+        cv2.setUseOptimized(bool(use_optimized))
+        self.num_threads = cv2.getNumThreads()
+        self.use_optimized = cv2.useOptimized()
+    
+    def get_clahe(self, clip_limit=2.0, tile_size=8):
+        """Return a cached CLAHE object for the given parameters."""
+        cache = getattr(self._local, 'clahe_cache', None)
+        if cache is None:
+            cache = self._local.clahe_cache = {}
+        
+        key = (float(clip_limit), int(tile_size))
+        clahe = cache.get(key)
+        if clahe is None:
+            clahe = cv2.createCLAHE(clipLimit=key[0], tileGridSize=(key[1], key[1]))
+            cache[key] = clahe
+        return clahe
+    
+    def get_kernel(self, size, shape=None):
+        """Return a cached structuring element for the given size and shape (default rectangle)."""
+        if shape is None:
+            shape = cv2.MORPH_RECT
+        key = (int(shape), int(size))
+        kernel = self._kernel_cache.get(key)
+        if kernel is None:
+            kernel = cv2.getStructuringElement(key[0], (key[1], key[1]))
+            self._kernel_cache[key] = kernel
+        return kernel
+
+
+_context = None
+
+
+def get_context():
+    """Return this process's shared PreprocessingContext, creating it on first use."""
+    global _context
+    if _context is None:
+        _context = PreprocessingContext()
+    return _context
+
+
+def configure_worker(num_threads=1, use_optimized=True):
+    """
+    Process-pool initializer: configure OpenCV threading for a worker.
+    
+    Args:
+        num_threads: OpenCV threads per worker (default 1 to avoid oversubscription)
+        use_optimized: Enable OpenCV's optimized code paths
+    
+    Returns:
+        PreprocessingContext: The worker's shared context
+    """
+    global _context
+    _context = PreprocessingContext(num_threads=num_threads, use_optimized=use_optimized)
+    return _context
+
+
+def preprocess_image(image_input, resize_scale=2.0, denoise=True, threshold_method='adaptive', binary=False):
     """
     Preprocess image for better OCR results using adaptive thresholding.
     
@@ -13,56 +101,21 @@ def preprocess_image(image_input, resize_scale=2.0, denoise=True, threshold_meth
         image_input: PIL Image object or file path
         resize_scale: Scale factor for resizing (default 2.0 for better detail)
         denoise: Apply denoising filter
-        threshold_method: 'adaptive', 'otsu', or 'fixed' (default 'adaptive')
+        threshold_method: 'adaptive', 'otsu', 'sauvola', 'niblack' or 'fixed' (default 'adaptive');
+                          Sauvola copes with uneven lighting without CLAHE or denoising
+        binary: Return a 1-bit (mode '1') image instead of RGB
     
     Returns:
         PIL Image: Preprocessed image
     """
-    # Convert PIL Image to OpenCV format if needed
-    if isinstance(image_input, Image.Image):
-        img = cv2.cvtColor(np.array(image_input), cv2.COLOR_RGB2BGR)
-    else:
-        img = cv2.imread(str(image_input))
-    
-    if img is None:
-        raise ValueError("Could not read image")
+    from .pipeline import PreprocessingPipeline, build_stages
     
-    # Step 1: Resize image for better OCR
-    height, width = img.shape[:2]
-    new_width = int(width * resize_scale)
-    new_height = int(height * resize_scale)
-    img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_CUBIC)
-    
-    # Step 2: Apply denoising
-    if denoise:
-        img = cv2.fastNlMeansDenoisingColored(img, None, h=10, hColor=10, 
-                                               templateWindowSize=7, searchWindowSize=21)
-    
-    # Step 3: Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
-    # Step 4: Apply intelligent thresholding
-    if threshold_method == 'adaptive':
-        # Adaptive Gaussian Thresholding - adjusts per region
-        gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY, blockSize=11, C=2)
-    elif threshold_method == 'otsu':
-        # Otsu's thresholding - finds optimal threshold automatically
-        _, gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    else:
-        # Fixed thresholding - original method
-        _, gray = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
-    
-    # Step 5: Morphological cleanup - removes noise and connects broken text
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-    gray = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel, iterations=1)
-    gray = cv2.morphologyEx(gray, cv2.MORPH_OPEN, kernel, iterations=1)
-    
-    # Step 6: Convert back to PIL Image
-    return Image.fromarray(cv2.cvtColor(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), cv2.COLOR_BGR2RGB))
+    # Resize -> denoise -> gray -> threshold -> morphology, memoized per stage
+    stages = build_stages(resize_scale=resize_scale, denoise=denoise, threshold_method=threshold_method)
+    return PreprocessingPipeline(stages).run(image_input, binary=binary)
 
 
-def preprocess_with_otsu(image_input, resize_scale=2.0, denoise=True):
+def preprocess_with_otsu(image_input, resize_scale=2.0, denoise=True, binary=False):
     """
     Preprocess image using Otsu's automatic threshold detection.
     Best for documents with varying lighting.
@@ -71,15 +124,17 @@ def preprocess_with_otsu(image_input, resize_scale=2.0, denoise=True):
         image_input: PIL Image object or file path
         resize_scale: Scale factor for resizing
         denoise: Apply denoising filter
+        binary: Return a 1-bit (mode '1') image instead of RGB
     
     Returns:
         PIL Image: Preprocessed image
     """
     return preprocess_image(image_input, resize_scale=resize_scale, 
-                           denoise=denoise, threshold_method='otsu')
+                           denoise=denoise, threshold_method='otsu', binary=binary)
 
 
-def preprocess_with_fixed_threshold(image_input, resize_scale=2.0, denoise=True, threshold_value=150):
+def preprocess_with_fixed_threshold(image_input, resize_scale=2.0, denoise=True, threshold_value=150,
+                                    binary=False):
     """
     Preprocess image using fixed threshold value.
     For consistent, predictable results.
@@ -89,43 +144,16 @@ def preprocess_with_fixed_threshold(image_input, resize_scale=2.0, denoise=True,
         resize_scale: Scale factor for resizing
         denoise: Apply denoising filter
         threshold_value: Fixed threshold value (0-255, default 150)
+        binary: Return a 1-bit (mode '1') image instead of RGB
     
     Returns:
         PIL Image: Preprocessed image
     """
-    # Convert PIL Image to OpenCV format if needed
-    if isinstance(image_input, Image.Image):
-        img = cv2.cvtColor(np.array(image_input), cv2.COLOR_RGB2BGR)
-    else:
-        img = cv2.imread(str(image_input))
+    from .pipeline import PreprocessingPipeline, build_stages
     
-    if img is None:
-        raise ValueError("Could not read image")
-    
-    # Resize image
-    height, width = img.shape[:2]
-    new_width = int(width * resize_scale)
-    new_height = int(height * resize_scale)
-    img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_CUBIC)
-    
-    # Apply denoising
-    if denoise:
-        img = cv2.fastNlMeansDenoisingColored(img, None, h=10, hColor=10, 
-                                               templateWindowSize=7, searchWindowSize=21)
-    
-    # Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
-    # Apply fixed thresholding
-    _, gray = cv2.threshold(gray, threshold_value, 255, cv2.THRESH_BINARY)
-    
-    # Morphological cleanup
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-    gray = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel, iterations=1)
-    gray = cv2.morphologyEx(gray, cv2.MORPH_OPEN, kernel, iterations=1)
-    
-    # Convert back to PIL Image
-    return Image.fromarray(cv2.cvtColor(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), cv2.COLOR_BGR2RGB))
+    stages = build_stages(resize_scale=resize_scale, denoise=denoise,
+                          threshold_method='fixed', threshold_value=threshold_value)
+    return PreprocessingPipeline(stages).run(image_input, binary=binary)
 
 
 def apply_morphology(image_input, operation='close', kernel_size=3, iterations=1):
@@ -142,25 +170,23 @@ def apply_morphology(image_input, operation='close', kernel_size=3, iterations=1
         PIL Image: Processed image
     """
     if isinstance(image_input, Image.Image):
-        img = cv2.cvtColor(np.array(image_input), cv2.COLOR_RGB2BGR)
+        gray = cv2.cvtColor(np.array(image_input), cv2.COLOR_RGB2GRAY)
     else:
-        img = cv2.imread(str(image_input))
+        gray = cv2.imread(str(image_input), cv2.IMREAD_GRAYSCALE)
     
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
+    kernel = get_context().get_kernel(kernel_size)
     
+    # Work in place on the single-channel buffer
     if operation == 'close':
-        result = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel, iterations=iterations)
+        cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel, dst=gray, iterations=iterations)
     elif operation == 'open':
-        result = cv2.morphologyEx(gray, cv2.MORPH_OPEN, kernel, iterations=iterations)
+        cv2.morphologyEx(gray, cv2.MORPH_OPEN, kernel, dst=gray, iterations=iterations)
     elif operation == 'dilate':
-        result = cv2.dilate(gray, kernel, iterations=iterations)
+        cv2.dilate(gray, kernel, dst=gray, iterations=iterations)
     elif operation == 'erode':
-        result = cv2.erode(gray, kernel, iterations=iterations)
-    else:
-        result = gray
+        cv2.erode(gray, kernel, dst=gray, iterations=iterations)
     
-    return Image.fromarray(cv2.cvtColor(cv2.cvtColor(result, cv2.COLOR_GRAY2BGR), cv2.COLOR_BGR2RGB))
+    return Image.fromarray(gray).convert('RGB')
 
 
 def enhance_contrast(image_input):
@@ -172,9 +198,9 @@ def enhance_contrast(image_input):
     
     lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
     l, a, b = cv2.split(lab)
-    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    clahe = get_context().get_clahe(clip_limit=3.0, tile_size=8)
     l = clahe.apply(l)
-    enhanced = cv2.merge([l, a, b])
+    enhanced = cv2.cvtColor(cv2.merge([l, a, b]), cv2.COLOR_LAB2BGR)
     return Image.fromarray(cv2.cvtColor(enhanced, cv2.COLOR_BGR2RGB))
 
 
@@ -197,9 +223,9 @@ def enhance_contrast_advanced(image_input, clip_limit=2.0, tile_size=8):
     
     lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
     l, a, b = cv2.split(lab)
-    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tile_size, tile_size))
+    clahe = get_context().get_clahe(clip_limit=clip_limit, tile_size=tile_size)
     l = clahe.apply(l)
-    enhanced = cv2.merge([l, a, b])
+    enhanced = cv2.cvtColor(cv2.merge([l, a, b]), cv2.COLOR_LAB2BGR)
     return Image.fromarray(cv2.cvtColor(enhanced, cv2.COLOR_BGR2RGB))
 
 
@@ -210,7 +236,14 @@ def deskew_image(image_input):
     else:
         img = cv2.imread(str(image_input))
     
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    rotated = _deskew_array(img)
+    
+    return Image.fromarray(cv2.cvtColor(rotated, cv2.COLOR_BGR2RGB))
+
+
+def _deskew_array(img):
+    """Deskew a BGR or grayscale OpenCV image."""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     coords = np.column_stack(np.where(gray > 0))
     angle = cv2.minAreaRect(cv2.convexHull(coords))[-1]
     
@@ -220,38 +253,428 @@ def deskew_image(image_input):
     h, w = img.shape[:2]
     center = (w // 2, h // 2)
     M = cv2.getRotationMatrix2D(center, angle, 1.0)
-    rotated = cv2.warpAffine(img, M, (w, h), borderMode=cv2.BORDER_REFLECT)
+    return cv2.warpAffine(img, M, (w, h), borderMode=cv2.BORDER_REFLECT)
+
+
+def _count_text_lines(binary, min_gap=2, min_aspect=4.0):
+    """
+    Count horizontal text lines in a binary (ink = 1) image.
+
+    Rows with ink form bands; a band counts as a line only if its ink runs
+    at least min_aspect times longer than the band is tall, so a row of
+    separate letters or digits read across is not mistaken for lines.
+    """
+    profile = binary.sum(axis=1)
+    if not profile.size or profile.max() == 0:
+        return 0
+    rows = np.flatnonzero(profile > 0.02 * profile.max())
+    breaks = np.flatnonzero(np.diff(rows) > min_gap)
+    starts = np.concatenate([[rows[0]], rows[breaks + 1]])
+    ends = np.concatenate([rows[breaks], [rows[-1]]])
+    lines = 0
+    for start, end in zip(starts, ends):
+        columns = np.flatnonzero(binary[start:end + 1].any(axis=0))
+        if columns[-1] - columns[0] + 1 >= min_aspect * (end - start + 1):
+            lines += 1
+    return lines
+
+
+def detect_orientation(image_input, max_side=1200, min_side=100, min_lines=3):
+    """
+    Detect whether a page is upright, sideways or upside down.
+    
+    Runs Tesseract OSD on a downsampled copy of the page so the check stays
+    cheap. When OSD is unavailable or fails (e.g. too few characters), falls
+    back to a projection-profile heuristic, which can only tell upright from
+    sideways pages and never reports 180. A sideways page is then read both
+    ways round and turned the way Tesseract reads with clearly higher
+    confidence; if that cannot decide, the page is left as it is (0).
+    Images whose short side is below min_side (tightly cropped words and
+    lines) are too small to carry orientation and are reported upright
+    without running OSD.
     
-    return Image.fromarray(cv2.cvtColor(rotated, cv2.COLOR_BGR2RGB))
+    Args:
+        image_input: PIL Image object, OpenCV (BGR or grayscale) array or file path
+        max_side: Longest side of the downsampled copy used for detection
+        min_side: Short side below which the image is assumed upright
+        min_lines: Text lines the fallback needs before it reports a rotation
+    
+    Returns:
+        dict: 'rotate' (clockwise degrees needed: 0, 90, 180 or 270),
+              'confidence' and 'method' ('osd', 'projection' or 'size')
+    """
+    if isinstance(image_input, Image.Image):
+        img = cv2.cvtColor(np.array(image_input.convert('RGB')), cv2.COLOR_RGB2BGR)
+    elif isinstance(image_input, np.ndarray):
+        img = image_input
+    else:
+        img = cv2.imread(str(image_input))
+    
+    if img is None:
+        raise ValueError("Could not read image")
+    
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape[:2]
+    if min(height, width) < min_side:
+        return {'rotate': 0, 'confidence': 0.0, 'method': 'size'}
+    scale = min(1.0, max_side / float(max(height, width)))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    
+    try:
+        osd = pytesseract.image_to_osd(gray)
+        rotate = int(re.search(r'Rotate:\s*(\d+)', osd).group(1)) % 360
+        confidence = float(re.search(r'Orientation confidence:\s*([\d.]+)', osd).group(1))
+        return {'rotate': rotate, 'confidence': confidence, 'method': 'osd'}
+    except Exception:
+        pass
+    
+    # Fallback: text lines produce a much spikier row profile than column
+    # profile on an upright page, and the opposite on a sideways one. That
+    # only holds when there are several lines; a single word or line (or
+    # two) has a spiky profile across the letters as well, so trust it only
+    # when the sideways reading finds at least min_lines long, thin lines.
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if _count_text_lines(binary.T) < min_lines:
+        return {'rotate': 0, 'confidence': 0.0, 'method': 'projection'}
+    row_profile = binary.sum(axis=1, dtype=np.float64)
+    col_profile = binary.sum(axis=0, dtype=np.float64)
+    row_score = row_profile.std() / (row_profile.mean() + 1e-6)
+    col_score = col_profile.std() / (col_profile.mean() + 1e-6)
+    
+    if col_score <= row_score * 1.2:
+        return {'rotate': 0, 'confidence': float(row_score / (col_score + 1e-6)), 'method': 'projection'}
+    
+    # Sideways, but both turns give the same profiles: guessing 90 leaves
+    # pages that need 270 upside down, so only turn on a clear winner
+    rotate = _sideways_direction(gray)
+    if rotate is None:
+        return {'rotate': 0, 'confidence': 0.0, 'method': 'projection'}
+    return {'rotate': rotate, 'confidence': float(col_score / (row_score + 1e-6)), 'method': 'projection'}
 
 
-def optimal_pipeline(image_input):
+def _sideways_direction(gray, min_margin=10.0):
+    """
+    Pick 90 or 270 for a sideways page by OCR confidence of both readings.
+    
+    Returns None when Tesseract fails or neither reading's mean word
+    confidence beats the other by min_margin points.
+    """
+    scores = {}
+    for rotate in (90, 270):
+        candidate = np.ascontiguousarray(np.rot90(gray, k=-(rotate // 90)))
+        try:
+            data = pytesseract.image_to_data(candidate, config='--psm 6', output_type=pytesseract.Output.DICT)
+        except Exception:
+            return None
+        confidences = [float(conf) for conf, text in zip(data['conf'], data['text'])
+                       if float(conf) >= 0 and str(text).strip()]
+        scores[rotate] = float(np.mean(confidences)) if confidences else 0.0
+    if abs(scores[90] - scores[270]) < min_margin:
+        return None
+    return max(scores, key=scores.get)
+
+
+def rotate_image(image_input, angle):
+    """
+    Rotate image clockwise by a multiple of 90 degrees without resampling.
+    
+    Args:
+        image_input: PIL Image object or file path
+        angle: Clockwise rotation in degrees (0, 90, 180 or 270)
+    
+    Returns:
+        PIL Image: Rotated image
+    """
+    if isinstance(image_input, Image.Image):
+        img = image_input
+    else:
+        img = Image.open(str(image_input))
+    
+    rotations = {
+        90: Image.Transpose.ROTATE_270,
+        180: Image.Transpose.ROTATE_180,
+        270: Image.Transpose.ROTATE_90,
+    }
+    angle = int(angle) % 360
+    if angle not in rotations:
+        return img
+    return img.transpose(rotations[angle])
+
+
+def correct_orientation(image_input, max_side=1200):
+    """
+    Rotate sideways or upside-down pages upright before OCR.
+    
+    Args:
+        image_input: PIL Image object or file path
+        max_side: Longest side of the downsampled copy used for detection
+    
+    Returns:
+        PIL Image: Upright image
+    """
+    if not isinstance(image_input, Image.Image):
+        image_input = Image.open(str(image_input))
+    
+    orientation = detect_orientation(image_input, max_side=max_side)
+    return rotate_image(image_input, orientation['rotate'])
+
+
+# Input class -> Tesseract page segmentation mode
+LAYOUT_PSM = {
+    'single_word': 8,   # treat the image as a single word
+    'single_line': 7,   # treat the image as a single text line
+    'block': 6,         # one uniform block of text, no layout analysis
+    'sparse': 11,       # find as much text as possible in no particular order
+    'page': 3,          # full automatic page segmentation (Tesseract default)
+    'empty': 6,
+}
+
+
+def classify_layout(image_input, max_side=800):
+    """
+    Classify an input as a word, line, text block, sparse screenshot or full page.
+    
+    Binarizes a downsampled copy with Otsu and looks at connected-component
+    statistics: the median glyph height gives the text size, rows covered
+    by glyph boxes give the line count, glyph box area over page area gives
+    the text density, and wide empty gutters inside the text region reveal
+    multiple columns. The whole check takes a few milliseconds.
+    
+    Args:
+        image_input: PIL Image object, OpenCV (BGR or grayscale) array or file path
+        max_side: Longest side of the downsampled copy used for classification
+    
+    Returns:
+        dict: 'class', chosen 'psm', Tesseract 'config' string and the
+              statistics behind the decision
+    """
+    if isinstance(image_input, Image.Image):
+        gray = np.array(image_input.convert('L'))
+    elif isinstance(image_input, np.ndarray):
+        gray = image_input if image_input.ndim == 2 else cv2.cvtColor(image_input, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = cv2.imread(str(image_input), cv2.IMREAD_GRAYSCALE)
+    
+    if gray is None:
+        raise ValueError("Could not read image")
+    
+    height, width = gray.shape[:2]
+    scale = min(1.0, max_side / float(max(height, width)))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                          interpolation=cv2.INTER_AREA)
+    height, width = gray.shape[:2]
+    
+    # Ink is the minority class, whichever polarity the page has
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    inverted = cv2.countNonZero(binary) > binary.size / 2
+    if inverted:
+        cv2.bitwise_not(binary, dst=binary)
+    
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    boxes = stats[1:]
+    # Drop specks and page-sized blobs (borders, photos)
+    keep = ((boxes[:, cv2.CC_STAT_HEIGHT] >= 3) & (boxes[:, cv2.CC_STAT_AREA] >= 4)
+            & (boxes[:, cv2.CC_STAT_HEIGHT] < height * 0.8) & (boxes[:, cv2.CC_STAT_WIDTH] < width * 0.8))
+    boxes = boxes[keep]
+    
+    layout = {'inverted': bool(inverted), 'components': int(len(boxes)), 'lines': 0,
+              'columns': 0, 'density': 0.0}
+    if len(boxes) == 0:
+        layout['class'] = 'empty'
+    else:
+        glyph_height = float(np.median(boxes[:, cv2.CC_STAT_HEIGHT]))
+        glyphs = boxes[(boxes[:, cv2.CC_STAT_HEIGHT] >= glyph_height * 0.5)
+                       & (boxes[:, cv2.CC_STAT_HEIGHT] <= glyph_height * 2.5)]
+        left, top = glyphs[:, cv2.CC_STAT_LEFT], glyphs[:, cv2.CC_STAT_TOP]
+        right = left + glyphs[:, cv2.CC_STAT_WIDTH]
+        bottom = top + glyphs[:, cv2.CC_STAT_HEIGHT]
+        
+        # Lines: runs of rows covered by glyph boxes, counted over the page
+        # and in narrow vertical strips so a slight skew can't merge lines
+        strip_width = max(int(glyph_height * 8), 1)
+        strips = (left + right) // 2 // strip_width
+        lines = 0
+        for strip in [None] + list(np.unique(strips)):
+            in_strip = slice(None) if strip is None else strips == strip
+            rows = np.zeros(height + 1, dtype=np.int32)
+            np.add.at(rows, top[in_strip], 1)
+            np.add.at(rows, bottom[in_strip], -1)
+            covered = np.cumsum(rows)[:height] > 0
+            lines = max(lines, int(np.count_nonzero(covered[1:] & ~covered[:-1]) + covered[0]))
+        
+        # Columns: glyph-covered x ranges split by gutters wider than two glyph heights
+        cols = np.zeros(width + 1, dtype=np.int32)
+        np.add.at(cols, left, 1)
+        np.add.at(cols, right, -1)
+        occupied = np.flatnonzero(np.cumsum(cols)[:width] > 0)
+        gaps = np.diff(occupied) if occupied.size else np.zeros(0)
+        columns = int(np.count_nonzero(gaps > glyph_height * 2)) + 1
+        word_gaps = int(np.count_nonzero(gaps > glyph_height * 0.4))
+        
+        density = float((glyphs[:, cv2.CC_STAT_WIDTH] * glyphs[:, cv2.CC_STAT_HEIGHT]).sum()) / (height * width)
+        layout.update(lines=lines, columns=columns, density=round(density, 4))
+        
+        if lines <= 1:
+            layout['class'] = 'single_word' if word_gaps == 0 else 'single_line'
+        elif density < 0.03:
+            layout['class'] = 'sparse'
+        elif columns == 1 and lines <= 15:
+            layout['class'] = 'block'
+        else:
+            layout['class'] = 'page'
+    
+    layout['psm'] = LAYOUT_PSM[layout['class']]
+    layout['config'] = f"--psm {layout['psm']}"
+    if not inverted:
+        # Skip Tesseract's per-line retry on inverted text for dark-on-light input
+        layout['config'] += ' -c tessedit_do_invert=0'
+    return layout
+
+
+def tesseract_config(image_input, psm='auto'):
+    """
+    Resolve the Tesseract configuration for an image.
+    
+    Args:
+        image_input: PIL Image object, OpenCV array or file path
+        psm: 'auto' to classify the input, an explicit PSM number, None for
+             Tesseract's default, or a layout dict already resolved for it
+    
+    Returns:
+        dict: Layout info with at least 'class', 'psm' and 'config'
+    """
+    if isinstance(psm, dict):
+        return psm
+    if psm == 'auto':
+        return classify_layout(image_input)
+    if psm is None:
+        return {'class': None, 'psm': None, 'config': ''}
+    return {'class': 'manual', 'psm': int(psm), 'config': f'--psm {int(psm)}'}
+
+
+# A page counts as clean (born-digital) when it passes all of these
+CLEAN_IMAGE_LIMITS = {
+    'min_bimodality': 0.85,   # Otsu between-class / total variance
+    'max_noise': 2.0,         # background standard deviation (0-255)
+    'min_sharpness': 1.1,     # edge gradient relative to text contrast
+    'min_glyph_height': 12,   # median glyph height in native pixels
+}
+
+
+def assess_image_quality(image_input, max_side=1000):
+    """
+    Cheap quality probe that tells born-digital images from scans and photos.
+    
+    Works on a downsampled copy: bimodality is Otsu's between-class share of
+    the grey-level variance, noise is the standard deviation of background
+    pixels away from any text (sampled without smoothing), sharpness is the
+    90th-percentile edge gradient relative to the text/background contrast,
+    and glyph height comes from connected components of the Otsu mask.
+    
+    Args:
+        image_input: PIL Image object, OpenCV (BGR or grayscale) array or file path
+        max_side: Longest side of the downsampled copy used for the probe
+    
+    Returns:
+        dict: 'bimodality', 'noise', 'sharpness', 'glyph_height' and 'clean'
+              (True when all pass CLEAN_IMAGE_LIMITS)
+    """
+    if isinstance(image_input, Image.Image):
+        full = np.array(image_input.convert('L'))
+    elif isinstance(image_input, np.ndarray):
+        full = image_input if image_input.ndim == 2 else cv2.cvtColor(image_input, cv2.COLOR_BGR2GRAY)
+    else:
+        full = cv2.imread(str(image_input), cv2.IMREAD_GRAYSCALE)
+    
+    if full is None:
+        raise ValueError("Could not read image")
+    
+    height, width = full.shape[:2]
+    scale = min(1.0, max_side / float(max(height, width)))
+    size = (max(int(width * scale), 1), max(int(height * scale), 1))
+    gray = cv2.resize(full, size, interpolation=cv2.INTER_AREA) if scale < 1.0 else full
+    # Nearest-neighbour samples keep the per-pixel noise that INTER_AREA averages away
+    samples = cv2.resize(full, size, interpolation=cv2.INTER_NEAREST) if scale < 1.0 else full
+    
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    background = binary > 0
+    if np.count_nonzero(background) < background.size / 2:
+        background = ~background  # light text on a dark background
+    
+    values = gray.astype(np.float32)
+    ink_values, paper_values = values[~background], values[background]
+    if ink_values.size == 0 or paper_values.size == 0:
+        return {'bimodality': 0.0, 'noise': 0.0, 'sharpness': 0.0, 'glyph_height': 0.0, 'clean': False}
+    
+    paper_share = paper_values.size / values.size
+    contrast = abs(float(paper_values.mean()) - float(ink_values.mean()))
+    bimodality = paper_share * (1 - paper_share) * contrast ** 2 / (float(values.var()) + 1e-6)
+    
+    inner = cv2.erode(background.astype(np.uint8), get_context().get_kernel(5))
+    noise = float(samples[inner > 0].std()) if inner.any() else 0.0
+    
+    gx = cv2.Sobel(values, cv2.CV_32F, 1, 0)
+    gy = cv2.Sobel(values, cv2.CV_32F, 0, 1)
+    magnitude = cv2.magnitude(gx, gy)
+    edges = magnitude[magnitude > 0.1 * contrast]
+    # A step edge of height c gives a Sobel magnitude of 4c
+    sharpness = float(np.percentile(edges, 90)) / (4 * contrast) if edges.size and contrast > 0 else 0.0
+    
+    _, _, stats, _ = cv2.connectedComponentsWithStats((~background).astype(np.uint8), connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    heights = heights[heights >= 3]
+    glyph_height = float(np.median(heights)) / scale if heights.size else 0.0
+    
+    limits = CLEAN_IMAGE_LIMITS
+    clean = (bimodality >= limits['min_bimodality'] and noise <= limits['max_noise']
+             and sharpness >= limits['min_sharpness'] and glyph_height >= limits['min_glyph_height'])
+    return {
+        'bimodality': round(float(bimodality), 3),
+        'noise': round(noise, 2),
+        'sharpness': round(sharpness, 3),
+        'glyph_height': round(glyph_height, 1),
+        'clean': bool(clean)
+    }
+
+
+def optimal_pipeline(image_input, binary=False, fast_path=True):
     """
     Best-practice pipeline for high-quality OCR.
     Combines all techniques for maximum accuracy.
     
+    Clean born-digital images (screenshots, renders) gain nothing from the
+    heavy stages, so with fast_path they are returned at native resolution
+    when assess_image_quality says so; only scans and photos go through
+    the full chain.
+    
     Order:
-    1. Deskew (straighten rotated text)
-    2. Enhance contrast (CLAHE)
-    3. Resize (2x magnification)
-    4. Denoise (remove artifacts)
-    5. Adaptive threshold (intelligent B&W)
-    6. Morphology cleanup (connect broken letters)
+    1. Orientation (fix sideways/upside-down pages)
+    2. Deskew (straighten rotated text)
+    3. Enhance contrast (CLAHE)
+    4. Resize (2x magnification)
+    5. Denoise (remove artifacts)
+    6. Adaptive threshold (intelligent B&W)
+    7. Morphology cleanup (connect broken letters)
     
     Args:
         image_input: PIL Image object or file path
+        binary: Return a 1-bit (mode '1') image instead of RGB
+        fast_path: Skip preprocessing for images that are already clean
     
     Returns:
         PIL Image: Fully optimized image
     """
-    # Step 1: Deskew
-    img = deskew_image(image_input)
-    
-    # Step 2: Enhance contrast
-    img = enhance_contrast(img)
+    from .pipeline import PreprocessingPipeline, OPTIMAL_STAGES
     
-    # Step 3: Preprocess with adaptive thresholding
-    img = preprocess_image(img, resize_scale=2.0, denoise=True, threshold_method='adaptive')
+    if fast_path:
+        if not isinstance(image_input, Image.Image):
+            image_input = Image.open(str(image_input))
+        if assess_image_quality(image_input)['clean']:
+            if binary:
+                return image_input.convert('L').point(lambda v: 255 if v > 127 else 0, mode='1')
+            return image_input.convert('RGB')
     
-    return img
+    return PreprocessingPipeline(OPTIMAL_STAGES).run(image_input, binary=binary)
 
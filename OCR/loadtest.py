@@ -0,0 +1,305 @@
+"""Load-testing harness for the OCR entry points and the Streamlit app."""
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import io
+import os
+import threading
+import time
+
+from ._lazy import lazy_import
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+np = lazy_import('numpy')
+
+
+def _target_extract_text(image):
+    from .text_extractor import extract_text
+    return extract_text(image)
+
+
+def _target_extract_with_confidence(image):
+    from .text_extractor import extract_text_with_confidence
+    return extract_text_with_confidence(image)
+
+
+def _target_extract_with_formatting(image):
+    from .text_extractor import extract_text_with_formatting
+    return extract_text_with_formatting(image)
+
+
+def _target_optimal(image):
+    from .image_preprocessor import optimal_pipeline
+    from .text_extractor import extract_text
+    return extract_text(optimal_pipeline(image), auto_orient=False)
+
+
+class _Upload(io.BytesIO):
+    """In-memory stand-in for Streamlit's UploadedFile."""
+
+    def __init__(self, data, name, mime='image/png'):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+        self.type = mime
+
+
+# Upload (bytes, name) for the app session running on the current thread
+_uploads = threading.local()
+_pending_uploads = {}
+
+
+def _fake_file_uploader(label, *args, accept_multiple_files=False, **kwargs):
+    """st.file_uploader replacement returning the current session's upload."""
+    current = getattr(_uploads, 'current', None)
+    if current is None:
+        return [] if accept_multiple_files else None
+    upload = _Upload(*current)
+    return [upload] if accept_multiple_files else upload
+
+
+# AppTest cannot drive st.file_uploader, so each session runs this wrapper:
+# it hands the page to the uploader on the script's own thread, then runs the app
+_APP_SCRIPT = """
+import runpy
+import streamlit as st
+import {module} as _loadtest
+
+_loadtest._uploads.current = _loadtest._pending_uploads[{token!r}]
+st.file_uploader = _loadtest._fake_file_uploader
+runpy.run_path({app_path!r}, run_name='__main__')
+"""
+
+
+def _target_app(image, app_path='app.py'):
+    # One simulated session: upload the page, then press 'Extract Text'
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        raise Exception("The 'app' target needs streamlit installed")
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    token = f'{os.getpid()}-{threading.get_ident()}-{time.perf_counter_ns()}'
+    _pending_uploads[token] = (buffer.getvalue(), 'page.png')
+    try:
+        at = AppTest.from_string(_APP_SCRIPT.format(module=__name__, token=token,
+                                                    app_path=os.path.abspath(app_path)),
+                                 default_timeout=60)
+        at.run()
+        buttons = [b for b in at.button if b.label == 'Extract Text']
+        if not buttons:
+            raise Exception("The app did not offer 'Extract Text' for the uploaded page")
+        buttons[0].click().run()
+    finally:
+        _pending_uploads.pop(token, None)
+    if at.exception:
+        raise Exception(str(at.exception[0].value))
+    if at.error:
+        raise Exception(str(at.error[0].value))
+    return at
+
+
+TARGETS = {
+    'extract_text': _target_extract_text,
+    'extract_text_with_confidence': _target_extract_with_confidence,
+    'extract_text_with_formatting': _target_extract_with_formatting,
+    'optimal': _target_optimal,
+    'app': _target_app,
+}
+
+
+def _descendants(pid):
+    """Process ids of every descendant of pid, from /proc (empty elsewhere)."""
+    children = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; ppid follows its closing ')'
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue  # exited while scanning
+        children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def _statm_rss(pid):
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def _rss_bytes():
+    """
+    Resident set size of this process plus its descendants (Tesseract
+    subprocesses, process-mode workers).
+
+    Reads Linux /proc; elsewhere falls back to the peak RSS of this process
+    and its waited-for children, or 0 where the resource module is missing.
+    """
+    try:
+        total = _statm_rss('self')
+    except (OSError, ValueError):
+        if resource is None:
+            return 0
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        unit = 1 if os.uname().sysname == 'Darwin' else 1024
+        return unit * (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                       + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    for pid in _descendants(os.getpid()):
+        try:
+            total += _statm_rss(pid)
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def _cpu_seconds():
+    # os.times works everywhere; child times are only filled in on POSIX
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class _RSSSampler(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append(_rss_bytes())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _timed_call(target, image):
+    """Run one request; returns (latency, error, CPU seconds used by this process meanwhile)."""
+    cpu_start = _cpu_seconds()
+    start = time.perf_counter()
+    error = None
+    try:
+        TARGETS[target](image)
+    except Exception as e:
+        error = str(e)
+    return time.perf_counter() - start, error, _cpu_seconds() - cpu_start
+
+
+def run_load_test(target='extract_text', clients=4, requests_per_client=5, images=None,
+                  mode='thread', sample_interval=0.1):
+    """
+    Drive an OCR entry point with N concurrent synthetic clients.
+
+    'thread' mode mirrors Streamlit, which serves every session from
+    threads of one server process; 'process' mode gives each client its
+    own process, like a pool of batch workers.
+
+    Args:
+        target: Name from TARGETS
+        clients: Concurrent clients
+        requests_per_client: Sequential requests each client sends
+        images: Input PIL Images (default: one synthetic page)
+        mode: 'thread' or 'process'
+        sample_interval: Seconds between RSS samples
+
+    Returns:
+        dict: Latency percentiles (seconds), throughput (requests/s), CPU
+              utilization (cores busy on average, including child processes),
+              RSS (MB, of this process and its child processes) and errors
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unknown load-test target: {target}")
+    if images is None:
+        from .synthetic import render_page
+        images = [render_page(seed=0)[0]]
+
+    jobs = [images[i % len(images)] for i in range(clients * requests_per_client)]
+    executor_class = ThreadPoolExecutor if mode == 'thread' else ProcessPoolExecutor
+    if mode == 'process':
+        from .ensemble import _process_context
+        executor_kwargs = {'mp_context': _process_context()}
+    else:
+        executor_kwargs = {}
+
+    sampler = _RSSSampler(sample_interval)
+    sampler.start()
+    cpu_start = _cpu_seconds()
+    wall_start = time.perf_counter()
+    with executor_class(max_workers=clients, **executor_kwargs) as executor:
+        outcomes = list(executor.map(_timed_call, [target] * len(jobs), jobs))
+    wall = time.perf_counter() - wall_start
+    cpu = _cpu_seconds() - cpu_start
+    sampler.stop()
+    if mode == 'process':
+        # Pool workers are not our waited-for children, so add what they reported
+        cpu += sum(worker_cpu for _, _, worker_cpu in outcomes)
+
+    latencies = np.array([latency for latency, error, _ in outcomes if error is None])
+    errors = [error for _, error, _ in outcomes if error is not None]
+    percentiles = (np.percentile(latencies, [50, 90, 95, 99]) if latencies.size
+                   else [float('nan')] * 4)
+    rss = sampler.samples or [_rss_bytes()]
+
+    return {
+        'target': target,
+        'mode': mode,
+        'clients': clients,
+        'requests': len(jobs),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'p50': float(percentiles[0]),
+        'p90': float(percentiles[1]),
+        'p95': float(percentiles[2]),
+        'p99': float(percentiles[3]),
+        'mean': float(latencies.mean()) if latencies.size else float('nan'),
+        'throughput': latencies.size / wall if wall > 0 else 0.0,
+        'wall_seconds': wall,
+        'cpu_utilization': cpu / wall if wall > 0 else 0.0,
+        'rss_mb_peak': max(rss) / 1e6,
+        'rss_mb_mean': float(np.mean(rss)) / 1e6,
+    }
+
+
+def main(argv=None):
+    """Run a load test: python -m OCR.loadtest --target extract_text --clients 1 2 4 8"""
+    import argparse
+    from PIL import Image
+
+    parser = argparse.ArgumentParser(description="Load-test the OCR entry points")
+    parser.add_argument('--target', default='extract_text', choices=sorted(TARGETS))
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 2, 4],
+                        help="Concurrency levels to run, one test each")
+    parser.add_argument('--requests', type=int, default=5, help="Requests per client")
+    parser.add_argument('--mode', default='thread', choices=['thread', 'process'])
+    parser.add_argument('--images', nargs='*', help="Input images (default: a synthetic page)")
+    args = parser.parse_args(argv)
+
+    images = [Image.open(path).convert('RGB') for path in args.images] if args.images else None
+    print(f"{'clients':>7} {'reqs':>5} {'err':>4} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'req/s':>7} {'cpu':>5} {'rss MB':>7}")
+    for clients in args.clients:
+        r = run_load_test(args.target, clients=clients, requests_per_client=args.requests,
+                          images=images, mode=args.mode)
+        print(f"{clients:>7} {r['requests']:>5} {r['errors']:>4} {r['p50']:>7.3f} {r['p95']:>7.3f} "
+              f"{r['p99']:>7.3f} {r['throughput']:>7.2f} {r['cpu_utilization']:>5.2f} {r['rss_mb_peak']:>7.1f}")
+        if r['first_error']:
+            print(f"        first error: {r['first_error']}")
+
+
+if __name__ == "__main__":
+    main()
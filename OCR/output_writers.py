@@ -0,0 +1,305 @@
+"""Streaming hOCR, ALTO XML and searchable-PDF writers built from OCR word boxes."""
+from io import BytesIO
+from itertools import groupby
+from xml.sax.saxutils import escape, quoteattr
+import zlib
+
+from PIL import Image
+
+
+def _open_sink(sink):
+    """Return (binary file object, should_close) for a path or file-like sink."""
+    if hasattr(sink, 'write'):
+        return sink, False
+    return open(sink, 'wb'), True
+
+
+def _page_words(words):
+    """Keep words that have text and a box, grouped into lines in reading order."""
+    words = [w for w in words if str(w.get('word', '')).strip() and w.get('box')]
+    return [list(line) for _, line in groupby(words, key=lambda w: w.get('line', (0, 0, 0)))]
+
+
+def _union_box(words):
+    lefts = [w['box'][0] for w in words]
+    tops = [w['box'][1] for w in words]
+    rights = [w['box'][0] + w['box'][2] for w in words]
+    bottoms = [w['box'][1] + w['box'][3] for w in words]
+    return min(lefts), min(tops), max(rights), max(bottoms)
+
+
+class _StreamingWriter:
+    """Base class: writes a header on open, one chunk per page, a footer on close."""
+
+    def __init__(self, sink):
+        self._file, self._owns_file = _open_sink(sink)
+        self.page_count = 0
+        self._write_header()
+
+    def _write(self, text):
+        self._file.write(text.encode('utf-8'))
+
+    def _write_header(self):
+        pass
+
+    def _write_footer(self):
+        pass
+
+    def add_page(self, words, width, height, image=None):
+        """
+        Append one page.
+
+        Args:
+            words: List of word dicts with 'word', 'confidence', 'box'
+                   (left, top, width, height) and optional 'line' ids, as
+                   returned in extract_text_with_confidence's words_with_confidence
+            width: Page image width in pixels
+            height: Page image height in pixels
+            image: Page image (PIL Image or file path); required by the PDF writer
+        """
+        raise NotImplementedError
+
+    def add_result(self, result, image=None):
+        """Append one page from an extract_text_with_confidence result."""
+        width, height = result['image_size']
+        self.add_page(result['words_with_confidence'], width, height, image=image)
+
+    def close(self):
+        """Write the footer and close the sink if this writer opened it."""
+        if self._file is None:
+            return
+        self._write_footer()
+        self._file.flush()
+        if self._owns_file:
+            self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class HOCRWriter(_StreamingWriter):
+    """Write OCR results as an hOCR (XHTML) document, one ocr_page per page."""
+
+    def _write_header(self):
+        self._write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" '
+            '"http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">\n'
+            '<head>\n'
+            '<title></title>\n'
+            '<meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>\n'
+            '<meta name="ocr-system" content="tesseract"/>\n'
+            '<meta name="ocr-capabilities" content="ocr_page ocr_line ocrx_word"/>\n'
+            '</head>\n<body>\n'
+        )
+
+    def _write_footer(self):
+        self._write('</body>\n</html>\n')
+
+    def add_page(self, words, width, height, image=None):
+        self.page_count += 1
+        page = self.page_count
+        # hOCR quotes the image name so names with spaces or ';' stay one property
+        image_name = image if isinstance(image, str) else ''
+        title = f'image "{image_name}"; bbox 0 0 {width} {height}; ppageno {page - 1}'
+        parts = [f'<div class="ocr_page" id="page_{page}" title={quoteattr(title)}>\n']
+
+        for line_no, line in enumerate(_page_words(words), start=1):
+            x0, y0, x1, y1 = _union_box(line)
+            parts.append(f'<span class="ocr_line" id="line_{page}_{line_no}" '
+                         f'title="bbox {x0} {y0} {x1} {y1}">')
+            for word_no, word in enumerate(line, start=1):
+                left, top, w, h = word['box']
+                parts.append(f'<span class="ocrx_word" id="word_{page}_{line_no}_{word_no}" '
+                             f'title="bbox {left} {top} {left + w} {top + h}; '
+                             f'x_wconf {int(word.get("confidence", 0))}">'
+                             f'{escape(str(word["word"]))}</span> ')
+            parts.append('</span>\n')
+
+        parts.append('</div>\n')
+        self._write(''.join(parts))
+
+
+class ALTOWriter(_StreamingWriter):
+    """Write OCR results as ALTO v4 XML, one Page element per page."""
+
+    def _write_header(self):
+        self._write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<alto xmlns="http://www.loc.gov/standards/alto/ns-v4#" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+            'xsi:schemaLocation="http://www.loc.gov/standards/alto/ns-v4# '
+            'http://www.loc.gov/alto/v4/alto-4-2.xsd">\n'
+            '<Description>\n<MeasurementUnit>pixel</MeasurementUnit>\n'
+            '<OCRProcessing ID="OCR_0"><ocrProcessingStep><processingSoftware>'
+            '<softwareName>tesseract</softwareName></processingSoftware>'
+            '</ocrProcessingStep></OCRProcessing>\n</Description>\n'
+            '<Layout>\n'
+        )
+
+    def _write_footer(self):
+        self._write('</Layout>\n</alto>\n')
+
+    def add_page(self, words, width, height, image=None):
+        self.page_count += 1
+        page = self.page_count
+        parts = [f'<Page ID="page_{page}" PHYSICAL_IMG_NR="{page}" WIDTH="{width}" HEIGHT="{height}">\n',
+                 f'<PrintSpace HPOS="0" VPOS="0" WIDTH="{width}" HEIGHT="{height}">\n']
+
+        lines = _page_words(words)
+        # Blocks are numbered in order rather than by block_num: words without
+        # line ids all share block 0, and a block_num can recur after another
+        blocks = groupby(enumerate(lines, start=1), key=lambda item: item[1][0].get('line', (0,))[0])
+        for block_no, (_, block) in enumerate(blocks, start=1):
+            block = list(block)
+            x0, y0, x1, y1 = _union_box([w for _, line in block for w in line])
+            parts.append(f'<TextBlock ID="block_{page}_{block_no}" HPOS="{x0}" VPOS="{y0}" '
+                         f'WIDTH="{x1 - x0}" HEIGHT="{y1 - y0}">\n')
+            for line_no, line in block:
+                x0, y0, x1, y1 = _union_box(line)
+                parts.append(f'<TextLine ID="line_{page}_{line_no}" HPOS="{x0}" VPOS="{y0}" '
+                             f'WIDTH="{x1 - x0}" HEIGHT="{y1 - y0}">')
+                for word_no, word in enumerate(line, start=1):
+                    if word_no > 1:
+                        parts.append('<SP/>')
+                    left, top, w, h = word['box']
+                    wc = max(0.0, min(1.0, float(word.get('confidence', 0)) / 100.0))
+                    parts.append(f'<String ID="string_{page}_{line_no}_{word_no}" '
+                                 f'HPOS="{left}" VPOS="{top}" WIDTH="{w}" HEIGHT="{h}" '
+                                 f'WC="{wc:.2f}" CONTENT={quoteattr(str(word["word"]))}/>')
+                parts.append('</TextLine>\n')
+            parts.append('</TextBlock>\n')
+
+        parts.append('</PrintSpace>\n</Page>\n')
+        self._write(''.join(parts))
+
+
+class SearchablePDFWriter(_StreamingWriter):
+    """
+    Write a searchable PDF: each page image with an invisible text layer.
+
+    Objects are streamed to the sink as pages are added; only the object
+    offsets and page references are kept in memory until close().
+    """
+
+    def __init__(self, sink, dpi=300, jpeg_quality=85):
+        self.dpi = dpi
+        self.jpeg_quality = jpeg_quality
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = 4  # 1: catalog, 2: page tree, 3: font
+        self._position = 0
+        super().__init__(sink)
+
+    def _write_bytes(self, data):
+        self._file.write(data)
+        self._position += len(data)
+
+    def _write_object(self, obj_id, body, stream=None):
+        self._offsets[obj_id] = self._position
+        self._write_bytes(f'{obj_id} 0 obj\n'.encode('latin-1'))
+        self._write_bytes(body)
+        if stream is not None:
+            self._write_bytes(b'\nstream\n' + stream + b'\nendstream')
+        self._write_bytes(b'\nendobj\n')
+
+    def _allocate(self, count):
+        first = self._next_id
+        self._next_id += count
+        return range(first, first + count)
+
+    def _write_header(self):
+        self._write_bytes(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._write_object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                              b'/Encoding /WinAnsiEncoding >>')
+
+    @staticmethod
+    def _pdf_string(text):
+        raw = str(text).encode('cp1252', errors='replace')
+        return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+    def add_page(self, words, width, height, image=None):
+        if image is None:
+            raise ValueError("SearchablePDFWriter needs the page image")
+
+        img = image if isinstance(image, Image.Image) else Image.open(image)
+        img = img.convert('L' if img.mode in ('1', 'L') else 'RGB')
+        if img.size != (width, height):
+            img = img.resize((width, height))
+        jpeg = BytesIO()
+        img.save(jpeg, format='JPEG', quality=self.jpeg_quality)
+        jpeg = jpeg.getvalue()
+
+        scale = 72.0 / self.dpi
+        page_w, page_h = width * scale, height * scale
+
+        # Invisible text (render mode 3), each word stretched to its box
+        content = [f'q {page_w:.2f} 0 0 {page_h:.2f} 0 0 cm /Im0 Do Q\nBT 3 Tr\n'.encode('latin-1')]
+        for line in _page_words(words):
+            for word in line:
+                left, top, w, h = word['box']
+                size = max(h * scale, 1.0)
+                text_width = max(len(str(word['word'])) * size * 0.5, 1e-3)
+                stretch = 100.0 * (w * scale) / text_width
+                x = left * scale
+                y = page_h - (top + h) * scale
+                content.append(f'/F1 {size:.2f} Tf {stretch:.1f} Tz 1 0 0 1 {x:.2f} {y:.2f} Tm '
+                               .encode('latin-1') + self._pdf_string(word['word']) + b' Tj\n')
+        content.append(b'ET\n')
+        content = zlib.compress(b''.join(content))
+
+        image_id, content_id, page_id = self._allocate(3)
+        colorspace = '/DeviceGray' if img.mode == 'L' else '/DeviceRGB'
+        self._write_object(image_id, (f'<< /Type /XObject /Subtype /Image /Width {width} /Height {height} '
+                                      f'/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /DCTDecode '
+                                      f'/Length {len(jpeg)} >>').encode('latin-1'), jpeg)
+        self._write_object(content_id, f'<< /Length {len(content)} /Filter /FlateDecode >>'.encode('latin-1'),
+                           content)
+        self._write_object(page_id, (f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_w:.2f} {page_h:.2f}] '
+                                     f'/Resources << /Font << /F1 3 0 R >> /XObject << /Im0 {image_id} 0 R >> >> '
+                                     f'/Contents {content_id} 0 R >>').encode('latin-1'))
+        self._page_ids.append(page_id)
+        self.page_count += 1
+
+    def _write_footer(self):
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        self._write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>'.encode('latin-1'))
+
+        xref_offset = self._position
+        size = self._next_id
+        xref = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        for obj_id in range(1, size):
+            xref.append(f'{self._offsets[obj_id]:010d} 00000 n \n')
+        self._write_bytes(''.join(xref).encode('latin-1'))
+        self._write_bytes(f'trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'
+                          .encode('latin-1'))
+
+
+OUTPUT_WRITERS = {
+    'hocr': HOCRWriter,
+    'alto': ALTOWriter,
+    'pdf': SearchablePDFWriter,
+}
+
+
+def open_writer(output_format, sink, **kwargs):
+    """
+    Open a streaming writer for the given format.
+
+    Args:
+        output_format: 'hocr', 'alto' or 'pdf'
+        sink: Output file path or binary file-like object
+        **kwargs: Extra writer options (e.g. dpi for 'pdf')
+
+    Returns:
+        Writer: Use add_page()/add_result() per page and close() (or a with block)
+    """
+    if output_format not in OUTPUT_WRITERS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return OUTPUT_WRITERS[output_format](sink, **kwargs)
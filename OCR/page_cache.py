@@ -0,0 +1,311 @@
+"""Near-duplicate page detection with perceptual hashes to reuse prior OCR results."""
+import json
+import threading
+import zlib
+
+from PIL import Image
+
+from ._lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+def _to_gray(image_input):
+    if isinstance(image_input, Image.Image):
+        return np.array(image_input.convert('L'))
+    if isinstance(image_input, np.ndarray):
+        return image_input if image_input.ndim == 2 else cv2.cvtColor(image_input, cv2.COLOR_BGR2GRAY)
+    gray = cv2.imread(str(image_input), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("Could not read image")
+    return gray
+
+
+def dhash(image_input, hash_size=16):
+    """
+    Difference hash: sign of horizontal gradients on a downsampled grayscale page.
+
+    Args:
+        image_input: PIL Image object, OpenCV array or file path
+        hash_size: Hash is hash_size x hash_size bits
+
+    Returns:
+        numpy.ndarray: Packed hash as a uint64 vector
+    """
+    gray = _to_gray(image_input)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return _pack(bits)
+
+
+def phash(image_input, hash_size=16, highfreq_factor=4):
+    """
+    DCT-based perceptual hash: low-frequency DCT coefficients above their median.
+
+    Args:
+        image_input: PIL Image object, OpenCV array or file path
+        hash_size: Hash is hash_size x hash_size bits
+        highfreq_factor: Downsample size is hash_size * highfreq_factor
+
+    Returns:
+        numpy.ndarray: Packed hash as a uint64 vector
+    """
+    gray = _to_gray(image_input)
+    size = hash_size * highfreq_factor
+    small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:hash_size, :hash_size]
+    bits = low > np.median(low[1:, 1:] if hash_size > 1 else low)
+    return _pack(bits)
+
+
+def page_signature(image_input):
+    """
+    Exact page identity: grayscale size plus a CRC-32 of its pixels.
+
+    Args:
+        image_input: PIL Image object, OpenCV array or file path
+
+    Returns:
+        tuple: (height, width, crc32)
+    """
+    gray = np.ascontiguousarray(_to_gray(image_input))
+    return (int(gray.shape[0]), int(gray.shape[1]), zlib.crc32(gray.data))
+
+
+def _pack(bits):
+    packed = np.packbits(bits.ravel())
+    padding = (-packed.size) % 8
+    if padding:
+        packed = np.concatenate([packed, np.zeros(padding, dtype=np.uint8)])
+    return packed.view(np.uint64)
+
+
+def _popcount(values):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    return table[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+
+HASH_FUNCTIONS = {
+    'dhash': dhash,
+    'phash': phash,
+}
+
+
+class PerceptualHashIndex:
+    """
+    Index of page hashes and their OCR results for near-duplicate lookup.
+
+    Hashes live in one contiguous (n, words) uint64 array that grows by
+    doubling, so a lookup is a single vectorized XOR + popcount over every
+    stored page.
+
+    Any stored page within max_distance counts as the same page, so
+    re-encoded, rescaled or lightly noisy copies reuse a result. A
+    perceptual hash only sees the layout at low resolution, though: pages
+    of one form that differ in a few digits hash identically. For such
+    inputs pass regions covering the filled-in fields, which are compared
+    pixel by pixel before a hit counts, or verify=True to reuse results
+    only for pixel-identical pages.
+    """
+
+    def __init__(self, method='phash', hash_size=16, max_distance=None, regions=None,
+                 region_tolerance=48, verify=False):
+        """
+        Args:
+            method: 'phash' or 'dhash'
+            hash_size: Hash is hash_size x hash_size bits
+            max_distance: Largest Hamming distance counted as the same page
+                          (default: 2% of the hash bits)
+            regions: Optional (x, y, width, height) boxes as fractions of
+                     the page that must also match for a hit
+            region_tolerance: Largest per-pixel difference (0-255, after a
+                              3x3 blur) allowed inside a region
+            verify: Only reuse results for pixel-identical pages (exact
+                    size and pixel checksum)
+        """
+        if method not in HASH_FUNCTIONS:
+            raise ValueError(f"Unknown hash method: {method}")
+        self.method = method
+        self.hash_size = hash_size
+        self.bits = hash_size * hash_size
+        self.max_distance = max_distance if max_distance is not None else int(self.bits * 0.02)
+        self.regions = [tuple(region) for region in regions] if regions else []
+        self.region_tolerance = region_tolerance
+        self.verify = verify
+        self._words = (self.bits + 63) // 64
+        self._hashes = None
+        self._results = []
+        self._signatures = []
+        self._region_pixels = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._results)
+
+    def compute_hash(self, image_input):
+        """Hash a page with this index's method and size."""
+        return HASH_FUNCTIONS[self.method](image_input, hash_size=self.hash_size)
+
+    def page_key(self, image_input):
+        """
+        Compute everything lookup() and add() compare, decoding the page once.
+
+        Returns:
+            dict: page_hash, signature (when verifying) and regions (when
+                  configured), to pass as keyword arguments
+        """
+        gray = _to_gray(image_input)
+        return {
+            'page_hash': self.compute_hash(gray),
+            'signature': page_signature(gray) if self.verify else None,
+            'regions': self._crop_regions(gray) if self.regions else None
+        }
+
+    def _crop_regions(self, image_input):
+        gray = _to_gray(image_input)
+        height, width = gray.shape
+        crops = []
+        for x, y, w, h in self.regions:
+            left, top = int(x * width), int(y * height)
+            crop = gray[top:max(int((y + h) * height), top + 1), left:max(int((x + w) * width), left + 1)]
+            crops.append(cv2.GaussianBlur(crop, (3, 3), 0))
+        return crops
+
+    def _regions_match(self, stored, regions):
+        for old, new in zip(stored, regions):
+            if new.shape != old.shape:
+                new = cv2.resize(new, (old.shape[1], old.shape[0]), interpolation=cv2.INTER_AREA)
+            if cv2.absdiff(old, new).max() > self.region_tolerance:
+                return False
+        return True
+
+    def lookup(self, image_input=None, page_hash=None, signature=None, regions=None):
+        """
+        Find the closest stored page.
+
+        Args:
+            image_input: Page to look up (ignored for whatever page_hash,
+                         signature and regions are given)
+            page_hash: Precomputed hash from compute_hash()
+            signature: Precomputed page_signature(), when verifying
+            regions: Precomputed region crops (see page_key)
+
+        Returns:
+            tuple: (result, similarity) for the nearest page within
+                   max_distance whose regions (and, when verifying,
+                   signature) also match, or (None, best similarity or 0.0)
+        """
+        if page_hash is None:
+            page_hash = self.compute_hash(image_input)
+        if self.verify and signature is None:
+            signature = page_signature(image_input)
+        if self.regions and regions is None:
+            regions = self._crop_regions(image_input)
+
+        with self._lock:
+            count = len(self._results)
+            if count == 0:
+                return None, 0.0
+            distances = _popcount(self._hashes[:count] ^ page_hash).sum(axis=1)
+            similarity = 1.0 - int(distances.min()) / self.bits
+            candidates = np.flatnonzero(distances <= self.max_distance)
+            for index in candidates[np.argsort(distances[candidates], kind='stable')]:
+                if self.verify and self._signatures[index] != tuple(signature):
+                    continue
+                if self.regions and not self._regions_match(self._region_pixels[index], regions):
+                    continue
+                return self._results[index], 1.0 - int(distances[index]) / self.bits
+        return None, similarity
+
+    def add(self, image_input=None, result=None, page_hash=None, signature=None, regions=None):
+        """Store a page's OCR result under its hash (and signature and regions, when used)."""
+        if page_hash is None:
+            page_hash = self.compute_hash(image_input)
+        if self.verify and signature is None:
+            signature = page_signature(image_input)
+        if self.regions and regions is None:
+            regions = self._crop_regions(image_input)
+
+        with self._lock:
+            count = len(self._results)
+            if self._hashes is None or count == len(self._hashes):
+                capacity = max(16, count * 2)
+                grown = np.zeros((capacity, self._words), dtype=np.uint64)
+                if self._hashes is not None:
+                    grown[:count] = self._hashes[:count]
+                self._hashes = grown
+            self._hashes[count] = page_hash
+            self._results.append(result)
+            self._signatures.append(tuple(signature) if signature is not None else None)
+            self._region_pixels.append(regions)
+
+    def get_or_compute(self, image_input, compute):
+        """
+        Return a stored result for a near-identical page, or compute and store one.
+
+        Args:
+            image_input: Page image
+            compute: Callable taking the page and returning its OCR result
+
+        Returns:
+            tuple: (result, reused) where reused tells whether OCR was skipped
+        """
+        key = self.page_key(image_input)
+        result, _ = self.lookup(**key)
+        if result is not None:
+            return result, True
+
+        result = compute(image_input)
+        self.add(result=result, **key)
+        return result, False
+
+    def save(self, path):
+        """Save hashes, region crops and JSON-serializable results to an .npz file."""
+        with self._lock:
+            count = len(self._results)
+            hashes = self._hashes[:count] if count else np.zeros((0, self._words), dtype=np.uint64)
+            # Region crops vary in size, so they are stored as one flat buffer plus shapes
+            crops = [crop for regions in self._region_pixels if regions for crop in regions]
+            meta = json.dumps({
+                'method': self.method,
+                'hash_size': self.hash_size,
+                'max_distance': self.max_distance,
+                'regions': self.regions,
+                'region_tolerance': self.region_tolerance,
+                'verify': self.verify,
+                'results': self._results,
+                'signatures': self._signatures,
+                'region_shapes': [crop.shape for crop in crops]
+            })
+            pixels = np.concatenate([crop.ravel() for crop in crops]) if crops else np.zeros(0, dtype=np.uint8)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, hashes=hashes, regions=pixels,
+                                meta=np.frombuffer(meta.encode('utf-8'), dtype=np.uint8))
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save()."""
+        with np.load(path) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            hashes = data['hashes']
+            pixels = data['regions'] if 'regions' in data.files else None
+        index = cls(method=meta['method'], hash_size=meta['hash_size'], max_distance=meta['max_distance'],
+                    regions=meta.get('regions'), region_tolerance=meta.get('region_tolerance', 48),
+                    verify=meta.get('verify', False))
+        signatures = meta.get('signatures') or [None] * len(meta['results'])
+        shapes = iter(meta.get('region_shapes', []))
+        offset = 0
+        for page_hash, result, signature in zip(hashes, meta['results'], signatures):
+            regions = None
+            if index.regions:
+                regions = []
+                for _ in index.regions:
+                    shape = tuple(next(shapes))
+                    size = shape[0] * shape[1]
+                    regions.append(pixels[offset:offset + size].reshape(shape))
+                    offset += size
+            index.add(result=result, page_hash=page_hash, signature=signature, regions=regions)
+        return index
@@ -0,0 +1,401 @@
+"""Declarative preprocessing pipelines with memoized intermediate stages."""
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+from PIL import Image
+
+from ._lazy import lazy_import
+from .image_preprocessor import get_context, detect_orientation, _deskew_array
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+def _op_orient(img, max_side=1200):
+    """Rotate sideways/upside-down pages upright (np.rot90 is counter-clockwise)."""
+    rotate = detect_orientation(img, max_side=max_side)['rotate']
+    return np.ascontiguousarray(np.rot90(img, k=-(rotate // 90))) if rotate else img
+
+
+def _op_deskew(img):
+    return _deskew_array(img)
+
+
+def _op_clahe(img, clip_limit=3.0, tile_size=8):
+    clahe = get_context().get_clahe(clip_limit=clip_limit, tile_size=tile_size)
+    if img.ndim == 2:
+        return clahe.apply(img)
+    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab)
+    return cv2.cvtColor(cv2.merge([clahe.apply(l), a, b]), cv2.COLOR_LAB2BGR)
+
+
+def _op_resize(img, scale=2.0):
+    height, width = img.shape[:2]
+    return cv2.resize(img, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_CUBIC)
+
+
+def _op_denoise(img, h=10, h_color=10, template_window=7, search_window=21):
+    if img.ndim == 2:
+        return cv2.fastNlMeansDenoising(img, None, h=h, templateWindowSize=template_window,
+                                        searchWindowSize=search_window)
+    return cv2.fastNlMeansDenoisingColored(img, None, h=h, hColor=h_color,
+                                           templateWindowSize=template_window,
+                                           searchWindowSize=search_window)
+
+
+def _op_grayscale(img):
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def _local_mean_std(gray, window):
+    """
+    Mean and standard deviation of every pixel's window x window neighbourhood.
+
+    Uses integral images of the values and their squares, so the cost per
+    pixel is four lookups whatever the window size. Windows are clipped at
+    the image border.
+    """
+    height, width = gray.shape
+    radius = window // 2
+    total, total_sq = cv2.integral2(gray, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    rows = np.arange(height)
+    cols = np.arange(width)
+    area = ((np.minimum(rows + radius + 1, height) - np.maximum(rows - radius, 0))[:, None]
+            * (np.minimum(cols + radius + 1, width) - np.maximum(cols - radius, 0))[None, :])
+
+    def window_sum(integral):
+        # Edge padding clamps the window corners to the image, and turns the
+        # four corner lookups into shifted views instead of gathers
+        padded = np.pad(integral, radius + 1, mode='edge')
+        low, high = slice(1, 1 + height), slice(2 * radius + 2, 2 * radius + 2 + height)
+        left, right = slice(1, 1 + width), slice(2 * radius + 2, 2 * radius + 2 + width)
+        result = padded[high, right] - padded[low, right]
+        result -= padded[high, left]
+        result += padded[low, left]
+        return result
+
+    mean = window_sum(total) / area
+    variance = window_sum(total_sq)
+    variance /= area
+    variance -= mean * mean
+    np.maximum(variance, 0, out=variance)
+    return mean.astype(np.float32), np.sqrt(variance, out=variance).astype(np.float32)
+
+
+def _local_threshold(gray, method, window, k, dynamic_range=128.0, dst=None):
+    """Sauvola or Niblack binarization: white where a pixel is above its local threshold."""
+    mean, std = _local_mean_std(gray, window)
+    if method == 'sauvola':
+        threshold = mean * (1 + k * (std / dynamic_range - 1))
+    else:
+        threshold = mean + k * std
+    return cv2.compare(gray.astype(np.float32), threshold, cv2.CMP_GT, dst=dst)
+
+
+# Default k per local method (Sauvola's and Niblack's papers)
+LOCAL_THRESHOLD_K = {'sauvola': 0.2, 'niblack': -0.2}
+
+
+def _op_threshold(img, method='adaptive', block_size=11, c=2, value=150, window=31, k=None, dst=None):
+    gray = _op_grayscale(img)
+    if gray is not img:
+        dst = gray  # fresh buffer from the color conversion
+    if method in LOCAL_THRESHOLD_K:
+        return _local_threshold(gray, method, window, LOCAL_THRESHOLD_K[method] if k is None else k, dst=dst)
+    if method == 'adaptive':
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                     cv2.THRESH_BINARY, blockSize=block_size, C=c, dst=dst)
+    if method == 'otsu':
+        return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=dst)[1]
+    return cv2.threshold(gray, value, 255, cv2.THRESH_BINARY, dst=dst)[1]
+
+
+def _morphology_passes(operations, iterations):
+    """
+    Expand close/open into (dilate|erode, iterations) passes, merging neighbours.
+
+    Close+open is dilate, erode, erode, dilate; the two middle erosions
+    become one erode(iterations=2) pass, which OpenCV runs as a single
+    pass with a grown kernel when the kernel is rectangular.
+    """
+    expanded = {
+        'close': ['dilate', 'erode'],
+        'open': ['erode', 'dilate'],
+        'dilate': ['dilate'],
+        'erode': ['erode'],
+    }
+    passes = []
+    for operation in operations:
+        for primitive in expanded[operation]:
+            if passes and passes[-1][0] == primitive:
+                passes[-1][1] += iterations
+            else:
+                passes.append([primitive, iterations])
+    return passes
+
+
+def _op_morphology(img, operations=('close', 'open'), kernel_size=2, iterations=1, dst=None):
+    kernel = get_context().get_kernel(kernel_size)
+    primitives = {'dilate': cv2.dilate, 'erode': cv2.erode}
+    for primitive, count in _morphology_passes(operations, iterations):
+        # OpenCV dilate/erode may run with dst aliasing src
+        img = primitives[primitive](img, kernel, dst=dst, iterations=count)
+        dst = img
+    return img
+
+
+# Cheap per-pixel stages that can write into their input buffer. They are
+# not memoized: recomputing them costs less than caching another page copy.
+INPLACE_OPERATIONS = {'threshold', 'morphology'}
+
+
+STAGE_OPERATIONS = {
+    'orient': _op_orient,
+    'deskew': _op_deskew,
+    'clahe': _op_clahe,
+    'resize': _op_resize,
+    'denoise': _op_denoise,
+    'grayscale': _op_grayscale,
+    'threshold': _op_threshold,
+    'morphology': _op_morphology,
+}
+
+
+class StageCache:
+    """
+    Thread-safe LRU cache of intermediate stage outputs, bounded by bytes.
+
+    Cached arrays are made read-only so a later stage can never modify an
+    image another pipeline run will reuse.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if value.nbytes > self.max_bytes:
+            return
+        value.flags.writeable = False
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            self._bytes += value.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# Off until enable_stage_cache(): one-pass callers such as batch workers
+# would otherwise each hold up to max_bytes of page copies they never reuse
+_stage_cache = None
+
+
+def enable_stage_cache(max_bytes=256 * 1024 * 1024):
+    """
+    Turn on the process-wide stage cache used when run() gets no cache.
+
+    Worth it where one page is re-run with different settings, as in the
+    GUI and web app. Calling again with the same size keeps the cache.
+
+    Returns:
+        StageCache: The process-wide cache
+    """
+    global _stage_cache
+    if _stage_cache is None or _stage_cache.max_bytes != max_bytes:
+        _stage_cache = StageCache(max_bytes)
+    return _stage_cache
+
+
+def disable_stage_cache():
+    """Turn off the process-wide stage cache and free its entries."""
+    global _stage_cache
+    _stage_cache = None
+
+
+def get_stage_cache():
+    """Return the process-wide stage cache, or None while it is disabled."""
+    return _stage_cache
+
+
+def _hash_array(img):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str((img.shape, img.dtype.str)).encode())
+    digest.update(np.ascontiguousarray(img).data)
+    return digest.hexdigest()
+
+
+def _stage_key(parent_key, stage):
+    canonical = json.dumps(stage, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b((parent_key + canonical).encode(), digest_size=16).hexdigest()
+
+
+class PreprocessingPipeline:
+    """
+    Ordered list of preprocessing stage specs, e.g.
+    [{'op': 'resize', 'scale': 2.0}, {'op': 'threshold', 'method': 'otsu'}].
+
+    Each stage's output is memoized by the hash of the input image plus the
+    specs of every stage up to it, so re-running with only a later stage
+    changed (e.g. the threshold) reuses the cached front of the chain.
+    The uint8 threshold/morphology tail is not memoized and reuses a single
+    buffer instead of allocating one per step.
+    """
+
+    def __init__(self, stages):
+        self.stages = [dict(stage) for stage in stages]
+        for stage in self.stages:
+            if stage.get('op') not in STAGE_OPERATIONS:
+                raise ValueError(f"Unknown pipeline stage: {stage.get('op')}")
+
+    def to_json(self):
+        """Serialize the stage specs to JSON."""
+        return json.dumps(self.stages)
+
+    @classmethod
+    def from_json(cls, spec):
+        """Build a pipeline from a JSON string produced by to_json()."""
+        return cls(json.loads(spec))
+
+    def run_array(self, img, cache=None):
+        """
+        Run the pipeline on an OpenCV (BGR or grayscale) array.
+
+        Args:
+            img: Input array
+            cache: StageCache to use (default: the process-wide cache if
+                   enable_stage_cache() was called, False to disable)
+
+        Returns:
+            numpy.ndarray: Output of the last stage
+        """
+        if cache is None:
+            cache = _stage_cache
+
+        key = _hash_array(img) if cache else None
+        start = 0
+
+        if cache:
+            # Find the longest already-computed prefix of the chain
+            keys = []
+            for stage in self.stages:
+                key = _stage_key(key, stage)
+                keys.append(key)
+            for index in range(len(keys) - 1, -1, -1):
+                if self.stages[index]['op'] in INPLACE_OPERATIONS:
+                    continue
+                cached = cache.get(keys[index])
+                if cached is not None:
+                    img, start = cached, index + 1
+                    break
+
+        # Only buffers this run allocated may be overwritten, never the
+        # caller's input or an array shared through the cache
+        owned = False
+        caller = img if start == 0 else None
+        for index in range(start, len(self.stages)):
+            op = self.stages[index]['op']
+            params = {k: v for k, v in self.stages[index].items() if k != 'op'}
+            if op in INPLACE_OPERATIONS and owned and img.dtype == np.uint8 and img.ndim == 2:
+                params['dst'] = img
+            result = STAGE_OPERATIONS[op](img, **params)
+            if result is not img:
+                owned = True
+            img = result
+            if cache and op not in INPLACE_OPERATIONS:
+                # The cache freezes what it stores; a stage that passed the
+                # caller's array through unchanged caches a copy instead
+                cache.put(keys[index], img.copy() if img is caller else img)
+                owned = False
+
+        return img
+
+    def run(self, image_input, cache=None, binary=False):
+        """
+        Run the pipeline on a PIL Image or file path.
+
+        Args:
+            image_input: PIL Image object or file path
+            cache: StageCache to use (default: the process-wide cache if
+                   enable_stage_cache() was called, False to disable)
+            binary: Return a 1-bit image (mode '1', 1/24 the size of RGB) when
+                    the pipeline ends in a single-channel image
+
+        Returns:
+            PIL Image: Processed RGB image, or mode '1' image if binary
+        """
+        if isinstance(image_input, Image.Image):
+            img = cv2.cvtColor(np.array(image_input.convert('RGB')), cv2.COLOR_RGB2BGR)
+        else:
+            img = cv2.imread(str(image_input))
+
+        if img is None:
+            raise ValueError("Could not read image")
+
+        result = self.run_array(img, cache=cache)
+        if binary and result.ndim == 2:
+            return Image.fromarray(result > 127)
+        if result.ndim == 2:
+            return Image.fromarray(result).convert('RGB')
+        return Image.fromarray(cv2.cvtColor(result, cv2.COLOR_BGR2RGB))
+
+
+def build_stages(resize_scale=2.0, denoise=True, threshold_method='adaptive', threshold_value=150):
+    """
+    Build the standard resize -> denoise -> gray -> threshold -> morphology chain.
+
+    Args:
+        resize_scale: Scale factor for resizing
+        denoise: Apply denoising filter
+        threshold_method: 'adaptive', 'otsu', 'sauvola', 'niblack' or 'fixed'
+        threshold_value: Threshold used by the 'fixed' method
+
+    Returns:
+        list: Stage specs for PreprocessingPipeline
+    """
+    stages = [{'op': 'resize', 'scale': resize_scale}]
+    if denoise:
+        stages.append({'op': 'denoise', 'h': 10, 'h_color': 10, 'template_window': 7, 'search_window': 21})
+    stages.append({'op': 'grayscale'})
+    if threshold_method == 'adaptive':
+        stages.append({'op': 'threshold', 'method': 'adaptive', 'block_size': 11, 'c': 2})
+    elif threshold_method == 'otsu':
+        stages.append({'op': 'threshold', 'method': 'otsu'})
+    elif threshold_method in LOCAL_THRESHOLD_K:
+        stages.append({'op': 'threshold', 'method': threshold_method, 'window': 31,
+                       'k': LOCAL_THRESHOLD_K[threshold_method]})
+    else:
+        stages.append({'op': 'threshold', 'method': 'fixed', 'value': threshold_value})
+    stages.append({'op': 'morphology', 'operations': ['close', 'open'], 'kernel_size': 2, 'iterations': 1})
+    return stages
+
+
+OPTIMAL_STAGES = (
+    [{'op': 'orient', 'max_side': 1200}, {'op': 'deskew'}, {'op': 'clahe', 'clip_limit': 3.0, 'tile_size': 8}]
+    + build_stages(resize_scale=2.0, denoise=True, threshold_method='adaptive')
+)
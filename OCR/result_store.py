@@ -0,0 +1,424 @@
+"""Append-only, memory-mapped on-disk store for batch OCR results."""
+import hashlib
+import mmap
+import os
+import re
+
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+DOC_DTYPE = [
+    ('text_offset', '<u8'),
+    ('text_length', '<u4'),
+    ('word_offset', '<u8'),
+    ('word_count', '<u4'),
+    ('average_confidence', '<f4'),
+    ('id_offset', '<u8'),  # byte offset of the document id in ids.txt
+    ('id_length', '<u2'),
+    ('id_hash', '<u8'),  # see _id_hash
+]
+
+WORD_DTYPE = [
+    ('left', '<i4'),
+    ('top', '<i4'),
+    ('width', '<i4'),
+    ('height', '<i4'),
+    ('confidence', '<f4'),
+    ('block_num', '<u2'),
+    ('par_num', '<u2'),
+    ('line_num', '<u2'),
+    ('char_offset', '<u4'),  # byte offset of the word in its page's UTF-8 text
+    ('char_length', '<u2'),
+]
+
+# Bytes of page text decoded at a time by case-insensitive Unicode search
+SEARCH_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Ids appended since the sorted id index was built are looked up in a dict;
+# past this many the index is rebuilt
+RECENT_IDS = 16384
+
+
+def _id_hash(doc_id):
+    return int.from_bytes(hashlib.blake2b(doc_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class ResultStore:
+    """
+    Columnar result store for millions of pages.
+
+    A store is a directory of four append-only files:
+
+    - text.bin: every page's UTF-8 text, concatenated
+    - words.bin: fixed-size word records (box, confidence, line ids, text span)
+    - docs.bin: one fixed-size record per page pointing into the files
+      above and ids.txt, plus a 64-bit hash of the page's id
+    - ids.txt: document ids, one per line, in docs.bin order
+
+    Readers memory-map all four files, so lookups and full-text search
+    never load the whole store into RAM: ids are read through their docs
+    offsets, and an id is found by binary search over the sorted id
+    hashes (16 bytes per page). A page is committed once its docs record
+    and id are written; partial trailing writes from a crash are ignored
+    on open.
+    """
+
+    def __init__(self, path, readonly=False):
+        """
+        Args:
+            path: Store directory (created if missing unless readonly)
+            readonly: Open for queries only
+        """
+        self.path = path
+        self.readonly = readonly
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+
+        self._doc_dtype = np.dtype(DOC_DTYPE)
+        self._word_dtype = np.dtype(WORD_DTYPE)
+        self._maps = {}
+        self._mapped_docs = -1
+        self._count_committed()
+
+        self._text_file = self._words_file = self._docs_file = self._ids_file = None
+        if not readonly:
+            self._recover()
+            self._text_file = open(self._file('text.bin'), 'ab')
+            self._words_file = open(self._file('words.bin'), 'ab')
+            self._docs_file = open(self._file('docs.bin'), 'ab')
+            self._ids_file = open(self._file('ids.txt'), 'ab')
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _count_committed(self):
+        """Count the pages whose docs record and id both made it to disk."""
+        docs_path, ids_path = self._file('docs.bin'), self._file('ids.txt')
+        count = os.path.getsize(docs_path) // self._doc_dtype.itemsize if os.path.exists(docs_path) else 0
+        ids_size = os.path.getsize(ids_path) if os.path.exists(ids_path) else 0
+        if count:
+            with open(docs_path, 'rb') as f:
+                # Only the last record can lack its id: ids are written one page at a time
+                f.seek((count - 1) * self._doc_dtype.itemsize)
+                last = np.frombuffer(f.read(self._doc_dtype.itemsize), dtype=self._doc_dtype)[0]
+            if int(last['id_offset']) + int(last['id_length']) + 1 > ids_size:
+                count -= 1
+        self._count = count
+        self._recent = {}
+        self._hash_order = self._sorted_hashes = None
+
+    def _recover(self):
+        """Truncate data past the last committed page (e.g. after a crash)."""
+        for name in ('text.bin', 'words.bin', 'docs.bin', 'ids.txt'):
+            open(self._file(name), 'ab').close()
+
+        count = self._count
+        docs_path = self._file('docs.bin')
+        with open(docs_path, 'r+b') as f:
+            f.truncate(count * self._doc_dtype.itemsize)
+        text_end = word_end = ids_end = 0
+        if count:
+            with open(docs_path, 'rb') as f:
+                f.seek((count - 1) * self._doc_dtype.itemsize)
+                last = np.frombuffer(f.read(self._doc_dtype.itemsize), dtype=self._doc_dtype)[0]
+            text_end = int(last['text_offset'] + last['text_length'])
+            word_end = int(last['word_offset'] + last['word_count'])
+            ids_end = int(last['id_offset'] + last['id_length']) + 1
+        with open(self._file('text.bin'), 'r+b') as f:
+            f.truncate(text_end)
+        with open(self._file('words.bin'), 'r+b') as f:
+            f.truncate(word_end * self._word_dtype.itemsize)
+        # Cut ids.txt after the committed ids rather than rewriting it, so a
+        # crash during recovery cannot lose the ids already on disk
+        with open(self._file('ids.txt'), 'r+b') as f:
+            f.truncate(ids_end)
+
+    def refresh(self):
+        """Pick up pages appended by another process (for read-only stores)."""
+        self._close_maps()
+        self._mapped_docs = -1
+        self._count_committed()
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, doc_id):
+        return self._find(str(doc_id)) is not None
+
+    def _id(self, row):
+        doc = self._docs()[row]
+        start = int(doc['id_offset'])
+        return self._map('ids.txt')[start:start + int(doc['id_length'])].decode('utf-8')
+
+    def ids(self):
+        """Return all document ids in insertion order."""
+        if not self._count:
+            return []
+        end = int(self._docs()[-1]['id_offset'] + self._docs()[-1]['id_length'])
+        return self._map('ids.txt')[:end].decode('utf-8').split('\n')
+
+    def _find(self, doc_id):
+        """Return the row of doc_id, or None if it is not stored."""
+        row = self._recent.get(doc_id)
+        if row is not None:
+            return row
+        if self._hash_order is None:
+            # Sort the id hashes of every page; later appends go to _recent
+            hashes = self._docs()['id_hash']
+            self._hash_order = np.argsort(hashes, kind='stable')
+            self._sorted_hashes = hashes[self._hash_order]
+            self._recent = {}
+        target = _id_hash(doc_id)
+        position = int(np.searchsorted(self._sorted_hashes, target))
+        while position < len(self._sorted_hashes) and int(self._sorted_hashes[position]) == target:
+            row = int(self._hash_order[position])
+            if self._id(row) == doc_id:
+                return row
+            position += 1
+        return None
+
+    def append(self, doc_id, result):
+        """
+        Append one page's result.
+
+        Args:
+            doc_id: Unique document/page id (no newlines)
+            result: extract_text_with_confidence result dict, or plain text
+        """
+        if self.readonly:
+            raise ValueError("Result store is read-only")
+        doc_id = str(doc_id)
+        if '\n' in doc_id:
+            raise ValueError("Document ids cannot contain newlines")
+        encoded_id = doc_id.encode('utf-8')
+        if len(encoded_id) > np.iinfo(np.uint16).max:
+            raise ValueError("Document id is too long")
+        if self._find(doc_id) is not None:
+            raise ValueError(f"Document already stored: {doc_id}")
+
+        if isinstance(result, str):
+            result = {'text': result}
+        words = result.get('words_with_confidence') or []
+
+        records = np.zeros(len(words), dtype=self._word_dtype)
+        if words:
+            # Page text is the space-joined words, so every word's byte span is known
+            parts = []
+            offset = 0
+            for i, word in enumerate(words):
+                encoded = str(word['word']).encode('utf-8')
+                left, top, width, height = word.get('box') or (word['position'][0], word['position'][1], 0, 0)
+                block_num, par_num, line_num = word.get('line', (0, 0, 0))
+                records[i] = (left, top, width, height, word['confidence'],
+                              block_num, par_num, line_num, offset, len(encoded))
+                parts.append(encoded)
+                offset += len(encoded) + 1
+            text = b' '.join(parts)
+        else:
+            text = str(result.get('text', '')).encode('utf-8')
+
+        text_offset = self._text_file.tell()
+        word_offset = self._words_file.tell() // self._word_dtype.itemsize
+        self._text_file.write(text)
+        self._words_file.write(records.tobytes())
+
+        doc = np.array([(text_offset, len(text), word_offset, len(words),
+                         result.get('average_confidence', 0.0),
+                         self._ids_file.tell(), len(encoded_id), _id_hash(doc_id))], dtype=self._doc_dtype)
+        # Commit: data first, then the docs record, then the id
+        self._text_file.flush()
+        self._words_file.flush()
+        self._docs_file.write(doc.tobytes())
+        self._docs_file.flush()
+        self._ids_file.write(encoded_id + b'\n')
+        self._ids_file.flush()
+
+        self._recent[doc_id] = self._count
+        self._count += 1
+        if len(self._recent) > RECENT_IDS:
+            self._hash_order = self._sorted_hashes = None
+
+    def _map(self, name):
+        if self._mapped_docs != self._count:
+            self._close_maps()
+            self._mapped_docs = self._count
+        if name not in self._maps:
+            path = self._file(name)
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                return None
+            with open(path, 'rb') as f:
+                self._maps[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[name]
+
+    def _docs(self):
+        buffer = self._map('docs.bin')
+        if buffer is None:
+            return np.zeros(0, dtype=self._doc_dtype)
+        return np.frombuffer(buffer, dtype=self._doc_dtype, count=self._count)
+
+    def _row(self, doc_id):
+        row = self._find(doc_id)
+        if row is None:
+            raise KeyError(doc_id)
+        return self._docs()[row]
+
+    def get_text(self, doc_id):
+        """Return a page's text."""
+        doc = self._row(doc_id)
+        start = int(doc['text_offset'])
+        buffer = self._map('text.bin')
+        if buffer is None:
+            return ''
+        return buffer[start:start + int(doc['text_length'])].decode('utf-8')
+
+    def get_words(self, doc_id):
+        """Return a page's word records as a read-only structured array (no copy)."""
+        doc = self._row(doc_id)
+        buffer = self._map('words.bin')
+        if buffer is None or int(doc['word_count']) == 0:
+            return np.zeros(0, dtype=self._word_dtype)
+        return np.frombuffer(buffer, dtype=self._word_dtype, count=int(doc['word_count']),
+                             offset=int(doc['word_offset']) * self._word_dtype.itemsize)
+
+    def get(self, doc_id):
+        """
+        Return a page in the same shape as extract_text_with_confidence.
+
+        Returns:
+            dict: text, words_with_confidence and average_confidence
+        """
+        doc = self._row(doc_id)
+        text = self.get_text(doc_id)
+        encoded = text.encode('utf-8')
+        words = []
+        for record in self.get_words(doc_id):
+            start = int(record['char_offset'])
+            words.append({
+                'word': encoded[start:start + int(record['char_length'])].decode('utf-8'),
+                'confidence': int(record['confidence']),
+                'position': (int(record['left']), int(record['top'])),
+                'box': (int(record['left']), int(record['top']), int(record['width']), int(record['height'])),
+                'line': (int(record['block_num']), int(record['par_num']), int(record['line_num']))
+            })
+        return {
+            'text': text,
+            'words_with_confidence': words,
+            'average_confidence': float(doc['average_confidence'])
+        }
+
+    def search(self, query, ignore_case=True, regex=False, limit=None):
+        """
+        Full-text search over every stored page without loading the text into RAM.
+
+        Args:
+            query: Text (or regular expression if regex is set) to find
+            ignore_case: Case-insensitive matching (Unicode case folding for
+                         non-ASCII queries and regular expressions)
+            regex: Treat query as a regular expression
+            limit: Stop after this many matching documents
+
+        Returns:
+            list: Matching document ids in store order
+        """
+        buffer = self._map('text.bin')
+        if buffer is None or not query:
+            return []
+
+        pattern = query if regex else re.escape(query)
+        docs = self._docs()
+        starts = docs['text_offset'].astype(np.int64)
+        ends = starts + docs['text_length']
+        matches = []
+
+        if ignore_case and (regex or not query.isascii()):
+            # Bytes patterns only fold ASCII case, so match on decoded text,
+            # a chunk of pages at a time to keep memory bounded
+            compiled = re.compile(pattern, re.IGNORECASE)
+            first = 0
+            while first < len(docs) and (limit is None or len(matches) < limit):
+                last = max(int(np.searchsorted(starts, starts[first] + SEARCH_CHUNK_BYTES)), first + 1)
+                raw = buffer[int(starts[first]):int(ends[last - 1])]
+                # Character index of every byte offset: count the UTF-8 lead bytes before it
+                lead = (np.frombuffer(raw, dtype=np.uint8) & 0xC0) != 0x80
+                char_index = np.concatenate([[0], np.cumsum(lead)])
+                self._scan(compiled, raw.decode('utf-8'), char_index[starts[first:last] - starts[first]],
+                           char_index[ends[first:last] - starts[first]], first, matches, limit)
+                first = last
+            return matches
+
+        compiled = re.compile(pattern.encode('utf-8'), re.IGNORECASE if ignore_case else 0)
+        self._scan(compiled, buffer, starts, ends, 0, matches, limit)
+        return matches
+
+    def _scan(self, compiled, text, starts, ends, first, matches, limit):
+        """Append the ids of pages (numbered from first) in which compiled matches."""
+        position = 0
+        last_row = -1
+        while position <= len(text):
+            match = compiled.search(text, position)
+            if match is None:
+                break
+            row = int(np.searchsorted(starts, match.start(), side='right')) - 1
+            if row < 0 or match.end() > ends[row]:
+                # Match spans two pages' texts: retry inside the next page
+                position = match.start() + 1
+                continue
+            if row != last_row:
+                matches.append(self._id(first + row))
+                last_row = row
+                if limit is not None and len(matches) >= limit:
+                    break
+            # One hit per page is enough; an empty match must still move forward
+            position = max(int(ends[row]), match.start() + 1)
+
+    def _close_maps(self):
+        for buffer in self._maps.values():
+            try:
+                buffer.close()
+            except BufferError:
+                # Still referenced by an array handed out to a caller
+                pass
+        self._maps = {}
+
+    def close(self):
+        """Flush and close the store."""
+        self._close_maps()
+        for f in (self._text_file, self._words_file, self._docs_file, self._ids_file):
+            if f is not None:
+                f.close()
+        self._text_file = self._words_file = self._docs_file = self._ids_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main(argv=None):
+    """Query a result store: python -m OCR.result_store STORE (--get ID | --search TEXT | --list)."""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Query an OCR result store")
+    parser.add_argument('store', help="Result store directory")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--get', metavar='ID', help="Print one document as JSON")
+    group.add_argument('--search', metavar='TEXT', help="Print ids of documents containing TEXT")
+    group.add_argument('--list', action='store_true', help="Print all document ids")
+    parser.add_argument('--limit', type=int, default=None, help="Maximum search results")
+    args = parser.parse_args(argv)
+
+    with ResultStore(args.store, readonly=True) as store:
+        if args.get is not None:
+            print(json.dumps(store.get(args.get), ensure_ascii=False, indent=2))
+        elif args.search is not None:
+            print('\n'.join(store.search(args.search, limit=args.limit)))
+        else:
+            print('\n'.join(store.ids()))
+
+
+if __name__ == "__main__":
+    main()
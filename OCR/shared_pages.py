@@ -0,0 +1,122 @@
+"""Shared-memory page buffers for passing images to and from worker processes."""
+from collections import namedtuple
+from multiprocessing import shared_memory
+import threading
+
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+# Picklable reference to an array stored in a PageRing slot
+PageHandle = namedtuple('PageHandle', ['segment', 'slot', 'offset', 'shape', 'dtype'])
+
+
+class PageRing:
+    """
+    Fixed number of equally sized slots in one shared-memory segment.
+
+    The coordinator copies a decoded page into a slot once and sends workers
+    only its PageHandle (a few dozen bytes) instead of pickling the pixels
+    into every task. Workers can also write their preprocessed page into a
+    slot the coordinator reserved for them. Slots are handed out round-robin,
+    so a freshly released slot is reused last and a late reader of an old
+    handle is unlikely to see it overwritten.
+    """
+
+    def __init__(self, slots=4, slot_bytes=32 * 1024 * 1024):
+        """
+        Args:
+            slots: Number of page slots
+            slot_bytes: Capacity of each slot in bytes
+        """
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self._busy = [False] * slots
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        """Name workers use to attach to the segment."""
+        return self._shm.name
+
+    def free_slots(self):
+        """Return the number of slots not currently allocated."""
+        with self._lock:
+            return self._busy.count(False)
+
+    def reserve(self, shape, dtype='uint8'):
+        """
+        Allocate a slot for an array of the given shape and dtype.
+
+        Raises:
+            ValueError: If the array does not fit in a slot
+            BufferError: If every slot is in use
+        """
+        shape = tuple(int(n) for n in shape)
+        dtype = np.dtype(dtype).str
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if nbytes > self.slot_bytes:
+            raise ValueError(f"Page of {nbytes} bytes exceeds the {self.slot_bytes}-byte slot size")
+
+        with self._lock:
+            for step in range(self.slots):
+                slot = (self._next + step) % self.slots
+                if not self._busy[slot]:
+                    self._busy[slot] = True
+                    self._next = (slot + 1) % self.slots
+                    return PageHandle(self.name, slot, slot * self.slot_bytes, shape, dtype)
+        raise BufferError("No free shared page slot")
+
+    def put(self, array):
+        """Copy an array into a free slot and return its handle."""
+        array = np.asarray(array)
+        handle = self.reserve(array.shape, array.dtype)
+        self.view(handle)[...] = array
+        return handle
+
+    def view(self, handle):
+        """Return a NumPy view (no copy) of a slot owned by this ring."""
+        return np.ndarray(handle.shape, dtype=handle.dtype, buffer=self._shm.buf, offset=handle.offset)
+
+    def release(self, handle):
+        """Return a slot to the ring."""
+        with self._lock:
+            self._busy[handle.slot] = False
+
+    def close(self):
+        """Free the shared-memory segment."""
+        if self._shm is None:
+            return
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# Segments attached by this (worker) process, kept open across tasks
+_attached = {}
+
+
+def attach(handle):
+    """
+    Return a NumPy view of a PageHandle's slot from any process.
+
+    The segment stays mapped for the life of the process, so a pool worker
+    pays the attach cost once per ring rather than once per page.
+    """
+    segment = _attached.get(handle.segment)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name=handle.segment)
+        _attached[handle.segment] = segment
+    return np.ndarray(handle.shape, dtype=handle.dtype, buffer=segment.buf, offset=handle.offset)
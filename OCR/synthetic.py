@@ -0,0 +1,98 @@
+"""Synthetic document pages with known ground truth, for load tests and benchmarks."""
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+from ._lazy import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog invoice total amount due date "
+    "customer account number payment received balance order item quantity "
+    "price tax shipping address street city state report summary page section"
+).split()
+
+
+def _load_font(size):
+    for name in ('DejaVuSans.ttf', 'Arial.ttf', 'LiberationSans-Regular.ttf'):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def render_page(lines=20, words_per_line=8, width=1240, font_size=28, seed=None):
+    """
+    Render a clean text page.
+
+    Args:
+        lines: Number of text lines
+        words_per_line: Words per line
+        width: Page width in pixels (height follows from the line count)
+        font_size: Font size in pixels
+        seed: Random seed for reproducible text
+
+    Returns:
+        tuple: (PIL Image, ground-truth text with one line per rendered line)
+    """
+    rng = random.Random(seed)
+    font = _load_font(font_size)
+    line_height = int(font_size * 1.6)
+    margin = font_size * 2
+    height = margin * 2 + line_height * lines
+
+    page = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(page)
+    text_lines = []
+    for i in range(lines):
+        line = ' '.join(rng.choice(WORDS) for _ in range(words_per_line))
+        draw.text((margin, margin + i * line_height), line, fill='black', font=font)
+        text_lines.append(line)
+
+    return page, '\n'.join(text_lines)
+
+
+def augment(image, noise=0.0, blur=0.0, skew=0.0, lighting=0.0, jpeg_quality=None, seed=None):
+    """
+    Degrade a rendered page the way scans and phone photos do.
+
+    Args:
+        image: PIL Image
+        noise: Gaussian noise standard deviation (0-255 scale)
+        blur: Gaussian blur sigma in pixels
+        skew: Rotation in degrees
+        lighting: Strength (0-1) of a left-to-right illumination gradient
+        jpeg_quality: Re-encode as JPEG at this quality (None to skip)
+        seed: Random seed for reproducible noise
+
+    Returns:
+        PIL Image: Augmented page
+    """
+    rng = np.random.default_rng(seed)
+    img = np.array(image.convert('RGB')).astype(np.float32)
+    height, width = img.shape[:2]
+
+    if skew:
+        M = cv2.getRotationMatrix2D((width / 2, height / 2), skew, 1.0)
+        img = cv2.warpAffine(img, M, (width, height), borderMode=cv2.BORDER_CONSTANT,
+                             borderValue=(255, 255, 255))
+    if lighting:
+        gradient = np.linspace(1.0 - lighting, 1.0, width, dtype=np.float32)
+        img *= gradient[None, :, None]
+    if blur:
+        img = cv2.GaussianBlur(img, (0, 0), blur)
+    if noise:
+        img += rng.normal(0, noise, img.shape).astype(np.float32)
+
+    result = Image.fromarray(np.clip(img, 0, 255).astype(np.uint8))
+    if jpeg_quality:
+        from io import BytesIO
+        buf = BytesIO()
+        result.save(buf, format='JPEG', quality=jpeg_quality)
+        buf.seek(0)
+        result = Image.open(buf).convert('RGB')
+    return result
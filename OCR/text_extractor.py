@@ -1,17 +1,24 @@
 """Text extraction module using Tesseract OCR."""
-import pytesseract
 from PIL import Image
 import io
+
+from ._lazy import lazy_import
 from .formatting_detector import FormattingDetector
+from .image_preprocessor import detect_orientation, rotate_image, tesseract_config
+
+pytesseract = lazy_import('pytesseract')
 
 
-def extract_text(image_input, lang='eng'):
+def extract_text(image_input, lang='eng', auto_orient=False, psm='auto'):
     """
     Extract text from image using Tesseract OCR.
     
     Args:
         image_input: PIL Image object, file path, or file-like object (Streamlit UploadedFile, BytesIO, etc.)
         lang: Language code (default 'eng' for English)
+        auto_orient: Rotate sideways/upside-down pages upright before OCR (an extra OSD pass)
+        psm: 'auto' to pick the page segmentation mode from the input's layout
+             (see classify_layout), a PSM number, or None for Tesseract's default
     
     Returns:
         str: Extracted text
@@ -27,19 +34,25 @@ def extract_text(image_input, lang='eng'):
         else:
             img = image_input
         
-        text = pytesseract.image_to_string(img, lang=lang)
+        if auto_orient:
+            img = rotate_image(img, detect_orientation(img)['rotate'])
+        
+        layout = tesseract_config(img, psm)
+        text = pytesseract.image_to_string(img, lang=lang, config=layout['config'])
         return text.strip()
     except Exception as e:
         raise Exception(f"OCR extraction failed: {str(e)}")
 
 
-def extract_text_with_formatting(image_input, lang='eng'):
+def extract_text_with_formatting(image_input, lang='eng', auto_orient=False, psm='auto'):
     """
     Extract text with formatting detection.
     
     Args:
         image_input: PIL Image object, file path, or file-like object (Streamlit UploadedFile, BytesIO, etc.)
         lang: Language code (default 'eng' for English)
+        auto_orient: Rotate sideways/upside-down pages upright before OCR (an extra OSD pass)
+        psm: 'auto', a PSM number, or None (see extract_text)
     
     Returns:
         dict: Contains extracted text and formatting information
@@ -57,21 +70,33 @@ def extract_text_with_formatting(image_input, lang='eng'):
     except Exception as e:
         raise Exception(f"Failed to load image: {str(e)}")
     
+    # Rotate once up front so both OCR passes see an upright page
+    rotation = 0
+    if auto_orient:
+        rotation = detect_orientation(img)['rotate']
+        img = rotate_image(img, rotation)
+    
+    # Choose the segmentation mode once so both OCR passes agree
+    layout = tesseract_config(img, psm)
+    
     # Extract plain text
-    text = extract_text(img, lang=lang)
+    text = extract_text(img, lang=lang, auto_orient=False, psm=layout)
     
     # Detect formatting
     try:
-        detector = FormattingDetector()
+        detector = FormattingDetector(psm=layout)
         formatting_data = detector.detect_formatting(img)
         
         return {
             'text': text,
             'formatting_data': formatting_data,
             'alignment': formatting_data.get('alignment', 'left'),
+            'line_alignments': formatting_data.get('line_alignments', []),
             'text_blocks': formatting_data.get('text_blocks', []),
             'confidence': formatting_data.get('confidence', 0),
-            'properties': formatting_data.get('formatting', {})
+            'properties': formatting_data.get('formatting', {}),
+            'rotation': rotation,
+            'layout': layout
         }
     
     except Exception as e:
@@ -79,20 +104,30 @@ def extract_text_with_formatting(image_input, lang='eng'):
         return {
             'text': text,
             'error': str(e),
-            'alignment': 'left'
+            'alignment': 'left',
+            'rotation': rotation,
+            'layout': layout
         }
 
 
-def extract_text_with_confidence(image_input, lang='eng'):
+def extract_text_with_confidence(image_input, lang='eng', auto_orient=False, refine=False,
+                                 refine_threshold=60, psm='auto', timeout=0):
     """
     Extract text and confidence scores for each word.
     
     Args:
         image_input: PIL Image object, file path, or file-like object (Streamlit UploadedFile, BytesIO, etc.)
         lang: Language code (default 'eng' for English)
+        auto_orient: Rotate sideways/upside-down pages upright before OCR (an extra OSD pass)
+        refine: Re-recognize only the low-confidence words (see refine_low_confidence_words)
+        refine_threshold: Words below this confidence are re-recognized when refine is set
+        psm: 'auto', a PSM number, or None (see extract_text)
+        timeout: Seconds after which the Tesseract call is killed (0 for no limit)
     
     Returns:
-        dict: Contains text and per-word confidence scores
+        dict: Contains text, per-word confidence scores and boxes, the
+              size of the (oriented) image the boxes refer to, and the
+              layout class and PSM used
     """
     import cv2
     import numpy as np
@@ -110,25 +145,268 @@ def extract_text_with_confidence(image_input, lang='eng'):
     except Exception as e:
         raise Exception(f"Failed to load image: {str(e)}")
     
+    rotation = 0
+    if auto_orient:
+        rotation = detect_orientation(img)['rotate']
+        img = rotate_image(img, rotation)
+    
     cv_img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
     
     # Get detailed OCR data with confidence
-    data = pytesseract.image_to_data(cv_img, lang=lang, output_type=pytesseract.Output.DICT)
+    layout = tesseract_config(cv_img, psm)
+    data = pytesseract.image_to_data(cv_img, lang=lang, config=layout['config'],
+                                     output_type=pytesseract.Output.DICT, timeout=timeout)
+    
+    # Refinement also gets a chance at words below the final cut-off
+    min_confidence = 0 if refine else 30
     
     words_with_confidence = []
     for i, text in enumerate(data['text']):
-        if int(data['conf'][i]) > 30:  # Confidence threshold
+        if int(float(data['conf'][i])) > min_confidence and str(text).strip():
             words_with_confidence.append({
                 'word': text,
-                'confidence': int(data['conf'][i]),
-                'position': (int(data['left'][i]), int(data['top'][i]))
+                'confidence': int(float(data['conf'][i])),
+                'position': (int(data['left'][i]), int(data['top'][i])),
+                'box': (int(data['left'][i]), int(data['top'][i]),
+                        int(data['width'][i]), int(data['height'][i])),
+                'line': (int(data['block_num'][i]), int(data['par_num'][i]), int(data['line_num'][i]))
             })
     
+    refined_count = 0
+    if refine:
+        words_with_confidence, refined_count = refine_low_confidence_words(
+            img, words_with_confidence, threshold=refine_threshold, lang=lang)
+        words_with_confidence = [w for w in words_with_confidence if w['confidence'] > 30]
+    
     full_text = ' '.join([w['word'] for w in words_with_confidence])
     avg_confidence = np.mean([w['confidence'] for w in words_with_confidence]) if words_with_confidence else 0
     
     return {
         'text': full_text,
         'words_with_confidence': words_with_confidence,
-        'average_confidence': float(avg_confidence)
-    }
\ No newline at end of file
+        'average_confidence': float(avg_confidence),
+        'rotation': rotation,
+        'image_size': img.size,
+        'refined_words': refined_count,
+        'layout': layout
+    }
+
+
+def refine_low_confidence_words(image_input, words, threshold=60, scale=3.0, lang='eng', padding=4, gap=20):
+    """
+    Re-recognize only the low-confidence words of a page and splice improvements back in.
+    
+    The low-confidence word boxes are cropped from the page, upscaled and
+    Otsu-binarized, then stacked into one strip (one crop per row) that is
+    recognized in a single Tesseract call with the uniform-block PSM. Each
+    recognized word is mapped back to its crop by vertical position, and a
+    crop's new reading replaces the old word only if its confidence is higher.
+    
+    Args:
+        image_input: PIL Image the word boxes refer to
+        words: words_with_confidence entries with 'box' and 'confidence'
+        threshold: Words below this confidence are re-recognized
+        scale: Upscale factor for the crops
+        lang: Language code (default 'eng' for English)
+        padding: Pixels of context kept around each box
+        gap: White rows between stacked crops
+    
+    Returns:
+        tuple: (updated words list, number of words that were improved)
+    """
+    import numpy as np
+    from .pipeline import PreprocessingPipeline, build_stages
+    
+    low = [i for i, w in enumerate(words) if w['confidence'] < threshold and w.get('box')]
+    if not low:
+        return words, 0
+    
+    page = image_input.convert('RGB')
+    pipeline = PreprocessingPipeline(build_stages(resize_scale=scale, denoise=False, threshold_method='otsu'))
+    
+    crops = []
+    for i in low:
+        left, top, width, height = words[i]['box']
+        box = (max(left - padding, 0), max(top - padding, 0),
+               min(left + width + padding, page.width), min(top + height + padding, page.height))
+        crops.append(np.array(pipeline.run(page.crop(box), cache=False).convert('L')))
+    
+    # Stack crops into one strip so Tesseract is started once, not once per word
+    strip_width = max(c.shape[1] for c in crops) + 2 * gap
+    strip_height = sum(c.shape[0] for c in crops) + gap * (len(crops) + 1)
+    strip = np.full((strip_height, strip_width), 255, dtype=np.uint8)
+    row_bounds = []
+    y = gap
+    for crop in crops:
+        strip[y:y + crop.shape[0], gap:gap + crop.shape[1]] = crop
+        row_bounds.append((y, y + crop.shape[0]))
+        y += crop.shape[0] + gap
+    
+    data = pytesseract.image_to_data(strip, lang=lang, config='--psm 6',
+                                     output_type=pytesseract.Output.DICT)
+    
+    row_starts = np.array([start for start, _ in row_bounds])
+    readings = [[] for _ in crops]
+    for j, text in enumerate(data['text']):
+        conf = float(data['conf'][j])
+        if conf < 0 or not str(text).strip():
+            continue
+        center = int(data['top'][j]) + int(data['height'][j]) / 2
+        row = int(np.searchsorted(row_starts, center, side='right')) - 1
+        if 0 <= row < len(crops) and center <= row_bounds[row][1]:
+            readings[row].append((str(text), conf))
+    
+    refined = list(words)
+    improved = 0
+    for row, i in enumerate(low):
+        if not readings[row]:
+            continue
+        new_text = ' '.join(text for text, _ in readings[row])
+        new_conf = int(np.mean([conf for _, conf in readings[row]]))
+        if new_conf > words[i]['confidence']:
+            refined[i] = dict(words[i], word=new_text, confidence=new_conf)
+            improved += 1
+    
+    return refined, improved
+
+
+def _split_into_bands(img, max_bands=4, min_height=64):
+    """
+    Split a page into horizontal bands at blank rows so no text line is cut.
+    
+    Args:
+        img: PIL Image
+        max_bands: Upper bound on the number of bands
+        min_height: Smallest band height in pixels
+    
+    Returns:
+        list: (top, bottom) row ranges covering the page
+    """
+    import cv2
+    import numpy as np
+    
+    height = img.height
+    if max_bands <= 1 or height < 2 * min_height:
+        return [(0, height)]
+    
+    gray = np.array(img.convert('L'))
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    blank_rows = np.flatnonzero(ink.sum(axis=1) == 0)
+    if blank_rows.size == 0:
+        return [(0, height)]
+    
+    cuts = [0]
+    for target in np.linspace(0, height, max_bands + 1)[1:-1]:
+        cut = int(blank_rows[np.argmin(np.abs(blank_rows - target))])
+        if cut - cuts[-1] >= min_height and height - cut >= min_height:
+            cuts.append(cut)
+    cuts.append(height)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def _load_pages(image_input):
+    """Return the pages of an image input (multi-frame TIFF/GIF or a list give several)."""
+    from PIL import ImageSequence
+    
+    if isinstance(image_input, (list, tuple)):
+        return [Image.open(p) if isinstance(p, str) or hasattr(p, 'read') else p for p in image_input]
+    if isinstance(image_input, str) or hasattr(image_input, 'read'):
+        image_input = Image.open(image_input)
+    if getattr(image_input, 'n_frames', 1) > 1:
+        return [frame.convert('RGB') for frame in ImageSequence.Iterator(image_input)]
+    return [image_input]
+
+
+def iter_extract_text(image_input, lang='eng', auto_orient=False, preprocess=None, max_bands=4,
+                      psm='auto'):
+    """
+    Extract text incrementally, yielding progress and partial text as it becomes available.
+    
+    Each page is split into horizontal bands at blank rows and the bands
+    are recognized one by one, so the first lines of text arrive long
+    before the whole page is done. An empty page list yields a single
+    'done' event with progress 1.0.
+    
+    Args:
+        image_input: PIL Image, file path, file-like object, or a list of these (one per page)
+        lang: Language code (default 'eng' for English)
+        auto_orient: Rotate sideways/upside-down pages upright before OCR (an extra OSD pass)
+        preprocess: Optional callable applied to each page before OCR
+        max_bands: Upper bound on bands per page (1 disables splitting)
+        psm: 'auto', a PSM number, or None (see extract_text); chosen per page
+    
+    Yields:
+        dict: Event with 'stage' ('load', 'orient', 'preprocess', 'ocr' or 'done'),
+              'progress' (0-1), 'page', 'pages', and for 'ocr' events the new
+              'block' text and the page's 'layout'; every event carries the
+              full 'text' so far
+    """
+    try:
+        pages = _load_pages(image_input)
+    except Exception as e:
+        raise Exception(f"Failed to load image: {str(e)}")
+    
+    page_count = len(pages)
+    page_texts = []
+    if page_count == 0:
+        yield dict(stage='done', page=0, pages=0, progress=1.0, text='')
+        return
+    
+    def event(stage, page, fraction, **extra):
+        done = page_texts + ([extra['page_text']] if extra.get('page_text') else [])
+        extra.pop('page_text', None)
+        return dict(stage=stage, page=page, pages=page_count,
+                    progress=min((page + fraction) / page_count, 1.0),
+                    text='\n\n'.join(t for t in done if t), **extra)
+    
+    yield event('load', 0, 0.0)
+    for page_index, img in enumerate(pages):
+        if auto_orient:
+            img = rotate_image(img, detect_orientation(img)['rotate'])
+            yield event('orient', page_index, 0.05)
+        if preprocess is not None:
+            img = preprocess(img)
+            yield event('preprocess', page_index, 0.2)
+        
+        layout = tesseract_config(img, psm)
+        # Zero-height pages have nothing to read
+        bands = [(top, bottom) for top, bottom in _split_into_bands(img, max_bands=max_bands) if bottom > top]
+        blocks = []
+        for band_index, (top, bottom) in enumerate(bands):
+            band = img.crop((0, top, img.width, bottom))
+            try:
+                block = pytesseract.image_to_string(band, lang=lang, config=layout['config']).strip()
+            except Exception as e:
+                raise Exception(f"OCR extraction failed: {str(e)}")
+            blocks.append(block)
+            yield event('ocr', page_index, 0.2 + 0.8 * (band_index + 1) / len(bands),
+                        block=block, layout=layout, page_text='\n'.join(b for b in blocks if b))
+        page_texts.append('\n'.join(b for b in blocks if b))
+    
+    yield event('done', page_count - 1, 1.0)
+
+
+def extract_text_progressive(image_input, lang='eng', auto_orient=False, preprocess=None,
+                             max_bands=4, on_progress=None, psm='auto'):
+    """
+    Callback form of iter_extract_text.
+    
+    Args:
+        image_input: PIL Image, file path, file-like object, or a list of these
+        lang: Language code (default 'eng' for English)
+        auto_orient: Rotate sideways/upside-down pages upright before OCR (an extra OSD pass)
+        preprocess: Optional callable applied to each page before OCR
+        max_bands: Upper bound on bands per page
+        on_progress: Called with every event dict from iter_extract_text
+        psm: 'auto', a PSM number, or None (see extract_text)
+    
+    Returns:
+        str: Extracted text
+    """
+    text = ''
+    for progress_event in iter_extract_text(image_input, lang=lang, auto_orient=auto_orient,
+                                            preprocess=preprocess, max_bands=max_bands, psm=psm):
+        if on_progress:
+            on_progress(progress_event)
+        text = progress_event['text']
+    return text
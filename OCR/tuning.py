@@ -0,0 +1,310 @@
+"""Speed/accuracy harness for choosing preprocessing presets."""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+import itertools
+import os
+import time
+
+from ._lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+# Augmentation profiles applied to the synthetic pages (see synthetic.augment)
+AUGMENTATIONS = {
+    'clean': {},
+    'noise': {'noise': 12.0},
+    'blur': {'blur': 1.2},
+    'skew': {'skew': 2.0},
+    'lighting': {'lighting': 0.5},
+    'scan': {'noise': 6.0, 'blur': 0.8, 'skew': 1.0, 'lighting': 0.3, 'jpeg_quality': 70},
+}
+
+DEFAULT_GRID = {
+    'resize_scale': [1.0, 1.5, 2.0],
+    'denoise': [False, True],
+    'threshold_method': ['none', 'adaptive', 'otsu', 'sauvola'],
+    'clahe_clip': [0.0, 3.0],
+    'clahe_tile': [8],
+    'morph_kernel': [0, 2],
+}
+
+
+def edit_distance(reference, hypothesis):
+    """
+    Levenshtein distance between two sequences.
+
+    Rows of the dynamic-programming table are computed with NumPy: the
+    insertion chain along a row is a running minimum, so each row is a
+    handful of vector operations instead of a Python loop per cell.
+    """
+    ref = np.array([hash(token) for token in reference], dtype=np.int64)
+    hyp = np.array([hash(token) for token in hypothesis], dtype=np.int64)
+    if ref.size == 0 or hyp.size == 0:
+        return int(max(ref.size, hyp.size))
+
+    offsets = np.arange(hyp.size + 1)
+    previous = offsets.copy()
+    for i in range(1, ref.size + 1):
+        best = np.empty(hyp.size + 1, dtype=np.int64)
+        best[0] = i
+        # Deletion from the row above, or substitution/match from the diagonal
+        best[1:] = np.minimum(previous[1:] + 1, previous[:-1] + (hyp != ref[i - 1]))
+        # Insertions: best[j] = min over k <= j of best[k] + (j - k)
+        previous = np.minimum.accumulate(best - offsets) + offsets
+    return int(previous[-1])
+
+
+def error_rates(reference, hypothesis):
+    """
+    Character and word error rates of an OCR result against ground truth.
+
+    Whitespace is normalized first, so line-break differences don't count.
+
+    Returns:
+        tuple: (CER, WER), each edit distance divided by the reference length
+    """
+    ref_words, hyp_words = reference.split(), hypothesis.split()
+    ref_chars, hyp_chars = ' '.join(ref_words), ' '.join(hyp_words)
+    cer = edit_distance(ref_chars, hyp_chars) / max(len(ref_chars), 1)
+    wer = edit_distance(ref_words, hyp_words) / max(len(ref_words), 1)
+    return cer, wer
+
+
+def config_stages(config):
+    """
+    Pipeline stage specs for one parameter combination.
+
+    Args:
+        config: dict with resize_scale, denoise, threshold_method ('none' to
+                skip binarization), clahe_clip (0 to skip CLAHE), clahe_tile
+                and morph_kernel (0 to skip morphology)
+
+    Returns:
+        list: Stage specs for PreprocessingPipeline
+    """
+    from .pipeline import LOCAL_THRESHOLD_K
+
+    stages = []
+    if config.get('clahe_clip'):
+        stages.append({'op': 'clahe', 'clip_limit': config['clahe_clip'], 'tile_size': config.get('clahe_tile', 8)})
+    if config.get('resize_scale', 1.0) != 1.0:
+        stages.append({'op': 'resize', 'scale': config['resize_scale']})
+    if config.get('denoise'):
+        stages.append({'op': 'denoise', 'h': 10, 'h_color': 10, 'template_window': 7, 'search_window': 21})
+    stages.append({'op': 'grayscale'})
+
+    method = config.get('threshold_method', 'adaptive')
+    if method == 'adaptive':
+        stages.append({'op': 'threshold', 'method': 'adaptive', 'block_size': 11, 'c': 2})
+    elif method == 'otsu':
+        stages.append({'op': 'threshold', 'method': 'otsu'})
+    elif method in LOCAL_THRESHOLD_K:
+        stages.append({'op': 'threshold', 'method': method, 'window': 31, 'k': LOCAL_THRESHOLD_K[method]})
+    elif method != 'none':
+        raise ValueError(f"Unknown threshold method: {method}")
+
+    if config.get('morph_kernel'):
+        stages.append({'op': 'morphology', 'operations': ['close', 'open'],
+                       'kernel_size': config['morph_kernel'], 'iterations': 1})
+    return stages
+
+
+def expand_grid(grid):
+    """Return every combination of a parameter grid as a list of config dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+@lru_cache(maxsize=64)
+def _page(seed, augmentation, lines, font_size):
+    """Render (once per worker) a synthetic page and its ground truth as a BGR array."""
+    import cv2
+    from .synthetic import render_page, augment
+
+    image, text = render_page(lines=lines, font_size=font_size, seed=seed)
+    image = augment(image, seed=seed, **AUGMENTATIONS[augmentation])
+    return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR), text
+
+
+def _evaluate(config, seed, augmentation, lines, font_size, lang):
+    """Preprocess and OCR one page with one config; returns (CER, WER, seconds)."""
+    from PIL import Image
+    from .pipeline import PreprocessingPipeline
+    from .text_extractor import extract_text
+
+    page, truth = _page(seed, augmentation, lines, font_size)
+    pipeline = PreprocessingPipeline(config_stages(config))
+    start = time.perf_counter()
+    try:
+        processed = pipeline.run_array(page, cache=False)
+        image = Image.fromarray(processed if processed.ndim == 2 else processed[:, :, ::-1])
+        text = extract_text(image, lang=lang, auto_orient=False)
+    except Exception as e:
+        raise Exception(f"{config} failed: {str(e)}")
+    elapsed = time.perf_counter() - start
+    cer, wer = error_rates(truth, text)
+    return cer, wer, elapsed
+
+
+def pareto_frontier(results, cost='seconds', error='cer'):
+    """
+    Configs not beaten on both speed and accuracy by any other config.
+
+    Args:
+        results: Per-config summaries from run_sweep
+        cost: Key to minimize on one axis
+        error: Key to minimize on the other
+
+    Returns:
+        list: Frontier summaries, fastest first
+    """
+    frontier = []
+    best_error = float('inf')
+    for result in sorted(results, key=lambda r: (r[cost], r[error])):
+        if result[error] < best_error:
+            frontier.append(result)
+            best_error = result[error]
+    return frontier
+
+
+def fastest_at(results, max_cer):
+    """Return the fastest config summary whose mean CER is at most max_cer (or None)."""
+    eligible = [r for r in results if r['cer'] <= max_cer]
+    return min(eligible, key=lambda r: r['seconds']) if eligible else None
+
+
+def run_sweep(grid=None, pages_per_augmentation=1, augmentations=None, lines=12, font_size=24,
+              lang='eng', workers=None, on_progress=None):
+    """
+    Sweep a preprocessing parameter grid over synthetic ground-truth pages.
+
+    Every (config, page) pair runs in a pool of worker processes limited
+    to one OpenCV thread each, so per-page times are comparable across
+    configs. Pages are rendered inside the workers from their seeds.
+
+    Args:
+        grid: dict of parameter -> list of values (default DEFAULT_GRID)
+        pages_per_augmentation: Pages rendered per augmentation profile
+        augmentations: Profile names from AUGMENTATIONS (default: all)
+        lines: Text lines per synthetic page
+        font_size: Font size of the synthetic pages in pixels
+        lang: Language code (default 'eng' for English)
+        workers: Worker processes (default: CPU count)
+        on_progress: Optional callback receiving (finished, total) tasks
+
+    Returns:
+        list: One summary per config with mean 'cer', 'wer', 'seconds' per
+              page, per-augmentation CER and any 'errors', sorted by CER
+    """
+    from .ensemble import _process_context
+    from .image_preprocessor import configure_worker
+
+    configs = expand_grid(grid or DEFAULT_GRID)
+    augmentations = list(augmentations or AUGMENTATIONS)
+    pages = [(seed, augmentation) for augmentation in augmentations
+             for seed in range(pages_per_augmentation)]
+
+    outcomes = {i: [] for i in range(len(configs))}
+    errors = {i: [] for i in range(len(configs))}
+    total = len(configs) * len(pages)
+    finished = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, mp_context=_process_context(),
+                             initializer=configure_worker) as executor:
+        futures = {}
+        for i, config in enumerate(configs):
+            for seed, augmentation in pages:
+                future = executor.submit(_evaluate, config, seed, augmentation, lines, font_size, lang)
+                futures[future] = (i, augmentation)
+        for future in as_completed(futures):
+            i, augmentation = futures[future]
+            try:
+                outcomes[i].append((augmentation,) + future.result())
+            except Exception as e:
+                errors[i].append(str(e))
+            finished += 1
+            if on_progress:
+                on_progress(finished, total)
+
+    results = []
+    for i, config in enumerate(configs):
+        rows = outcomes[i]
+        if not rows:
+            results.append(dict(config=config, cer=1.0, wer=1.0, seconds=float('inf'),
+                                by_augmentation={}, errors=errors[i]))
+            continue
+        cer = np.array([row[1] for row in rows])
+        by_augmentation = {a: float(np.mean([row[1] for row in rows if row[0] == a]))
+                           for a in augmentations if any(row[0] == a for row in rows)}
+        results.append({
+            'config': config,
+            'cer': float(cer.mean()),
+            'wer': float(np.mean([row[2] for row in rows])),
+            'seconds': float(np.mean([row[3] for row in rows])),
+            'by_augmentation': by_augmentation,
+            'errors': errors[i]
+        })
+    return sorted(results, key=lambda r: (r['cer'], r['seconds']))
+
+
+def _describe(config):
+    return (f"scale={config['resize_scale']} denoise={int(bool(config['denoise']))} "
+            f"thr={config['threshold_method']} clahe={config['clahe_clip']}/{config['clahe_tile']} "
+            f"morph={config['morph_kernel']}")
+
+
+def main(argv=None):
+    """Run a parameter sweep: python -m OCR.tuning --scales 1 2 --thresholds otsu sauvola"""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Preprocessing speed/accuracy sweep")
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_GRID['resize_scale'])
+    parser.add_argument('--denoise', type=int, nargs='+', default=[0, 1], choices=[0, 1])
+    parser.add_argument('--thresholds', nargs='+', default=DEFAULT_GRID['threshold_method'])
+    parser.add_argument('--clahe-clips', type=float, nargs='+', default=DEFAULT_GRID['clahe_clip'])
+    parser.add_argument('--clahe-tiles', type=int, nargs='+', default=DEFAULT_GRID['clahe_tile'])
+    parser.add_argument('--morph-kernels', type=int, nargs='+', default=DEFAULT_GRID['morph_kernel'])
+    parser.add_argument('--augmentations', nargs='+', default=list(AUGMENTATIONS), choices=list(AUGMENTATIONS))
+    parser.add_argument('--pages', type=int, default=1, help="Pages per augmentation profile")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--target-cer', type=float, default=None, help="Report the fastest config at this CER")
+    parser.add_argument('--json', help="Write all results to this file")
+    args = parser.parse_args(argv)
+
+    grid = {
+        'resize_scale': args.scales,
+        'denoise': [bool(d) for d in args.denoise],
+        'threshold_method': args.thresholds,
+        'clahe_clip': args.clahe_clips,
+        'clahe_tile': args.clahe_tiles,
+        'morph_kernel': args.morph_kernels,
+    }
+
+    def report(finished, total):
+        print(f"\r{finished}/{total} page runs", end='', flush=True)
+
+    results = run_sweep(grid, pages_per_augmentation=args.pages, augmentations=args.augmentations,
+                        workers=args.workers, on_progress=report)
+    print()
+
+    frontier = pareto_frontier([r for r in results if not r['errors']])
+    print(f"{'CER':>6} {'WER':>6} {'s/page':>7}  config (Pareto frontier, fastest first)")
+    for r in frontier:
+        print(f"{r['cer']:>6.3f} {r['wer']:>6.3f} {r['seconds']:>7.2f}  {_describe(r['config'])}")
+
+    if args.target_cer is not None:
+        best = fastest_at(results, args.target_cer)
+        print(f"\nFastest at CER <= {args.target_cer}: "
+              + (f"{_describe(best['config'])} ({best['seconds']:.2f} s/page)" if best else "none"))
+
+    failed = [r for r in results if r['errors']]
+    if failed:
+        print(f"\n{len(failed)} configs had errors, e.g. {failed[0]['errors'][0]}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
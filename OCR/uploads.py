@@ -0,0 +1,164 @@
+"""Batch OCR of uploaded files for the web app, streamed into a ZIP on disk."""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import glob
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+from PIL import Image
+
+from .text_extractor import extract_text_with_formatting, extract_text_with_confidence
+from .image_preprocessor import (
+    preprocess_image,
+    preprocess_with_otsu,
+    preprocess_with_fixed_threshold,
+    optimal_pipeline,
+    enhance_contrast
+)
+from .word_generator import create_ocr_document_bytes
+from .ensemble import run_ensemble
+from .table_extractor import extract_tables, table_to_csv
+
+
+ZIP_PREFIX = 'ocr_batch_'
+# Batch ZIPs older than this are removed when the next batch starts. Streamlit
+# has no hook for a session ending, so abandoned sessions' ZIPs are swept by age.
+ZIP_MAX_AGE = 2 * 60 * 60
+
+
+def preprocess_selected(img, method, denoise, enhance, fixed_value):
+    """Apply the preprocessing method chosen in the sidebar."""
+    if enhance:
+        img = enhance_contrast(img)
+
+    if method == 'adaptive':
+        return preprocess_image(img, resize_scale=2.0, denoise=denoise, threshold_method='adaptive')
+    if method == 'otsu':
+        return preprocess_with_otsu(img, resize_scale=2.0, denoise=denoise)
+    if method in ('sauvola', 'niblack'):
+        return preprocess_image(img, resize_scale=2.0, denoise=denoise, threshold_method=method)
+    if method == 'fixed':
+        return preprocess_with_fixed_threshold(img, resize_scale=2.0, denoise=denoise, threshold_value=fixed_value)
+    if method == 'optimal':
+        return optimal_pipeline(img)
+    # no thresholding, only optional denoise/resize
+    return preprocess_image(img, resize_scale=2.0, denoise=denoise, threshold_method='fixed')
+
+
+def process_upload(uploaded, options):
+    """
+    Run the selected pipeline on one uploaded file (in a worker thread).
+
+    Returns:
+        dict: Table row plus the text, JSON and DOCX payloads for the ZIP
+              (and one CSV per table in table mode)
+    """
+    start = time.perf_counter()
+    img = Image.open(uploaded).convert('RGB')
+    csvs = []
+    if options['table_mode']:
+        tables = extract_tables(img)
+        csvs = [table_to_csv(table) for table in tables]
+        result = {'text': '\n'.join(csvs), 'tables': tables}
+    elif options['method'] == 'ensemble':
+        result = run_ensemble(img, variants=options['ensemble_variants'],
+                              timeout=options['ensemble_budget'], merge=options['ensemble_merge'])
+    else:
+        pre_img = preprocess_selected(img, options['method'], options['denoise'],
+                                      options['enhance'], options['fixed_value'])
+        if options['detect_formatting']:
+            result = extract_text_with_formatting(pre_img)
+        else:
+            result = extract_text_with_confidence(pre_img)
+
+    text = result.get('text', '')
+    if options['table_mode']:
+        docx = create_ocr_document_bytes({'tables': result['tables']})
+    else:
+        docx = create_ocr_document_bytes(result if options['detect_formatting'] else text)
+    return {
+        'file': uploaded.name,
+        'status': 'done',
+        'characters': len(text),
+        'confidence': round(float(result.get('average_confidence', result.get('confidence', 0)) or 0), 1),
+        'seconds': round(time.perf_counter() - start, 2),
+        'text': text,
+        'json': json.dumps(result, default=str, ensure_ascii=False, indent=2),
+        'docx': docx,
+        'csv': csvs
+    }
+
+
+def sweep_batch_zips(max_age=ZIP_MAX_AGE, directory=None):
+    """
+    Delete batch ZIPs last written more than max_age seconds ago.
+
+    Returns:
+        int: Number of files removed
+    """
+    cutoff = time.time() - max_age
+    pattern = os.path.join(directory or tempfile.gettempdir(), f'{ZIP_PREFIX}*.zip')
+    removed = 0
+    for path in glob.glob(pattern):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            # Already removed by another session's sweep
+            continue
+    return removed
+
+
+def run_batch(uploaded_files, options, workers, on_update=None):
+    """
+    OCR many uploads in a bounded thread pool, calling on_update(rows) as
+    each file completes and writing its TXT/JSON/DOCX (and table CSVs)
+    straight into a ZIP on disk, so only the in-flight files' outputs are
+    held in memory while the batch runs. Serving the ZIP is not covered:
+    st.download_button reads the whole file into memory.
+
+    Every upload gets a row; a file that fails has its error as the status
+    and nothing in the ZIP. Uploads sharing a name are stored as name,
+    name_2, ... ZIPs left by earlier batches past ZIP_MAX_AGE are removed first.
+
+    Returns:
+        tuple: (table rows, ZIP file path)
+    """
+    sweep_batch_zips()
+    rows = []
+    fd, zip_path = tempfile.mkstemp(prefix=ZIP_PREFIX, suffix='.zip')
+    os.close(fd)
+    used_names = set()
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_upload, f, options): f for f in uploaded_files}
+        for future in as_completed(futures):
+            uploaded = futures[future]
+            try:
+                output = future.result()
+            except Exception as e:
+                rows.append({'file': uploaded.name, 'status': f'failed: {e}',
+                             'characters': 0, 'confidence': 0.0, 'seconds': 0.0})
+                if on_update:
+                    on_update(rows)
+                continue
+
+            stem = os.path.splitext(uploaded.name)[0]
+            name, n = stem, 1
+            while name in used_names:
+                n += 1
+                name = f'{stem}_{n}'
+            used_names.add(name)
+            archive.writestr(f'{name}.txt', output.pop('text'))
+            archive.writestr(f'{name}.json', output.pop('json'))
+            archive.writestr(f'{name}.docx', output.pop('docx'))
+            for number, table_csv in enumerate(output.pop('csv'), 1):
+                archive.writestr(f'{name}_table{number}.csv', table_csv)
+
+            rows.append(output)
+            if on_update:
+                on_update(rows)
+    return rows, zip_path
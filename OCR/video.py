@@ -0,0 +1,242 @@
+"""Frame-stream OCR for screen recordings and camera feeds."""
+from PIL import Image
+
+from ._lazy import lazy_import
+from .text_extractor import extract_text_with_confidence
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+def _iter_frames(source, sample_fps, fps):
+    """
+    Yield (index, timestamp seconds, BGR frame) for the frames to analyse.
+
+    Video files and devices are read with cv2.VideoCapture; frames between
+    samples are only grabbed, never decoded to pixels.
+    """
+    if isinstance(source, (str, int)):
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            raise ValueError(f"Could not open video source: {source}")
+        fps = capture.get(cv2.CAP_PROP_FPS) or fps or 25.0
+        step = max(int(round(fps / sample_fps)), 1) if sample_fps else 1
+        index = 0
+        try:
+            while True:
+                if not capture.grab():
+                    break
+                if index % step == 0:
+                    ok, frame = capture.retrieve()
+                    if not ok:
+                        break
+                    yield index, index / fps, frame
+                index += 1
+        finally:
+            capture.release()
+        return
+
+    # Any iterable of frames (PIL Images or BGR/grayscale arrays)
+    fps = fps or 25.0
+    step = max(int(round(fps / sample_fps)), 1) if sample_fps else 1
+    for index, frame in enumerate(source):
+        if index % step:
+            continue
+        if isinstance(frame, Image.Image):
+            frame = cv2.cvtColor(np.array(frame.convert('RGB')), cv2.COLOR_RGB2BGR)
+        elif frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        yield index, index / fps, frame
+
+
+def _thumbnail(frame, max_side):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    scale = min(1.0, max_side / float(max(height, width)))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                          interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+
+def _changed_regions(mask, scale, frame_shape, margin):
+    """Bounding boxes (left, top, right, bottom) in frame pixels of the changed areas."""
+    mask = cv2.dilate(mask, np.ones((3, 3), np.uint8), iterations=2)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    height, width = frame_shape[:2]
+    regions = []
+    for left, top, w, h, _ in stats[1:]:
+        regions.append([max(int(left / scale) - margin, 0), max(int(top / scale) - margin, 0),
+                        min(int((left + w) / scale) + margin, width),
+                        min(int((top + h) / scale) + margin, height)])
+    return _merge_boxes(regions)
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _merge_boxes(boxes):
+    """Merge overlapping boxes until none overlap."""
+    boxes = [list(box) for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                if _overlaps(boxes[i], boxes[j]):
+                    a, b = boxes[i], boxes.pop(j)
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+def _ocr_lines(frame, box, lang):
+    """OCR one region and return its text lines with frame-coordinate boxes."""
+    left, top, right, bottom = box
+    crop = frame[top:bottom, left:right]
+    if crop.size == 0:
+        return []
+    result = extract_text_with_confidence(Image.fromarray(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)),
+                                          lang=lang, auto_orient=False)
+    lines = {}
+    for word in result['words_with_confidence']:
+        x, y, w, h = word['box']
+        line = lines.setdefault(word['line'], {'words': [], 'box': [x, y, x + w, y + h]})
+        line['words'].append(word['word'])
+        line['box'] = [min(line['box'][0], x), min(line['box'][1], y),
+                       max(line['box'][2], x + w), max(line['box'][3], y + h)]
+    return [{'text': ' '.join(line['words']),
+             'box': (line['box'][0] + left, line['box'][1] + top, line['box'][2] + left, line['box'][3] + top)}
+            for line in lines.values()]
+
+
+def _page_text(lines):
+    return '\n'.join(line['text'] for line in sorted(lines, key=lambda l: (l['box'][1], l['box'][0])))
+
+
+def iter_video_text(source, lang='eng', sample_fps=2.0, fps=None, diff_threshold=0.001,
+                    pixel_threshold=30, full_refresh=0.5, max_side=320, margin=8):
+    """
+    OCR a video or frame sequence, yielding timestamped text deltas.
+
+    Frames are sampled at sample_fps and compared, as small grayscale
+    thumbnails, with the last frame that was OCR'd. Frames whose changed
+    share is below diff_threshold are skipped outright. Otherwise only the
+    changed regions (grown to cover any text line they touch) are re-OCR'd,
+    unless the change is large enough to count as a scene cut, in which
+    case the whole frame is.
+
+    Args:
+        source: Video file path, camera index, or an iterable of frames
+                (PIL Images or OpenCV arrays)
+        lang: Language code (default 'eng' for English)
+        sample_fps: Frames per second of video to analyse (None for every frame)
+        fps: Frame rate of a frame iterable (video sources report their own)
+        diff_threshold: Share of thumbnail pixels that must change to re-OCR
+        pixel_threshold: Grey-level difference for a thumbnail pixel to count as changed
+        full_refresh: Changed share above which the whole frame is re-OCR'd
+        max_side: Longest side of the comparison thumbnails
+        margin: Pixels added around each changed region
+
+    Yields:
+        dict: 'time' (seconds), 'frame' index, 'added' and 'removed' text
+              lines, the OCR'd 'regions' and the frame's full 'text'
+    """
+    lines = []
+    reference = None
+
+    for index, timestamp, frame in _iter_frames(source, sample_fps, fps):
+        thumbnail, scale = _thumbnail(frame, max_side)
+
+        if reference is None or reference.shape != thumbnail.shape:
+            changed_share = 1.0
+            mask = None
+        else:
+            mask = cv2.compare(cv2.absdiff(thumbnail, reference), pixel_threshold, cv2.CMP_GT)
+            changed_share = cv2.countNonZero(mask) / float(mask.size)
+            if changed_share < diff_threshold:
+                continue
+
+        height, width = frame.shape[:2]
+        if mask is None or changed_share >= full_refresh:
+            regions = [[0, 0, width, height]]
+        else:
+            regions = _changed_regions(mask, scale, frame.shape, margin)
+            # Grow regions over the lines they cut so no line is read in part
+            for region in regions:
+                for line in lines:
+                    if _overlaps(region, line['box']):
+                        box = line['box']
+                        region[:] = [min(region[0], box[0]), min(region[1], box[1]),
+                                     max(region[2], box[2]), max(region[3], box[3])]
+            regions = _merge_boxes(regions)
+
+        kept = [line for line in lines if not any(_overlaps(r, line['box']) for r in regions)]
+        stale = [line for line in lines if line not in kept]
+        fresh = [line for region in regions for line in _ocr_lines(frame, region, lang)]
+        lines = kept + fresh
+        reference = thumbnail
+
+        old_texts = [line['text'] for line in stale]
+        new_texts = [line['text'] for line in fresh]
+        added = [text for text in new_texts if text not in old_texts]
+        removed = [text for text in old_texts if text not in new_texts]
+        if not added and not removed:
+            continue
+
+        yield {
+            'time': timestamp,
+            'frame': index,
+            'added': added,
+            'removed': removed,
+            'regions': [tuple(region) for region in regions],
+            'text': _page_text(lines)
+        }
+
+
+def extract_video_text(source, lang='eng', sample_fps=2.0, **kwargs):
+    """
+    OCR a video or frame sequence and return all text deltas.
+
+    Args:
+        source: Video file path, camera index, or an iterable of frames
+        lang: Language code (default 'eng' for English)
+        sample_fps: Frames per second of video to analyse
+        **kwargs: Further options for iter_video_text
+
+    Returns:
+        list: Delta events from iter_video_text
+    """
+    return list(iter_video_text(source, lang=lang, sample_fps=sample_fps, **kwargs))
+
+
+def main(argv=None):
+    """Print timestamped text deltas: python -m OCR.video VIDEO [--fps 2]"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="OCR a video or camera feed")
+    parser.add_argument('source', help="Video file path or camera index")
+    parser.add_argument('--fps', type=float, default=2.0, help="Frames per second to analyse")
+    parser.add_argument('--lang', default='eng')
+    parser.add_argument('--threshold', type=float, default=0.001,
+                        help="Share of changed pixels that triggers OCR")
+    args = parser.parse_args(argv)
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    start = time.perf_counter()
+    for event in iter_video_text(source, lang=args.lang, sample_fps=args.fps, diff_threshold=args.threshold):
+        minutes, seconds = divmod(event['time'], 60)
+        for text in event['removed']:
+            print(f"[{int(minutes):02d}:{seconds:05.2f}] - {text}")
+        for text in event['added']:
+            print(f"[{int(minutes):02d}:{seconds:05.2f}] + {text}", flush=True)
+    print(f"Processed in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,24 @@
 """Word document generation module."""
-from docx import Document
-from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
 import os
 
+# python-docx is imported inside the methods that need it so that importing
+# this module (e.g. from app.py/gui.py) stays cheap until a document is built.
+
 
 class WordDocumentGenerator:
     """Generate Word documents from OCR results with formatting."""
     
     def __init__(self, output_path="output.docx"):
+        from docx import Document
+        
         self.output_path = output_path
         self.document = Document()
     
     def add_title(self, title, font_size=14, is_bold=True):
         """Add title to document."""
+        from docx.shared import Pt
+        from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+        
         p = self.document.add_paragraph(title)
         run = p.runs[0]
         run.font.size = Pt(font_size)
@@ -32,6 +35,9 @@ class WordDocumentGenerator:
             alignment: 'left', 'center', or 'right'
             formatting_info: Dict with bold, italic, font_size info
         """
+        from docx.shared import Pt
+        from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+        
         p = self.document.add_paragraph(text)
         
         # Set alignment
@@ -79,6 +85,13 @@ class WordDocumentGenerator:
             if paragraph_text:
                 full_text = ' '.join(paragraph_text)
                 alignment = formatting_info.get('alignment', 'left') if formatting_info else 'left'
+                
+                # Prefer the per-line alignment detected for this paragraph
+                if isinstance(block_group, list):
+                    line_alignments = [block['alignment'] for block in block_group
+                                       if isinstance(block, dict) and 'alignment' in block]
+                    if line_alignments:
+                        alignment = max(set(line_alignments), key=line_alignments.count)
                 self.add_extracted_text(full_text, alignment=alignment, 
                                        formatting_info=formatting_info)
     
@@ -86,11 +99,48 @@ class WordDocumentGenerator:
         """Add raw text without special formatting."""
         self.document.add_paragraph(text)
     
-    def add_image(self, image_path, width=Inches(5)):
-        """Add image to document."""
+    def add_image(self, image_path, width=None):
+        """Add image to document (default width 5 inches)."""
+        from docx.shared import Inches
+        
+        if width is None:
+            width = Inches(5)
         if os.path.exists(image_path):
             self.document.add_picture(image_path, width=width)
     
+    def add_table(self, table, style='Table Grid'):
+        """
+        Add a table to document.
+
+        Args:
+            table: List of rows of cell strings, or a table dict from
+                   table_extractor.extract_tables (its row and column spans are merged)
+            style: Word table style name
+        """
+        if isinstance(table, dict):
+            rows, spans = table['data'], table.get('cells', [])
+        else:
+            rows, spans = table, []
+        if not rows:
+            return None
+
+        cols = max(len(row) for row in rows)
+        doc_table = self.document.add_table(rows=len(rows), cols=cols)
+        try:
+            doc_table.style = style
+        except (KeyError, ValueError):
+            pass
+        for r, row in enumerate(rows):
+            for c, text in enumerate(row):
+                if text:
+                    doc_table.cell(r, c).text = text
+        for cell in spans:
+            rowspan, colspan = cell.get('rowspan', 1), cell.get('colspan', 1)
+            if rowspan > 1 or colspan > 1:
+                doc_table.cell(cell['row'], cell['col']).merge(
+                    doc_table.cell(cell['row'] + rowspan - 1, cell['col'] + colspan - 1))
+        return doc_table
+
     def add_heading(self, text, level=1):
         """Add heading to document."""
         self.document.add_heading(text, level=level)
@@ -123,7 +173,7 @@ def create_ocr_document(text, image_path=None, formatting_info=None, output_path
     Convenience function to create OCR document with extracted text.
     
     Args:
-        text: Extracted text
+        text: Extracted text, or dict with text_blocks or tables
         image_path: Path to original image (optional)
         formatting_info: Dictionary with formatting details
         output_path: Output Word document path
@@ -148,9 +198,18 @@ def create_ocr_document(text, image_path=None, formatting_info=None, output_path
     if isinstance(text, dict) and 'text_blocks' in text:
         # Text with formatting information
         doc_gen.add_text_blocks(text['text_blocks'], formatting_info=formatting_info or text.get('formatting'))
+    elif isinstance(text, dict) and 'tables' in text:
+        # Table mode: any text outside the tables, then one Word table each
+        if text.get('text'):
+            doc_gen.add_raw_text(text['text'])
     else:
         # Plain text
         doc_gen.add_raw_text(str(text))
+
+    if isinstance(text, dict):
+        for number, table in enumerate(text.get('tables', []), 1):
+            doc_gen.add_heading(f"Table {number}", level=3)
+            doc_gen.add_table(table)
     
     # Save and return path
     return doc_gen.save()
@@ -161,7 +220,7 @@ def create_ocr_document_bytes(text, image_path=None, formatting_info=None):
     Create a Word document from OCR results and return it as bytes.
 
     Args:
-        text: Extracted text or dict with text_blocks
+        text: Extracted text, or dict with text_blocks or tables
         image_path: Path to original image (optional)
         formatting_info: Formatting information (optional)
 
@@ -186,9 +245,17 @@ def create_ocr_document_bytes(text, image_path=None, formatting_info=None):
 
     if isinstance(text, dict) and 'text_blocks' in text:
         doc_gen.add_text_blocks(text['text_blocks'], formatting_info=formatting_info or text.get('formatting'))
+    elif isinstance(text, dict) and 'tables' in text:
+        if text.get('text'):
+            doc_gen.add_raw_text(text['text'])
     else:
         doc_gen.add_raw_text(str(text))
 
+    if isinstance(text, dict):
+        for number, table in enumerate(text.get('tables', []), 1):
+            doc_gen.add_heading(f"Table {number}", level=3)
+            doc_gen.add_table(table)
+
     # Save to bytes and return
     buf = BytesIO()
     doc_gen.save(buf)
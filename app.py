@@ -1,57 +1,98 @@
 import streamlit as st
 from PIL import Image
 from io import BytesIO
+import json
+import os
 
-from OCR.text_extractor import extract_text, extract_text_with_formatting
-from OCR.image_preprocessor import (
-    preprocess_image,
-    preprocess_with_otsu,
-    preprocess_with_fixed_threshold,
-    optimal_pipeline,
-    enhance_contrast
-)
+from OCR.text_extractor import extract_text_with_formatting, iter_extract_text
 from OCR.word_generator import create_ocr_document_bytes
+from OCR.ensemble import run_ensemble, PREPROCESSING_VARIANTS
+from OCR.table_extractor import extract_tables, table_to_csv
+from OCR.pipeline import enable_stage_cache
+from OCR.uploads import preprocess_selected, run_batch
+
+
+DOCX_MIME = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
 
 
 st.set_page_config(page_title='Tesseract Text Extractor OCR', layout='wide')
+# Users re-run the same upload with other settings; reuse its unchanged stages
+enable_stage_cache()
 st.title('Tesseract Text Extractor OCR')
 
-uploaded_file = st.file_uploader('Upload image', type=['png', 'jpg', 'jpeg', 'gif', 'bmp'])
-
-if uploaded_file:
-    # Load as PIL Image for preview and processing
-    original_image = Image.open(uploaded_file).convert('RGB')
-    st.image(original_image, caption='Original image', use_column_width=False, width=400)
+uploaded_files = st.file_uploader('Upload images', type=['png', 'jpg', 'jpeg', 'gif', 'bmp'],
+                                  accept_multiple_files=True)
 
+if uploaded_files:
     st.sidebar.header('Preprocessing')
-    method = st.sidebar.selectbox('Threshold method', ['adaptive', 'otsu', 'fixed', 'none', 'optimal'])
+    method = st.sidebar.selectbox('Threshold method', ['adaptive', 'otsu', 'sauvola', 'niblack', 'fixed', 'none', 'optimal', 'ensemble'])
     denoise = st.sidebar.checkbox('Denoise', value=True)
     enhance = st.sidebar.checkbox('Enhance contrast (CLAHE)', value=False)
     fixed_value = None
     if method == 'fixed':
         fixed_value = st.sidebar.slider('Fixed threshold value', 50, 220, 150)
+    if method == 'ensemble':
+        ensemble_variants = st.sidebar.multiselect('Variants', list(PREPROCESSING_VARIANTS),
+                                                   default=list(PREPROCESSING_VARIANTS))
+        ensemble_budget = st.sidebar.slider('Latency budget (seconds)', 5, 120, 30)
+        ensemble_merge = st.sidebar.checkbox('Merge words by confidence', value=False)
 
     st.sidebar.header('OCR options')
     detect_formatting = st.sidebar.checkbox('Detect formatting (bold/italic/alignment)', value=False)
+    # Ensemble mode reads plain text only, so table mode is not offered there
+    table_mode = method != 'ensemble' and st.sidebar.checkbox('Table mode (ruled tables to DOCX/CSV)',
+                                                               value=False)
+
+if uploaded_files and len(uploaded_files) > 1:
+    workers = st.sidebar.slider('Parallel workers', 1, 8, min(4, os.cpu_count() or 1))
+    options = {
+        'method': method,
+        'denoise': denoise,
+        'enhance': enhance,
+        'fixed_value': fixed_value,
+        'detect_formatting': detect_formatting,
+        'table_mode': table_mode,
+        'ensemble_variants': ensemble_variants if method == 'ensemble' else None,
+        'ensemble_budget': ensemble_budget if method == 'ensemble' else None,
+        'ensemble_merge': ensemble_merge if method == 'ensemble' else False
+    }
+    # Results survive the rerun triggered by the download button
+    batch_key = json.dumps([[f.name, f.size] for f in uploaded_files] + [options], default=str)
+
+    st.markdown(f'### Batch of {len(uploaded_files)} images')
+    table = st.empty()
+    if st.button('Extract Text from All'):
+        previous = st.session_state.pop('batch', None)
+        if previous and os.path.exists(previous['zip_path']):
+            os.remove(previous['zip_path'])
+        with st.spinner('Running OCR...'):
+            rows, zip_path = run_batch(uploaded_files, options, workers,
+                                       lambda rows: table.dataframe(rows, use_container_width=True))
+        st.session_state['batch'] = {'key': batch_key, 'rows': rows, 'zip_path': zip_path}
+
+    batch = st.session_state.get('batch')
+    if batch and batch['key'] == batch_key and os.path.exists(batch['zip_path']):
+        table.dataframe(batch['rows'], use_container_width=True)
+        # download_button reads the whole ZIP into memory and keeps it for the
+        # session; only the OCR run itself is bounded by the in-flight files
+        with open(batch['zip_path'], 'rb') as archive:
+            st.download_button(
+                label='🗜️ Download all (TXT / JSON / DOCX / CSV, .zip)',
+                data=archive,
+                file_name='ocr_results.zip',
+                mime='application/zip'
+            )
+
+elif uploaded_files:
+    uploaded_file = uploaded_files[0]
+    # Load as PIL Image for preview and processing
+    original_image = Image.open(uploaded_file).convert('RGB')
+    st.image(original_image, caption='Original image', use_column_width=False, width=400)
 
     # Preprocess actions
-    if st.sidebar.button('Run Preprocess') or method == 'optimal':
+    if method != 'ensemble' and (st.sidebar.button('Run Preprocess') or method == 'optimal'):
         with st.spinner('Preprocessing...'):
-            img = original_image
-            if enhance:
-                img = enhance_contrast(img)
-
-            if method == 'adaptive':
-                pre_img = preprocess_image(img, resize_scale=2.0, denoise=denoise, threshold_method='adaptive')
-            elif method == 'otsu':
-                pre_img = preprocess_with_otsu(img, resize_scale=2.0, denoise=denoise)
-            elif method == 'fixed':
-                pre_img = preprocess_with_fixed_threshold(img, resize_scale=2.0, denoise=denoise, threshold_value=fixed_value)
-            elif method == 'optimal':
-                pre_img = optimal_pipeline(img)
-            else:
-                # no thresholding, only optional denoise/resize
-                pre_img = preprocess_image(img, resize_scale=2.0, denoise=denoise, threshold_method='fixed')
+            pre_img = preprocess_selected(original_image, method, denoise, enhance, fixed_value)
 
             # Show preprocessed preview
             buf = BytesIO()
@@ -64,8 +105,58 @@ if uploaded_file:
     if st.button('Extract Text'):
         with st.spinner('Running OCR...'):
             try:
+                if method == 'ensemble':
+                    result = run_ensemble(original_image, variants=ensemble_variants,
+                                          timeout=ensemble_budget, merge=ensemble_merge)
+                    text = result.get('text', '')
+                    st.markdown(f"### Extracted Text (best variant: {result['variant']})")
+                    st.write(text)
+                    st.json({
+                        'average_confidence': result.get('average_confidence'),
+                        'variants': result.get('variants'),
+                        'timed_out': result.get('timed_out'),
+                        'errors': result.get('errors')
+                    })
+
+                    try:
+                        doc_bytes = create_ocr_document_bytes(text)
+                        st.download_button(
+                            label='📄 Download Word (.docx)',
+                            data=doc_bytes,
+                            file_name='ocr_output.docx',
+                            mime=DOCX_MIME
+                        )
+                    except Exception as e:
+                        st.error(f'Could not create Word document: {e}')
+                elif table_mode:
+                    tables = extract_tables(original_image)
+                    st.markdown(f'### Extracted Tables ({len(tables)})')
+                    if not tables:
+                        st.info('No ruled tables found')
+                    for number, table in enumerate(tables, 1):
+                        st.markdown(f"**Table {number}** ({table['rows']} x {table['cols']})")
+                        st.dataframe(table['data'], use_container_width=True)
+                        st.download_button(
+                            label=f'📊 Download Table {number} (.csv)',
+                            data=table_to_csv(table),
+                            file_name=f'table_{number}.csv',
+                            mime='text/csv',
+                            key=f'table_csv_{number}'
+                        )
+
+                    if tables:
+                        try:
+                            doc_bytes = create_ocr_document_bytes({'tables': tables})
+                            st.download_button(
+                                label='📄 Download Word (.docx)',
+                                data=doc_bytes,
+                                file_name='ocr_tables.docx',
+                                mime=DOCX_MIME
+                            )
+                        except Exception as e:
+                            st.error(f'Could not create Word document: {e}')
                 # prefer formatting-aware extractor if requested
-                if detect_formatting:
+                elif detect_formatting:
                     result = extract_text_with_formatting(uploaded_file)
                     text = result.get('text', '')
                     st.markdown('### Extracted Text (with formatting)')
@@ -73,7 +164,8 @@ if uploaded_file:
                     st.json({
                         'alignment': result.get('alignment'),
                         'confidence': result.get('confidence'),
-                        'properties': result.get('properties')
+                        'properties': result.get('properties'),
+                        'layout': result.get('layout')
                     })
 
                     # Export to Word
@@ -83,15 +175,23 @@ if uploaded_file:
                             label='📄 Download Word (.docx)',
                             data=doc_bytes,
                             file_name='ocr_output.docx',
-                            mime='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+                            mime=DOCX_MIME
                         )
                     except Exception as e:
                         st.error(f'Could not create Word document: {e}')
                 else:
-                    # pass the original file-like object or preprocessed image if available
-                    text = extract_text(original_image)
+                    # stream partial text band by band as OCR progresses
                     st.markdown('### Extracted Text')
-                    st.write(text)
+                    progress_bar = st.progress(0.0)
+                    text_placeholder = st.empty()
+                    text = ''
+                    for event in iter_extract_text(original_image):
+                        progress_bar.progress(event['progress'], text=f"{event['stage'].capitalize()}...")
+                        if event['text'] != text:
+                            text = event['text']
+                            text_placeholder.text(text)
+                    progress_bar.empty()
+                    text_placeholder.write(text)
 
                     # Export to Word
                     try:
@@ -100,7 +200,7 @@ if uploaded_file:
                             label='📄 Download Word (.docx)',
                             data=doc_bytes,
                             file_name='ocr_output.docx',
-                            mime='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+                            mime=DOCX_MIME
                         )
                     except Exception as e:
                         st.error(f'Could not create Word document: {e}')
@@ -7,9 +7,10 @@ import os
 import threading
 from pathlib import Path
 
-from OCR.text_extractor import extract_text, extract_text_with_formatting
+from OCR.text_extractor import extract_text_with_formatting, extract_text_progressive
 from OCR.image_preprocessor import preprocess_image, enhance_contrast, deskew_image, optimal_pipeline
 from OCR.word_generator import create_ocr_document
+from OCR.pipeline import enable_stage_cache
 
 
 class OCRApplication:
@@ -26,6 +27,7 @@ class OCRApplication:
         self.extracted_text = tk.StringVar()
         self.current_image = None
         self.is_processing = False
+        self._run = 0
         
         # Setup GUI
         self.setup_ui()
@@ -172,6 +174,11 @@ class OCRApplication:
     
     def _extract_text_thread(self):
         """Extract text in separate thread."""
+        # Progress events are tagged with the run they belong to, so one
+        # still queued from an earlier run is dropped
+        self._run += 1
+        run = self._run
+        text, error = None, None
         try:
             self.is_processing = True
             self.extract_btn.config(state=tk.DISABLED)
@@ -185,23 +192,51 @@ class OCRApplication:
                 text = result.get('text', '')
                 self.formatting_info = result
             else:
-                text = extract_text(image_path)
+                # Show progress and partial text as each band is recognized
+                self.progress.stop()
+                self.progress.config(mode='determinate')
+                text = extract_text_progressive(image_path,
+                                                on_progress=lambda event: self._report_progress(event, run))
                 self.formatting_info = None
-            
+        
+        except Exception as e:
+            error = e
+        
+        finally:
+            # Through the same after() queue as the progress events, so the
+            # final status lands after every progress update already queued
+            self.root.after(0, self._finish_extraction, run, text, error)
+    
+    def _finish_extraction(self, run, text, error):
+        """Show the result and reset the controls (runs on the Tk main loop)."""
+        if error is not None:
+            messagebox.showerror("Error", f"Text extraction failed: {str(error)}")
+            self.status_var.set("Error during extraction")
+        else:
             self.text_display.delete(1.0, tk.END)
             self.text_display.insert(1.0, text)
             self.extracted_text.set(text)
-            
             self.status_var.set(f"Extracted {len(text)} characters")
         
-        except Exception as e:
-            messagebox.showerror("Error", f"Text extraction failed: {str(e)}")
-            self.status_var.set("Error during extraction")
-        
-        finally:
-            self.progress.stop()
-            self.extract_btn.config(state=tk.NORMAL)
-            self.is_processing = False
+        self.progress.stop()
+        self.progress.config(mode='indeterminate')
+        self.progress_var.set(0)
+        self.extract_btn.config(state=tk.NORMAL)
+        self.is_processing = False
+    
+    def _report_progress(self, event, run):
+        """Forward an extraction progress event to the Tk main loop."""
+        self.root.after(0, self._render_progress, event, run)
+    
+    def _render_progress(self, event, run):
+        """Render progress and partial text (runs on the Tk main loop)."""
+        if run != self._run:
+            return
+        self.progress_var.set(event['progress'] * 100)
+        self.status_var.set(f"{event['stage'].capitalize()}... page {event['page'] + 1}/{event['pages']}")
+        if event['stage'] == 'ocr':
+            self.text_display.delete(1.0, tk.END)
+            self.text_display.insert(1.0, event['text'])
     
     def preprocess_current(self):
         """Preprocess current image."""
@@ -371,6 +406,8 @@ class OCRApplication:
 
 def main():
     """Main entry point for the application."""
+    # Users re-run the same image with other settings; reuse its unchanged stages
+    enable_stage_cache()
     root = tk.Tk()
     app = OCRApplication(root)
     root.mainloop()
@@ -0,0 +1,33 @@
+"""Shared fixtures. The suite never runs Tesseract; OCR output is faked per test."""
+import pytest
+import pytesseract
+
+
+@pytest.fixture(autouse=True)
+def no_tesseract(monkeypatch):
+    """Make any real Tesseract call fail, so tests only see the data they fake."""
+    monkeypatch.setattr(pytesseract.pytesseract, 'tesseract_cmd', '/nonexistent/tesseract')
+
+
+def make_data(words):
+    """
+    Build a pytesseract image_to_data dict.
+
+    Args:
+        words: (text, left, top, width, height, conf, line) tuples; line is an
+               int or a (block, par, line) tuple
+    """
+    data = {key: [] for key in ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                                'left', 'top', 'width', 'height', 'conf', 'text')}
+    for number, (text, left, top, width, height, conf, line) in enumerate(words, 1):
+        block, par, line_num = line if isinstance(line, tuple) else (1, 1, line)
+        for key, value in (('level', 5), ('page_num', 1), ('block_num', block), ('par_num', par),
+                           ('line_num', line_num), ('word_num', number), ('left', left), ('top', top),
+                           ('width', width), ('height', height), ('conf', conf), ('text', text)):
+            data[key].append(value)
+    return data
+
+
+@pytest.fixture
+def fake_data():
+    return make_data
@@ -0,0 +1,277 @@
+import json
+import os
+
+import pytest
+
+from OCR import batch
+from OCR.batch import BatchJob, output_paths, process_file
+
+
+def test_output_paths_do_not_collide(tmp_path):
+    inputs = [tmp_path / 'a' / 'scan.png', tmp_path / 'b' / 'scan.png', tmp_path / 'a' / 'scan.jpg']
+    outputs = [output_paths(str(tmp_path / 'out'), str(p)) for p in inputs]
+    assert len({text for text, _ in outputs}) == 3
+    assert len({data for _, data in outputs}) == 3
+    for text_path, json_path in outputs:
+        assert os.path.basename(text_path).startswith('scan-') and text_path.endswith('.txt')
+        assert json_path == text_path[:-4] + '.json'
+
+
+def test_output_paths_are_stable_for_relative_and_absolute_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert output_paths('out', 'scan.png') == output_paths('out', str(tmp_path / 'scan.png'))
+
+
+def test_same_name_inputs_keep_their_own_results(tmp_path, monkeypatch):
+    from PIL import Image
+    import OCR.text_extractor as text_extractor
+
+    paths = []
+    for folder in ('a', 'b'):
+        os.makedirs(tmp_path / folder)
+        path = str(tmp_path / folder / 'scan.png')
+        Image.new('RGB', (60, 40), 'white').save(path)
+        paths.append(path)
+
+    monkeypatch.setattr('OCR.image_preprocessor.correct_orientation', lambda img: img)
+    monkeypatch.setattr(text_extractor, 'extract_text_with_confidence',
+                        lambda img, **kwargs: {'text': current[0], 'words_with_confidence': [],
+                                               'average_confidence': 0.0})
+    out = str(tmp_path / 'out')
+    os.makedirs(out)
+    current = ['']
+    for folder, path in zip(('a', 'b'), paths):
+        current[0] = f'text from {folder}'
+        process_file(path, out)
+
+    texts = []
+    for path in paths:
+        text_path, json_path = output_paths(out, path)
+        with open(text_path) as f:
+            texts.append(f.read())
+        with open(json_path) as f:
+            assert json.load(f)['text'] == texts[-1]
+    assert texts == ['text from a', 'text from b']
+
+
+def test_manifest_tracks_status(tmp_path):
+    with BatchJob(str(tmp_path / 'm.db'), str(tmp_path / 'out')) as job:
+        job.add(['x.png', 'y.png', 'x.png'])
+        assert job.counts()[batch.PENDING] == 2
+        job._set(os.path.abspath('x.png'), batch.FAILED, error='boom', attempt=True)
+        assert job.failures() == [(os.path.abspath('x.png'), 1, 'boom')]
+        assert job._todo() == [os.path.abspath('x.png'), os.path.abspath('y.png')]
+
+
+def test_process_file_table_mode_writes_csv_per_table(tmp_path, monkeypatch):
+    from PIL import Image
+    import OCR.table_extractor as table_extractor
+
+    path = str(tmp_path / 'invoice.png')
+    Image.new('RGB', (60, 40), 'white').save(path)
+    tables = [{'rows': 1, 'cols': 2, 'cells': [{'row': 0, 'col': 0}, {'row': 0, 'col': 1}],
+               'data': [['qty', '2']]},
+              {'rows': 1, 'cols': 1, 'cells': [{'row': 0, 'col': 0}], 'data': [['total']]}]
+    monkeypatch.setattr('OCR.image_preprocessor.correct_orientation', lambda img: img)
+    monkeypatch.setattr(table_extractor, 'extract_tables', lambda img, **kwargs: tables)
+
+    summary = process_file(path, str(tmp_path), tables=True)
+    assert summary == {'tables': 2, 'cells': 3}
+    text_path, json_path = output_paths(str(tmp_path), path)
+    stem = text_path[:-4]
+    with open(f'{stem}_table1.csv') as f:
+        assert f.read().strip() == 'qty,2'
+    with open(f'{stem}_table2.csv') as f:
+        assert f.read().strip() == 'total'
+    with open(json_path) as f:
+        assert json.load(f)['tables'][1]['data'] == [['total']]
+
+
+def _count_spawns(monkeypatch):
+    spawned = []
+    spawn = batch._WorkerProcess._spawn
+
+    def counting(self):
+        spawn(self)
+        spawned.append(self.process.pid)
+    monkeypatch.setattr(batch._WorkerProcess, '_spawn', counting)
+    return spawned
+
+
+def test_workers_are_reused_across_files(tmp_path, monkeypatch):
+    spawned = _count_spawns(monkeypatch)
+    with BatchJob(str(tmp_path / 'm.db'), str(tmp_path / 'out'), workers=1, max_attempts=1) as job:
+        job.add([str(tmp_path / f'missing{n}.png') for n in range(3)])
+        stats = job.run(poll_interval=0.01)
+        assert stats['failed'] == 3
+        assert all('FileNotFoundError' in error for _, _, error in job.failures())
+    assert len(spawned) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="needs named pipes")
+def test_timeout_replaces_only_the_stuck_worker(tmp_path, monkeypatch):
+    spawned = _count_spawns(monkeypatch)
+    # Opening a FIFO nobody writes to blocks the worker for good
+    stuck = str(tmp_path / 'a_stuck.png')
+    os.mkfifo(stuck)
+    with BatchJob(str(tmp_path / 'm.db'), str(tmp_path / 'out'), workers=1, timeout=1.0,
+                  max_attempts=1) as job:
+        job.add([stuck, str(tmp_path / 'b_missing.png')])
+        job.run(poll_interval=0.01)
+        errors = dict((path, error) for path, _, error in job.failures())
+    assert errors[stuck] == 'Timed out after 1.0s'
+    assert 'FileNotFoundError' in errors[str(tmp_path / 'b_missing.png')]
+    assert len(spawned) == 2
+
+
+def test_kill_without_process_groups_uses_taskkill(monkeypatch):
+    import time
+
+    calls = []
+    monkeypatch.delattr(os, 'killpg')
+    monkeypatch.setattr(batch.subprocess, 'run', lambda args, **kwargs: calls.append(args))
+    process = batch._process_context().Process(target=time.sleep, args=(60,))
+    process.start()
+    batch._kill_tree(process)
+    assert calls == [['taskkill', '/F', '/T', '/PID', str(process.pid)]]
+    assert not process.is_alive()
+
+
+def test_process_file_reuses_indexed_pages(tmp_path, monkeypatch):
+    from PIL import Image
+    import OCR.text_extractor as text_extractor
+    from OCR.page_cache import PerceptualHashIndex
+    from OCR.synthetic import render_page
+
+    page, _ = render_page(seed=1)
+    paths = [str(tmp_path / 'a.png'), str(tmp_path / 'b.png')]
+    for path in paths:
+        page.save(path)
+    calls = []
+    monkeypatch.setattr('OCR.image_preprocessor.correct_orientation', lambda img: img)
+    monkeypatch.setattr(text_extractor, 'extract_text_with_confidence',
+                        lambda img, **kwargs: calls.append(img) or {'text': 'hello', 'words_with_confidence': [],
+                                                                    'average_confidence': 0.0})
+    index = PerceptualHashIndex()
+    assert process_file(paths[0], str(tmp_path), index=index)['reused'] is False
+    assert process_file(paths[1], str(tmp_path), index=index)['reused'] is True
+    assert len(calls) == 1
+    with open(output_paths(str(tmp_path), paths[1])[0]) as f:
+        assert f.read() == 'hello'
+
+
+def test_batch_copies_outputs_of_duplicate_pages(tmp_path, monkeypatch):
+    from OCR.page_cache import PerceptualHashIndex
+    from OCR.synthetic import augment, render_page
+
+    spawned = _count_spawns(monkeypatch)
+    page, _ = render_page(seed=1)
+    source, copy = str(tmp_path / 'source.png'), str(tmp_path / 'copy.png')
+    page.save(source)
+    augment(page, noise=8, seed=0).save(copy)
+    out = str(tmp_path / 'out')
+    os.makedirs(out)
+    text_path, json_path = output_paths(out, source)
+    for name, data in ((text_path, 'hello'), (json_path, '{}'), (text_path[:-4] + '_table1.csv', 'a,b')):
+        with open(name, 'w') as f:
+            f.write(data)
+    index = PerceptualHashIndex()
+    index.add(source, result=source)
+
+    with BatchJob(str(tmp_path / 'm.db'), out, workers=1, index=index) as job:
+        job.add([copy])
+        assert job.run(poll_interval=0.01)['done'] == 1
+    assert spawned == []
+    copy_text, _ = output_paths(out, copy)
+    with open(copy_text) as f:
+        assert f.read() == 'hello'
+    assert os.path.exists(copy_text[:-4] + '_table1.csv')
+
+
+def test_store_receives_finished_results(tmp_path):
+    from OCR.page_cache import PerceptualHashIndex
+    from OCR.result_store import ResultStore
+    from OCR.synthetic import render_page
+
+    page, _ = render_page(seed=1)
+    source, copy = str(tmp_path / 'source.png'), str(tmp_path / 'copy.png')
+    page.save(source)
+    page.save(copy)
+    out = str(tmp_path / 'out')
+    os.makedirs(out)
+    _, json_path = output_paths(out, source)
+    with open(json_path, 'w') as f:
+        json.dump({'text': 'hello world', 'average_confidence': 90.0,
+                   'words_with_confidence': [{'word': 'hello', 'confidence': 90, 'box': [0, 0, 10, 10],
+                                              'line': [1, 1, 1]},
+                                             {'word': 'world', 'confidence': 90, 'box': [12, 0, 10, 10],
+                                              'line': [1, 1, 1]}]}, f)
+    with open(json_path[:-5] + '.txt', 'w') as f:
+        f.write('hello world')
+    index = PerceptualHashIndex()
+    index.add(source, result=source)
+
+    with ResultStore(str(tmp_path / 'store')) as store:
+        with BatchJob(str(tmp_path / 'm.db'), out, workers=1, index=index, store=store) as job:
+            job.add([copy])
+            job.run(poll_interval=0.01)
+        assert store.ids() == [copy]
+        assert store.get(copy)['text'] == 'hello world'
+        # A resumed job never appends a page twice
+        batch._append_result(store, out, copy)
+        assert len(store) == 1
+
+
+def test_store_keeps_table_csv_text(tmp_path):
+    from OCR.result_store import ResultStore
+
+    text_path, json_path = output_paths(str(tmp_path), '/in/invoice.png')
+    with open(text_path, 'w') as f:
+        f.write('qty,2\n')
+    with open(json_path, 'w') as f:
+        json.dump({'tables': []}, f)
+    with ResultStore(str(tmp_path / 'store')) as store:
+        batch._append_result(store, str(tmp_path), '/in/invoice.png')
+        assert store.get_text('/in/invoice.png') == 'qty,2\n'
+
+
+def test_process_file_orients_only_on_request(tmp_path, monkeypatch):
+    from PIL import Image
+    import OCR.text_extractor as text_extractor
+
+    path = str(tmp_path / 'scan.png')
+    Image.new('RGB', (60, 40), 'white').save(path)
+    calls = []
+    monkeypatch.setattr('OCR.image_preprocessor.correct_orientation', lambda img: calls.append(img) or img)
+    monkeypatch.setattr(text_extractor, 'extract_text_with_confidence',
+                        lambda img, **kwargs: {'text': '', 'words_with_confidence': [], 'average_confidence': 0.0})
+    process_file(path, str(tmp_path))
+    assert calls == []
+    process_file(path, str(tmp_path), auto_orient=True)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize('output_format', ['hocr', 'alto', 'pdf'])
+def test_process_file_writes_layout_format(tmp_path, monkeypatch, output_format):
+    from PIL import Image
+    import OCR.text_extractor as text_extractor
+
+    path = str(tmp_path / 'scan.png')
+    Image.new('RGB', (60, 40), 'white').save(path)
+    words = [{'word': 'hello', 'confidence': 90, 'box': (5, 5, 30, 10), 'line': (1, 1, 1)}]
+    monkeypatch.setattr(text_extractor, 'extract_text_with_confidence',
+                        lambda img, **kwargs: {'text': 'hello', 'words_with_confidence': words,
+                                               'average_confidence': 90.0, 'image_size': img.size})
+    process_file(path, str(tmp_path), output_format=output_format)
+
+    stem = output_paths(str(tmp_path), path)[0][:-4]
+    with open(stem + batch.FORMAT_EXTENSIONS[output_format], 'rb') as f:
+        data = f.read()
+    assert (b'hello' in data) if output_format != 'pdf' else data.startswith(b'%PDF')
+    if output_format == 'hocr':
+        assert b'image "scan.png"; bbox 0 0 60 40' in data
+
+
+def test_cli_rejects_format_in_table_mode(tmp_path):
+    with pytest.raises(SystemExit):
+        batch.main([str(tmp_path / 'm.db'), str(tmp_path), '--tables', '--format', 'alto'])
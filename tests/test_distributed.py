@@ -0,0 +1,140 @@
+import multiprocessing
+import sqlite3
+import time
+
+from OCR.batch import BatchJob, CLAIMED, DONE, FAILED, PENDING, RUNNING
+from OCR.distributed import Coordinator, Worker, open_queue, queue_counts, requeue_dead
+
+
+def _open(path, barrier):
+    barrier.wait()
+    open_queue(path).close()
+
+
+def test_concurrent_workers_migrate_once(tmp_path):
+    path = str(tmp_path / 'q.db')
+    with BatchJob(path, str(tmp_path / 'out')) as job:
+        job.add(['a.png'])
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(4)
+    processes = [context.Process(target=_open, args=(path, barrier)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+    assert [process.exitcode for process in processes] == [0] * 4
+    columns = {row[1] for row in sqlite3.connect(path).execute('PRAGMA table_info(files)')}
+    assert {'owner', 'result'} <= columns
+
+
+def test_batch_and_queue_agree_on_journal_mode(tmp_path):
+    path = str(tmp_path / 'q.db')
+    open_queue(path).close()
+    with BatchJob(path, str(tmp_path / 'out')):
+        pass
+    assert sqlite3.connect(path).execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+
+
+def _queue(tmp_path, files=6, **kwargs):
+    job = Coordinator(str(tmp_path / 'q.db'), str(tmp_path / 'out'), **kwargs)
+    job.add([f'/in/{i}.png' for i in range(files)])
+    return job
+
+
+def test_claim_prefetch_and_steal(tmp_path):
+    job = _queue(tmp_path)
+    a = Worker(str(tmp_path / 'q.db'), worker_id='a', prefetch=6)
+    b = Worker(str(tmp_path / 'q.db'), worker_id='b')
+    assert a._next_task() == '/in/0.png'
+    assert queue_counts(a._db)[CLAIMED] == 5
+    assert b._next_task() is None
+    assert b._steal() == 3
+    assert b._next_task() == '/in/3.png'
+    owners = dict(job._db.execute('SELECT path, owner FROM files'))
+    assert [owners[f'/in/{i}.png'] for i in range(6)] == ['a', 'a', 'a', 'b', 'b', 'b']
+
+
+def test_finish_retries_then_fails(tmp_path):
+    _queue(tmp_path, files=1, max_attempts=2)
+    worker = Worker(str(tmp_path / 'q.db'), worker_id='w')
+    worker._register(worker._db)
+    path = worker._next_task()
+    worker._finish(path, FAILED, 'boom', None, 0.1)
+    assert queue_counts(worker._db)[PENDING] == 1
+    assert worker._next_task() == path
+    worker._finish(path, FAILED, 'boom again', None, 0.1)
+    row = worker._db.execute('SELECT status, attempts, error FROM files').fetchone()
+    assert row == (FAILED, 2, 'boom again')
+
+
+def test_dead_worker_tasks_are_requeued(tmp_path):
+    job = _queue(tmp_path, files=3, max_attempts=3, lease=1.0)
+    worker = Worker(str(tmp_path / 'q.db'), worker_id='dead', prefetch=3)
+    worker._register(worker._db)
+    running = worker._next_task()
+    worker._db.execute('UPDATE workers SET heartbeat = ?', (time.time() - 10,))
+
+    assert requeue_dead(job._db, lease=1.0, max_attempts=3) == 3
+    counts = job.counts()
+    assert (counts[PENDING], counts[CLAIMED], counts[RUNNING]) == (3, 0, 0)
+    assert job.workers() == []
+    error = job._db.execute('SELECT error FROM files WHERE path = ?', (running,)).fetchone()[0]
+    assert 'stopped sending heartbeats' in error
+
+    # The stalled worker's late result is dropped rather than overwriting a re-queued task
+    worker._finish(running, DONE, None, {'words': 1}, 0.1)
+    assert job.counts()[DONE] == 0
+
+
+def test_requeue_fails_task_after_max_attempts(tmp_path):
+    job = _queue(tmp_path, files=1, max_attempts=1, lease=1.0)
+    worker = Worker(str(tmp_path / 'q.db'), worker_id='dead')
+    worker._register(worker._db)
+    worker._next_task()
+    worker._db.execute('UPDATE workers SET heartbeat = ?', (time.time() - 10,))
+    requeue_dead(job._db, lease=1.0, max_attempts=1)
+    assert job.counts()[FAILED] == 1
+
+
+def test_worker_run_drains_queue(tmp_path, monkeypatch):
+    job = _queue(tmp_path, files=4)
+    worker = Worker(str(tmp_path / 'q.db'), worker_id='w', heartbeat=0.05, poll_interval=0.01)
+    monkeypatch.setattr(worker, '_execute', lambda path: (DONE, None, {'words': 2}, 0.01))
+    assert worker.run() == {'worker': 'w', 'done': 4, 'failed': 0}
+    assert job.counts()[DONE] == 4
+    assert job.workers() == []
+
+
+def test_worker_keeps_one_child_process_across_files(tmp_path):
+    job = _queue(tmp_path, files=2)
+    worker = Worker(str(tmp_path / 'q.db'), worker_id='w', poll_interval=0.01)
+    first = worker._execute('/in/0.png')
+    pid = worker._child.process.pid
+    second = worker._execute('/in/1.png')
+    assert worker._child.process.pid == pid
+    for status, error, summary, _ in (first, second):
+        assert status == FAILED and error.startswith('FileNotFoundError') and summary is None
+    worker._child.stop()
+    assert not worker._child.process.is_alive()
+    job.close()
+
+
+def test_coordinator_collects_results_into_store(tmp_path):
+    from OCR.batch import output_paths
+    from OCR.result_store import ResultStore
+
+    with ResultStore(str(tmp_path / 'store')) as store:
+        job = Coordinator(str(tmp_path / 'q.db'), str(tmp_path / 'out'), store=store)
+        job.add(['/in/0.png', '/in/1.png'])
+        worker = Worker(str(tmp_path / 'q.db'), worker_id='w')
+        worker._register(worker._db)
+        path = worker._next_task()
+        text_path, json_path = output_paths(str(tmp_path / 'out'), path)
+        with open(json_path, 'w') as f:
+            f.write('{"text": "page zero", "words_with_confidence": [], "average_confidence": 0.0}')
+        worker._finish(path, DONE, None, {'words': 0}, 0.1)
+
+        assert job.collect() == 1
+        assert job.collect() == 0
+        assert store.ids() == ['/in/0.png'] and store.get_text('/in/0.png') == 'page zero'
+        job.close()
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from PIL import Image
+
+from OCR import ensemble
+from OCR.ensemble import _run_variant, _to_original, merge_by_confidence
+
+
+def word(text, x, y, conf, box=None):
+    entry = {'word': text, 'confidence': conf, 'position': (x, y)}
+    if box:
+        entry['box'] = box
+    return entry
+
+
+def result(variant, words, scale=(2.0, 2.0)):
+    return {'variant': variant, 'scale': scale, 'words_with_confidence': words,
+            'average_confidence': sum(w['confidence'] for w in words) / len(words)}
+
+
+def test_to_original_divides_position_and_box():
+    mapped = _to_original(word('a', 200, 100, 90, box=(200, 100, 40, 20)), (2.0, 2.0))
+    assert mapped['position'] == (100, 50)
+    assert mapped['box'] == (100, 50, 20, 10)
+
+
+def test_merge_matches_words_across_scales():
+    resized = result('adaptive', [word('Hel1o', 200, 100, 60), word('World', 400, 100, 95)])
+    unscaled = result('otsu', [word('Hello', 101, 51, 90), word('Wor1d', 200, 50, 40)], scale=(1.0, 1.0))
+    merged = merge_by_confidence([resized, unscaled])
+    assert [w['word'] for w in merged] == ['Hello', 'World']
+    assert [w['position'] for w in merged] == [(100, 50), (200, 50)]
+
+
+def test_merge_leaves_out_reorienting_variants():
+    # The deskewed page's coordinates would land on the wrong word
+    optimal = result('optimal', [word('Wrong', 200, 100, 99)], scale=(2.0, 2.0))
+    adaptive = result('adaptive', [word('Right', 200, 100, 70)])
+    merged = merge_by_confidence([optimal, adaptive])
+    assert [w['word'] for w in merged] == ['Right']
+    assert merge_by_confidence([optimal]) == []
+
+
+def test_run_variant_reports_scale_and_passes_remaining_time(monkeypatch):
+    seen = {}
+
+    def fake_extract(image, **kwargs):
+        seen.update(kwargs)
+        return {'text': '', 'words_with_confidence': [], 'average_confidence': 0.0}
+
+    monkeypatch.setattr(ensemble, 'extract_text_with_confidence', fake_extract)
+    out = _run_variant(Image.new('RGB', (50, 40), 'white'), 'fixed', 'eng', deadline=time.time() + 30)
+    assert out['scale'] == (2.0, 2.0)
+    assert 0 < seen['timeout'] <= 30
+    assert seen['auto_orient'] is False
+
+
+def test_run_variant_fails_after_deadline(monkeypatch):
+    monkeypatch.setattr(ensemble, 'extract_text_with_confidence',
+                        lambda *a, **k: pytest.fail("OCR should not run past the deadline"))
+    with pytest.raises(Exception, match='fixed variant failed'):
+        _run_variant(Image.new('RGB', (50, 40), 'white'), 'fixed', 'eng', deadline=time.time() - 1)
+
+
+def _threaded(monkeypatch):
+    # Workers as threads, so the monkeypatches below reach them
+    from concurrent.futures import ThreadPoolExecutor
+    monkeypatch.setattr(ensemble, 'ProcessPoolExecutor',
+                        lambda max_workers, mp_context, initializer: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr(ensemble, 'extract_text_with_confidence',
+                        lambda image, **kwargs: {'text': 'ok', 'words_with_confidence': [],
+                                                 'average_confidence': 80.0})
+
+
+def test_abandoned_variant_keeps_its_slots_until_it_finishes(monkeypatch):
+    import threading
+    from OCR.shared_pages import PageRing
+
+    _threaded(monkeypatch)
+    release = threading.Event()
+    monkeypatch.setitem(ensemble.PREPROCESSING_VARIANTS, 'quick', lambda image: image)
+    monkeypatch.setitem(ensemble.PREPROCESSING_VARIANTS, 'stuck',
+                        lambda image: release.wait(10) and image)
+    with PageRing(slots=3, slot_bytes=50 * 40 * 3) as ring:
+        out = ensemble.run_ensemble(Image.new('RGB', (50, 40), 'white'), variants=['quick', 'stuck'],
+                                    timeout=0.3, max_workers=2, return_image=True, ring=ring)
+        assert out['variant'] == 'quick' and out['timed_out'] == ['stuck']
+        assert ring.free_slots() == 0
+        release.set()
+        for _ in range(100):
+            if ring.free_slots() == 3:
+                break
+            time.sleep(0.01)
+        assert ring.free_slots() == 3
+
+
+def test_run_ensemble_orients_only_on_request(monkeypatch):
+    _threaded(monkeypatch)
+    calls = []
+    monkeypatch.setattr(ensemble, 'correct_orientation', lambda image: calls.append(image) or image)
+    page = Image.new('RGB', (50, 40), 'white')
+    ensemble.run_ensemble(page, variants=['fixed'])
+    assert calls == []
+    ensemble.run_ensemble(page, variants=['fixed'], auto_orient=True)
+    assert calls == [page]
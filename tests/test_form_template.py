@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pytesseract
+import pytest
+from PIL import Image
+
+from OCR.form_template import FormTemplate, extract_form
+from OCR.synthetic import render_page
+
+FIELDS = [{'name': 'number', 'box': [0.5, 0.0, 0.5, 0.25], 'psm': 7, 'whitelist': '0123456789'},
+          {'name': 'notes', 'box': [0.0, 0.5, 1.0, 0.5], 'psm': 6}]
+
+
+def test_invalid_field_is_rejected():
+    with pytest.raises(ValueError):
+        FormTemplate([{'name': 'x', 'box': [0, 0, 1]}])
+
+
+def test_from_json_resolves_reference_next_to_template(tmp_path):
+    page, _ = render_page(lines=6, width=600, seed=0)
+    page.save(tmp_path / 'blank.png')
+    (tmp_path / 'form.json').write_text(json.dumps({'name': 'f', 'reference_image': 'blank.png',
+                                                    'fields': FIELDS}))
+    template = FormTemplate.from_json(str(tmp_path / 'form.json'))
+    assert template._reference.shape == (page.height, page.width)
+    assert json.loads(template.to_json()) == {'name': 'f', 'fields': FIELDS}
+
+
+def test_crops_scale_with_page_resolution():
+    template = FormTemplate(FIELDS)
+    small = template.crop_fields(np.zeros((100, 200, 3), np.uint8))
+    large = template.crop_fields(np.zeros((300, 600, 3), np.uint8))
+    assert small['number'].shape[:2] == (25, 100) and large['number'].shape[:2] == (75, 300)
+    assert small['notes'].shape[:2] == (50, 200)
+
+
+def test_shifted_scan_is_aligned_to_reference():
+    reference, _ = render_page(lines=10, width=700, seed=3)
+    ref = np.array(reference.convert('L'), dtype=np.float32)
+    scan = Image.new('RGB', reference.size, 'white')
+    scan.paste(reference.crop((0, 0, reference.width - 12, reference.height - 9)), (12, 9))
+
+    aligned = FormTemplate(FIELDS, reference_image=reference).align(scan)
+    aligned = aligned[..., 0].astype(np.float32)
+    before = np.abs(np.array(scan.convert('L'), dtype=np.float32) - ref)[20:-20, 20:-20].mean()
+    after = np.abs(aligned - ref)[20:-20, 20:-20].mean()
+    assert after < before / 3
+
+
+def test_extract_reads_each_zone_with_its_settings(monkeypatch):
+    configs = {}
+
+    def fake_image_to_string(image, lang, config):
+        name = 'number' if 'whitelist' in config else 'notes'
+        configs[name] = (config, lang, image.shape)
+        return f' {name} text \n'
+
+    monkeypatch.setattr(pytesseract, 'image_to_string', fake_image_to_string)
+    page = Image.new('RGB', (200, 100), 'white')
+    assert extract_form(page, FormTemplate(FIELDS), lang='deu', max_workers=1) == \
+        {'number': 'number text', 'notes': 'notes text'}
+    assert '--psm 7' in configs['number'][0] and 'tessedit_char_whitelist=0123456789' in configs['number'][0]
+    assert '--psm 6' in configs['notes'][0]
+    assert configs['number'][1] == 'deu'
+    assert configs['number'][2] == (50, 200)  # 2x the 25x100 zone
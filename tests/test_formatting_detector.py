@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from OCR.formatting_detector import FormattingDetector
+from tests.conftest import make_data
+
+PAGE = np.zeros((1000, 1000, 3), dtype=np.uint8)
+
+
+def _lines(spans, paragraph=None):
+    """One word per line spanning (left, right); all lines in one paragraph unless given."""
+    words = []
+    for i, (left, right) in enumerate(spans):
+        par = paragraph[i] if paragraph else 1
+        words.append((f'line{i}', left, 100 + 40 * i, right - left, 30, 95, (1, par, i + 1)))
+    return make_data(words)
+
+
+def _labels(data, image=PAGE):
+    return [line['alignment'] for line in FormattingDetector()._detect_line_alignments(image, data)]
+
+
+def test_centered_text():
+    assert _labels(_lines([(300, 700), (100, 900), (250, 750)])) == ['center'] * 3
+
+
+def test_right_aligned_text():
+    assert _labels(_lines([(500, 900), (100, 900), (400, 900)])) == ['right'] * 3
+
+
+def test_left_aligned_ragged_text():
+    data = _lines([(100, 700), (100, 900), (100, 650), (100, 500)])
+    assert _labels(data) == ['left'] * 4
+    assert FormattingDetector()._detect_alignment(PAGE, data) == 'left'
+
+
+def test_justified_paragraph_keeps_its_last_line_left():
+    data = _lines([(100, 900), (100, 900), (100, 900), (100, 450)])
+    assert _labels(data) == ['justify', 'justify', 'justify', 'left']
+    assert FormattingDetector()._detect_alignment(PAGE, data) == 'justify'
+
+
+@pytest.mark.parametrize('span, expected', [((200, 800), 'center'), ((50, 650), 'left'), ((380, 980), 'right')])
+def test_single_wide_line_uses_page_position(span, expected):
+    assert _labels(_lines([span])) == [expected]
+
+
+def test_widest_line_of_each_paragraph_is_not_justified():
+    # A centered heading paragraph above a left-aligned one
+    data = _lines([(350, 650), (300, 700), (100, 900), (100, 600)], paragraph=[1, 1, 2, 2])
+    assert _labels(data) == ['center', 'center', 'justify', 'left']
+    data = _lines([(350, 650), (300, 700), (100, 600), (100, 900)], paragraph=[1, 1, 2, 2])
+    assert _labels(data) == ['center', 'center', 'left', 'left']
+
+
+def test_docx_paragraph_alignment_follows_lines():
+    docx = pytest.importorskip('docx')
+    from OCR.word_generator import WordDocumentGenerator
+    data = _lines([(300, 700), (100, 900), (250, 750)])
+    detector = FormattingDetector()
+    lines = detector._detect_line_alignments(PAGE, data)
+    generator = WordDocumentGenerator()
+    generator.add_text_blocks(detector._extract_text_blocks(data, lines))
+    alignments = {p.alignment for p in generator.document.paragraphs}
+    assert alignments == {docx.enum.text.WD_PARAGRAPH_ALIGNMENT.CENTER}
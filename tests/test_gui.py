@@ -0,0 +1,83 @@
+import pytest
+
+pytest.importorskip('tkinter')
+import gui
+
+
+class Fake:
+    """Stands in for Tk variables and widgets: remembers the last value set."""
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def insert(self, index, text):
+        self.value = text
+
+    def delete(self, *args):
+        self.value = ''
+
+    def config(self, **kwargs):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class Root:
+    def __init__(self):
+        self.queue = []
+
+    def after(self, delay, callback, *args):
+        self.queue.append((callback, args))
+
+    def drain(self):
+        while self.queue:
+            callback, args = self.queue.pop(0)
+            callback(*args)
+
+
+def _app():
+    app = gui.OCRApplication.__new__(gui.OCRApplication)
+    app.root = Root()
+    app._run = 0
+    app.is_processing = False
+    app.current_image_path = Fake('page.png')
+    app.with_formatting = Fake(False)
+    for name in ('extract_btn', 'progress', 'status_var', 'progress_var', 'text_display', 'extracted_text'):
+        setattr(app, name, Fake())
+    return app
+
+
+def test_final_status_is_not_overwritten_by_queued_progress(monkeypatch):
+    def fake_progressive(image_path, on_progress):
+        for page in range(2):
+            on_progress({'stage': 'ocr', 'progress': (page + 1) / 2, 'page': page, 'pages': 2,
+                         'text': 'partial'})
+        return 'full text'
+
+    monkeypatch.setattr(gui, 'extract_text_progressive', fake_progressive)
+    app = _app()
+    # The worker finishes before the Tk loop has run any queued event
+    app._extract_text_thread()
+    app.root.drain()
+    assert app.status_var.get() == 'Extracted 9 characters'
+    assert app.progress_var.get() == 0
+    assert app.text_display.get() == 'full text'
+    assert not app.is_processing
+
+
+def test_progress_from_an_earlier_run_is_dropped():
+    app = _app()
+    app._run = 2
+    app.status_var.set('Extracted 3 characters')
+    app._render_progress({'stage': 'ocr', 'progress': 0.5, 'page': 0, 'pages': 2, 'text': 'old'}, 1)
+    assert app.status_var.get() == 'Extracted 3 characters'
@@ -0,0 +1,114 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageOps
+
+from OCR import image_preprocessor
+from OCR.image_preprocessor import (PreprocessingContext, assess_image_quality, classify_layout,
+                                   configure_worker, get_context, optimal_pipeline, tesseract_config)
+from OCR.synthetic import _load_font, render_page
+
+
+@pytest.fixture(autouse=True)
+def restore_opencv_threads(monkeypatch):
+    threads = cv2.getNumThreads()
+    monkeypatch.setattr(image_preprocessor, '_context', None)
+    yield
+    cv2.setNumThreads(threads)
+    cv2.setUseOptimized(True)
+
+
+def test_clahe_objects_are_cached_per_parameters_and_thread():
+    context = PreprocessingContext()
+    clahe = context.get_clahe(2.0, 8)
+    assert context.get_clahe(2, 8) is clahe
+    assert context.get_clahe(3.0, 8) is not clahe
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(context.get_clahe(2.0, 8)))
+    thread.start()
+    thread.join()
+    assert other[0] is not clahe
+
+
+def test_kernels_are_shared_and_match_opencv():
+    context = PreprocessingContext()
+    kernel = context.get_kernel(3)
+    assert context.get_kernel(3, cv2.MORPH_RECT) is kernel
+    np.testing.assert_array_equal(kernel, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+    np.testing.assert_array_equal(context.get_kernel(5, cv2.MORPH_ELLIPSE),
+                                  cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5)))
+
+
+def test_configure_worker_replaces_the_process_context():
+    first = get_context()
+    assert get_context() is first
+    worker = configure_worker(num_threads=1, use_optimized=False)
+    assert get_context() is worker is not first
+    assert worker.num_threads == cv2.getNumThreads() == 1
+    assert worker.use_optimized is False
+
+
+def _text_image(text, size):
+    image = Image.new('RGB', size, 'white')
+    ImageDraw.Draw(image).text((10, 10), text, fill='black', font=_load_font(28))
+    return image
+
+
+def _sparse_page():
+    page = Image.new('RGB', (1400, 1000), 'white')
+    draw = ImageDraw.Draw(page)
+    for position in ((50, 50), (900, 80), (400, 500), (1000, 900)):
+        draw.text(position, 'OK', fill='black', font=_load_font(28))
+    return page
+
+
+@pytest.mark.parametrize('make_image, expected, psm', [
+    (lambda: _text_image('Invoice', (300, 60)), 'single_word', 8),
+    (lambda: _text_image('Total amount due today', (500, 60)), 'single_line', 7),
+    (lambda: render_page(lines=8, seed=0)[0], 'block', 6),
+    (lambda: render_page(lines=40, seed=0)[0], 'page', 3),
+    (_sparse_page, 'sparse', 11),
+], ids=['word', 'line', 'block', 'page', 'sparse'])
+def test_classify_layout_picks_psm_by_input_class(make_image, expected, psm):
+    layout = classify_layout(make_image())
+    assert (layout['class'], layout['psm']) == (expected, psm)
+    assert layout['config'] == f'--psm {psm} -c tessedit_do_invert=0'
+
+
+def test_light_on_dark_text_keeps_tesseract_inversion():
+    layout = classify_layout(ImageOps.invert(render_page(lines=8, seed=0)[0]))
+    assert layout['inverted'] and layout['class'] == 'block'
+    assert layout['config'] == '--psm 6'
+
+
+def test_tesseract_config_modes():
+    blank = Image.new('RGB', (300, 200), 'white')
+    assert tesseract_config(blank)['class'] == 'empty'
+    assert tesseract_config(blank, 4) == {'class': 'manual', 'psm': 4, 'config': '--psm 4'}
+    assert tesseract_config(blank, None)['config'] == ''
+    resolved = {'class': 'block', 'psm': 6, 'config': '--psm 6'}
+    assert tesseract_config(blank, resolved) is resolved
+
+
+def test_rendered_page_is_clean_and_degraded_copies_are_not():
+    from OCR.synthetic import augment
+
+    page, _ = render_page(seed=0)
+    assert assess_image_quality(page)['clean']
+    assert not assess_image_quality(augment(page, noise=12, blur=1.2, seed=0))['clean']
+    assert not assess_image_quality(render_page(font_size=14, seed=0)[0])['clean']  # too small to read as-is
+    assert assess_image_quality(Image.new('RGB', (50, 50), 'white'))['clean'] is False
+
+
+def test_optimal_pipeline_fast_path_returns_clean_pages_untouched(monkeypatch):
+    from OCR import pipeline
+
+    page, _ = render_page(lines=6, seed=1)
+    monkeypatch.setattr(pipeline.PreprocessingPipeline, 'run',
+                        lambda *a, **k: pytest.fail("clean pages should skip the pipeline"))
+    out = optimal_pipeline(page)
+    assert out.size == page.size and np.array_equal(np.array(out), np.array(page))
+    assert optimal_pipeline(page, binary=True).mode == '1'
@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# What app.py and gui.py import at startup
+MODULES = ['OCR', 'OCR.text_extractor', 'OCR.image_preprocessor', 'OCR.word_generator',
+           'OCR.ensemble', 'OCR.table_extractor', 'OCR.uploads']
+HEAVY = ['cv2', 'numpy', 'pytesseract', 'docx']
+BUDGET_SECONDS = 1.0
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+@pytest.mark.parametrize('modules', [['OCR'], MODULES], ids=['package', 'app-imports'])
+def test_import_stays_lazy_and_within_budget(modules):
+    # A fresh interpreter, so nothing imported by the test session counts
+    out = subprocess.run([sys.executable, '-c', SCRIPT.format(modules=modules, heavy=HEAVY)],
+                         capture_output=True, text=True, check=True, timeout=60)
+    report = json.loads(out.stdout)
+    assert report['loaded'] == []
+    assert report['seconds'] < BUDGET_SECONDS
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+import time
+
+import pytest
+from PIL import Image
+
+from OCR import loadtest
+
+
+def test_rss_includes_child_processes():
+    before = loadtest._rss_bytes()
+    child = subprocess.Popen([sys.executable, '-c',
+                              'import sys, time; x = bytearray(80_000_000); x[::4096] = b"1" * len(x[::4096]);'
+                              ' print(flush=True); time.sleep(30)'],
+                             stdout=subprocess.PIPE)
+    try:
+        child.stdout.readline()
+        if not loadtest._descendants(loadtest.os.getpid()):
+            pytest.skip("no /proc process table")
+        assert loadtest._rss_bytes() - before > 60_000_000
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_run_load_test_reports_latency_and_errors(monkeypatch):
+    calls = []
+
+    def target(image):
+        calls.append(image.size)
+        time.sleep(0.01)
+        if len(calls) == 3:
+            raise ValueError('boom')
+
+    monkeypatch.setitem(loadtest.TARGETS, 'fake', target)
+    result = loadtest.run_load_test('fake', clients=2, requests_per_client=3,
+                                    images=[Image.new('RGB', (10, 10))], sample_interval=0.01)
+    assert (result['requests'], result['errors'], result['first_error']) == (6, 1, 'boom')
+    assert len(calls) == 6
+    assert 0.01 <= result['p50'] <= result['p99']
+    assert result['rss_mb_peak'] > 0
+
+
+def test_fake_uploader_returns_the_session_page():
+    loadtest._uploads.current = (b'\x89PNG data', 'page.png')
+    try:
+        uploads = loadtest._fake_file_uploader('Upload images', accept_multiple_files=True)
+        assert [(u.name, u.size, u.read()) for u in uploads] == [('page.png', 9, b'\x89PNG data')]
+        assert loadtest._fake_file_uploader('Upload image').name == 'page.png'
+    finally:
+        del loadtest._uploads.current
+    assert loadtest._fake_file_uploader('Upload images', accept_multiple_files=True) == []
+
+
+def test_app_target_uploads_and_extracts(monkeypatch):
+    pytest.importorskip('streamlit')
+    import OCR.text_extractor as text_extractor
+
+    monkeypatch.setattr(text_extractor, 'iter_extract_text',
+                        lambda image, **kwargs: iter([{'stage': 'done', 'progress': 1.0, 'text': 'Hello'}]))
+    at = loadtest._target_app(Image.new('RGB', (200, 100), 'white'))
+    assert not at.exception
+    assert any('Hello' in str(element.value) for element in at.markdown)
@@ -0,0 +1,94 @@
+from PIL import Image, ImageDraw
+import numpy as np
+import pytest
+import pytesseract
+
+from OCR.image_preprocessor import correct_orientation, detect_orientation, rotate_image
+from OCR.synthetic import _load_font, render_page
+
+
+def _crop(text, size=40):
+    font = _load_font(size)
+    left, top, right, bottom = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), text, font=font)
+    image = Image.new('RGB', (right - left + 8, bottom - top + 8), 'white')
+    ImageDraw.Draw(image).text((4 - left, 4 - top), text, fill='black', font=font)
+    return image
+
+
+def _osd(rotate):
+    return (f"Page number: 0\nOrientation in degrees: {(360 - rotate) % 360}\nRotate: {rotate}\n"
+            "Orientation confidence: 9.50\nScript: Latin\nScript confidence: 3.00\n")
+
+
+@pytest.mark.parametrize('text', ['Invoice', 'HELLO WORLD', 'Total: 1,234.56', '1111'])
+def test_upright_crop_is_left_alone(text):
+    assert detect_orientation(_crop(text))['rotate'] == 0
+
+
+@pytest.mark.parametrize('text', ['Invoice', 'HELLO WORLD', 'Total: 1,234.56'])
+def test_upright_crop_fallback_needs_several_lines(text):
+    # Large enough to pass the size check, still a single line of text
+    image = _crop(text, size=140)
+    assert min(image.size) >= 100
+    assert detect_orientation(image)['rotate'] == 0
+
+
+def test_small_crop_skips_osd(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pytesseract, 'image_to_osd', lambda *a, **k: calls.append(1) or _osd(90))
+    assert detect_orientation(_crop('Invoice'))['method'] == 'size'
+    assert not calls
+
+
+def test_fallback_upright_page():
+    page, _ = render_page(lines=8, words_per_line=6, width=900, seed=1)
+    result = detect_orientation(page)
+    assert (result['rotate'], result['method']) == (0, 'projection')
+
+
+@pytest.mark.parametrize('angle', [90, 270])
+def test_fallback_turns_sideways_page_the_way_it_reads_best(monkeypatch, angle, fake_data):
+    page, _ = render_page(lines=8, words_per_line=6, width=900, seed=1)
+    upright = np.array(page.convert('L'))
+
+    def fake_ocr(image, **kwargs):
+        conf = 91 if np.array_equal(image, upright) else 35
+        return fake_data([('word', 0, 0, 10, 10, conf, 1)])
+
+    monkeypatch.setattr(pytesseract, 'image_to_data', fake_ocr)
+    result = detect_orientation(rotate_image(page, angle))
+    assert (result['rotate'], result['method']) == ((360 - angle) % 360, 'projection')
+    assert np.array_equal(np.array(correct_orientation(rotate_image(page, angle))), np.array(page))
+
+
+@pytest.mark.parametrize('angle', [90, 270])
+def test_fallback_leaves_sideways_page_when_direction_is_unknown(monkeypatch, angle, fake_data):
+    page, _ = render_page(lines=8, words_per_line=6, width=900, seed=1)
+    # Without Tesseract (the conftest default) or with equal readings, never guess
+    assert detect_orientation(rotate_image(page, angle))['rotate'] == 0
+    monkeypatch.setattr(pytesseract, 'image_to_data',
+                        lambda *a, **k: fake_data([('word', 0, 0, 10, 10, 80, 1)]))
+    assert detect_orientation(rotate_image(page, angle))['rotate'] == 0
+
+
+def test_fallback_cannot_see_upside_down():
+    page, _ = render_page(lines=8, words_per_line=6, width=900, seed=1)
+    assert detect_orientation(rotate_image(page, 180))['rotate'] == 0
+
+
+@pytest.mark.parametrize('angle', [90, 180, 270])
+def test_osd_rotation_is_undone(monkeypatch, angle):
+    page, _ = render_page(lines=8, words_per_line=6, width=900, seed=1)
+    turned = rotate_image(page, angle)
+    monkeypatch.setattr(pytesseract, 'image_to_osd', lambda *a, **k: _osd((360 - angle) % 360))
+    result = detect_orientation(turned)
+    assert (result['rotate'], result['method']) == ((360 - angle) % 360, 'osd')
+    assert np.array_equal(np.array(correct_orientation(turned)), np.array(page))
+
+
+def test_extractors_do_not_orient_by_default(monkeypatch):
+    from OCR import text_extractor
+    monkeypatch.setattr(text_extractor, 'detect_orientation',
+                        lambda *a, **k: pytest.fail('orientation detection ran by default'))
+    monkeypatch.setattr(pytesseract, 'image_to_string', lambda *a, **k: 'Invoice')
+    assert text_extractor.extract_text(_crop('Invoice')) == 'Invoice'
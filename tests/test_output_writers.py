@@ -0,0 +1,99 @@
+import io
+import re
+import xml.etree.ElementTree as ET
+import zlib
+
+import pytesseract
+import pytest
+from PIL import Image
+
+from OCR.output_writers import ALTOWriter, HOCRWriter, SearchablePDFWriter, open_writer
+from OCR.text_extractor import extract_text_with_confidence
+from tests.conftest import make_data
+
+ALTO = '{http://www.loc.gov/standards/alto/ns-v4#}'
+XHTML = '{http://www.w3.org/1999/xhtml}'
+
+
+@pytest.fixture
+def result(monkeypatch):
+    data = make_data([('Tom', 10, 10, 40, 20, 91, (1, 1, 1)),
+                      ('&', 55, 10, 10, 20, 88, (1, 1, 1)),
+                      ('Jerry', 70, 10, 50, 20, 95, (1, 1, 1)),
+                      ('(c)', 10, 40, 30, 20, 70, (1, 1, 2)),
+                      ('Footer', 10, 150, 60, 20, 80, (2, 1, 1)),
+                      ('noise', 10, 180, 40, 10, 12, (2, 1, 2))])
+    monkeypatch.setattr(pytesseract, 'image_to_data', lambda *a, **k: data)
+    return extract_text_with_confidence(Image.new('RGB', (200, 200), 'white'), psm=None)
+
+
+def test_hocr_is_well_formed_with_lines_and_escaped_words(result):
+    sink = io.BytesIO()
+    with HOCRWriter(sink) as writer:
+        writer.add_result(result, image='scan 1; copy.png')
+        writer.add_result(result)
+    root = ET.fromstring(sink.getvalue())
+    pages = root.findall(f'.//{XHTML}div[@class="ocr_page"]')
+    assert len(pages) == 2
+    assert pages[0].get('title') == 'image "scan 1; copy.png"; bbox 0 0 200 200; ppageno 0'
+    lines = pages[0].findall(f'{XHTML}span[@class="ocr_line"]')
+    assert [[w.text for w in line] for line in lines] == [['Tom', '&', 'Jerry'], ['(c)'], ['Footer']]
+    assert lines[0].get('title') == 'bbox 10 10 120 30'
+    assert lines[0][2].get('title') == 'bbox 70 10 120 30; x_wconf 95'
+
+
+def test_alto_groups_lines_into_blocks(result):
+    sink = io.BytesIO()
+    with ALTOWriter(sink) as writer:
+        writer.add_result(result)
+    root = ET.fromstring(sink.getvalue())
+    blocks = root.findall(f'.//{ALTO}TextBlock')
+    assert [len(block.findall(f'{ALTO}TextLine')) for block in blocks] == [2, 1]
+    strings = root.findall(f'.//{ALTO}String')
+    assert [s.get('CONTENT') for s in strings] == ['Tom', '&', 'Jerry', '(c)', 'Footer']
+    assert strings[2].get('WC') == '0.95'
+    assert (strings[2].get('HPOS'), strings[2].get('WIDTH')) == ('70', '50')
+
+
+def test_alto_block_ids_are_unique_when_block_num_recurs():
+    words = [{'word': word, 'confidence': 90, 'box': (10, top, 40, 20), 'line': (block, 1, 1)}
+             for word, top, block in (('one', 10, 1), ('two', 40, 2), ('three', 70, 1))]
+    sink = io.BytesIO()
+    with ALTOWriter(sink) as writer:
+        writer.add_page(words, 200, 200)
+        writer.add_page(words, 200, 200)
+    root = ET.fromstring(sink.getvalue())
+    ids = [block.get('ID') for block in root.findall(f'.//{ALTO}TextBlock')]
+    assert ids == ['block_1_1', 'block_1_2', 'block_1_3', 'block_2_1', 'block_2_2', 'block_2_3']
+
+
+def test_pdf_has_valid_xref_and_text_layer(result, tmp_path):
+    path = str(tmp_path / 'out.pdf')
+    page = Image.new('RGB', (200, 200), 'white')
+    with open_writer('pdf', path, dpi=72) as writer:
+        writer.add_result(result, image=page)
+        writer.add_result(result, image=page)
+    data = open(path, 'rb').read()
+
+    xref_offset = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', data).group(1))
+    assert data[xref_offset:].startswith(b'xref\n')
+    entries = re.findall(rb'(\d{10}) 00000 n ', data[xref_offset:])
+    for obj_id, offset in enumerate(entries, start=1):
+        assert data[int(offset):].startswith(f'{obj_id} 0 obj'.encode())
+    assert b'/Count 2' in data
+
+    streams = re.findall(rb'/FlateDecode >>\nstream\n(.*?)\nendstream', data, re.S)
+    text = zlib.decompress(streams[0])
+    assert b'3 Tr' in text
+    shown = re.findall(rb'Tm \((.*)\) Tj\n', text)
+    assert shown == [b'Tom', b'&', b'Jerry', b'\\(c\\)', b'Footer']
+
+
+def test_pdf_needs_page_image(result):
+    with pytest.raises(ValueError):
+        SearchablePDFWriter(io.BytesIO()).add_result(result)
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        open_writer('epub', io.BytesIO())
@@ -0,0 +1,81 @@
+from PIL import ImageDraw
+
+from OCR.page_cache import PerceptualHashIndex, page_signature
+from OCR.synthetic import augment, render_page
+
+
+def form(amount, seed=1):
+    page, _ = render_page(lines=12, seed=seed)
+    ImageDraw.Draw(page).text((56, 560), f"Total due: {amount}", fill='black')
+    return page
+
+
+# The filled-in amount on form()
+AMOUNT = (0.03, 0.85, 0.4, 0.06)
+
+
+def test_near_duplicates_are_reused_by_default():
+    index = PerceptualHashIndex()
+    assert index.max_distance == 5 and not index.verify
+    page, _ = render_page(seed=1)
+    index.add(page, result='page one')
+    assert index.lookup(augment(page, noise=8, seed=0))[0] == 'page one'
+    assert index.lookup(augment(page, jpeg_quality=75))[0] == 'page one'
+    assert index.lookup(render_page(seed=2)[0])[0] is None
+
+
+def test_region_check_keeps_same_layout_pages_apart():
+    first, second = form('100.00'), form('700.00')
+    # The hash alone cannot tell these apart
+    hash_only = PerceptualHashIndex()
+    hash_only.add(first, result={'text': '100.00'})
+    assert hash_only.lookup(second)[0] == {'text': '100.00'}
+
+    index = PerceptualHashIndex(regions=[AMOUNT])
+    index.add(first, result={'text': '100.00'})
+    result, similarity = index.lookup(second)
+    assert result is None
+    assert similarity == 1.0
+    assert index.lookup(augment(form('100.00'), noise=8, seed=0))[0] == {'text': '100.00'}
+
+
+def test_verify_reuses_only_identical_pages():
+    index = PerceptualHashIndex(verify=True)
+    calls = []
+
+    def compute(page):
+        calls.append(page)
+        return {'n': len(calls)}
+
+    assert index.get_or_compute(form('1'), compute) == ({'n': 1}, False)
+    assert index.get_or_compute(form('1'), compute) == ({'n': 1}, True)
+    assert index.get_or_compute(augment(form('1'), noise=8, seed=0), compute) == ({'n': 2}, False)
+    assert index.get_or_compute(form('2'), compute) == ({'n': 3}, False)
+    assert len(index) == 3
+
+
+def test_save_and_load_keep_regions_and_signatures(tmp_path):
+    index = PerceptualHashIndex(regions=[AMOUNT])
+    index.add(form('1'), result={'text': 'one'})
+    index.add(render_page(seed=3)[0], result={'text': 'other'})
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+
+    loaded = PerceptualHashIndex.load(path)
+    assert loaded.regions == [AMOUNT] and loaded.max_distance == index.max_distance
+    assert loaded.lookup(form('1'))[0] == {'text': 'one'}
+    assert loaded.lookup(form('2'))[0] is None
+
+    exact = PerceptualHashIndex(verify=True)
+    exact.add(form('1'), result='one')
+    exact.save(path)
+    loaded = PerceptualHashIndex.load(path)
+    assert loaded.verify
+    assert loaded.lookup(form('1'))[0] == 'one'
+    assert loaded.lookup(form('2'))[0] is None
+
+
+def test_page_signature_includes_size():
+    page = form('1')
+    assert page_signature(page)[:2] == (page.height, page.width)
+    assert page_signature(page) != page_signature(page.crop((0, 0, page.width, page.height - 1)))
@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+from OCR import pipeline
+from OCR.pipeline import PreprocessingPipeline, StageCache, build_stages
+
+
+def page(seed=0, shape=(60, 80, 3)):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+STAGES = [{'op': 'resize', 'scale': 1.5}, {'op': 'grayscale'},
+          {'op': 'threshold', 'method': 'otsu'}]
+
+
+def test_spec_round_trips_through_json():
+    spec = PreprocessingPipeline(build_stages(threshold_method='sauvola'))
+    assert PreprocessingPipeline.from_json(spec.to_json()).stages == spec.stages
+
+
+def test_unknown_stage_is_rejected():
+    with pytest.raises(ValueError, match='blur'):
+        PreprocessingPipeline([{'op': 'blur'}])
+
+
+def test_changing_a_later_stage_reuses_the_cached_prefix(monkeypatch):
+    cache = StageCache()
+    calls = []
+    resize = pipeline.STAGE_OPERATIONS['resize']
+    monkeypatch.setitem(pipeline.STAGE_OPERATIONS, 'resize',
+                        lambda img, **kw: calls.append(kw) or resize(img, **kw))
+    img = page()
+
+    first = PreprocessingPipeline(STAGES).run_array(img, cache=cache)
+    fixed = STAGES[:2] + [{'op': 'threshold', 'method': 'fixed', 'value': 100}]
+    second = PreprocessingPipeline(fixed).run_array(img, cache=cache)
+    assert len(calls) == 1
+    assert cache.hits >= 1
+
+    uncached = PreprocessingPipeline(fixed).run_array(img, cache=False)
+    np.testing.assert_array_equal(second, uncached)
+    assert not np.array_equal(first, second)
+
+
+def test_different_inputs_do_not_share_cache_entries():
+    cache = StageCache()
+    spec = PreprocessingPipeline(STAGES)
+    a = spec.run_array(page(0), cache=cache)
+    b = spec.run_array(page(1), cache=cache)
+    assert not np.array_equal(a, b)
+
+
+def test_cache_is_bounded_and_read_only():
+    cache = StageCache(max_bytes=2500)
+    for key in 'abc':
+        cache.put(key, np.zeros(1000, np.uint8))
+    assert cache.get('a') is None and cache.get('c') is not None
+    assert not cache.get('c').flags.writeable
+    cache.put('big', np.zeros(5000, np.uint8))
+    assert cache.get('big') is None
+
+
+def test_inplace_tail_never_writes_into_input_or_cache():
+    img = page(2, shape=(50, 70))
+    original = img.copy()
+    cache = StageCache()
+    stages = [{'op': 'threshold', 'method': 'adaptive', 'block_size': 11, 'c': 2},
+              {'op': 'morphology', 'operations': ['close', 'open'], 'kernel_size': 2}]
+    out = PreprocessingPipeline(stages).run_array(img, cache=cache)
+    np.testing.assert_array_equal(img, original)
+    assert out.dtype == np.uint8 and set(np.unique(out)) <= {0, 255}
+
+    resized = PreprocessingPipeline([{'op': 'resize', 'scale': 1.0}] + stages)
+    resized.run_array(img, cache=cache)
+    cached = [value.copy() for value in cache._entries.values()]
+    resized.run_array(img, cache=cache)
+    for before, after in zip(cached, cache._entries.values()):
+        np.testing.assert_array_equal(before, after)
+
+
+def test_merged_morphology_passes_match_opencv_close_then_open():
+    import cv2
+
+    binary = (page(3, shape=(40, 40)) > 128).astype(np.uint8) * 255
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+    expected = cv2.morphologyEx(cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel), cv2.MORPH_OPEN, kernel)
+    assert pipeline._morphology_passes(['close', 'open'], 1) == [['dilate', 1], ['erode', 2], ['dilate', 1]]
+    np.testing.assert_array_equal(pipeline._op_morphology(binary.copy(), kernel_size=2), expected)
+
+
+def reference_mean_std(gray, window):
+    radius = window // 2
+    height, width = gray.shape
+    mean = np.empty(gray.shape)
+    std = np.empty(gray.shape)
+    for y in range(height):
+        for x in range(width):
+            patch = gray[max(y - radius, 0):y + radius + 1, max(x - radius, 0):x + radius + 1].astype(float)
+            mean[y, x], std[y, x] = patch.mean(), patch.std()
+    return mean, std
+
+
+def test_integral_image_statistics_match_direct_windows():
+    gray = page(4, shape=(23, 31))
+    mean, std = pipeline._local_mean_std(gray, 7)
+    expected_mean, expected_std = reference_mean_std(gray, 7)
+    np.testing.assert_allclose(mean, expected_mean, atol=1e-3)
+    np.testing.assert_allclose(std, expected_std, atol=1e-2)
+
+
+@pytest.mark.parametrize('method', ['sauvola', 'niblack'])
+def test_local_thresholds_follow_their_formulas(method):
+    gray = page(5, shape=(23, 31))
+    k = pipeline.LOCAL_THRESHOLD_K[method]
+    mean, std = reference_mean_std(gray, 9)
+    threshold = mean * (1 + k * (std / 128.0 - 1)) if method == 'sauvola' else mean + k * std
+    expected = np.where(gray > threshold, 255, 0)
+    out = pipeline._op_threshold(gray, method=method, window=9)
+    # Pixels within float rounding of their threshold may go either way
+    unsure = np.abs(gray - threshold) < 1e-3
+    np.testing.assert_array_equal(out[~unsure], expected[~unsure])
+
+
+def test_local_threshold_keeps_text_on_uneven_lighting():
+    gradient = np.tile(np.linspace(60, 250, 120), (60, 1))
+    gray = gradient.astype(np.uint8)
+    gray[20:40, 10:110:10] = (gradient[20:40, 10:110:10] * 0.4).astype(np.uint8)
+    out = pipeline._op_threshold(gray, method='sauvola', window=15)
+    assert (out[20:40, 10:110:10] == 0).all()
+    assert (out[:10] == 255).mean() > 0.95
+
+
+def test_pass_through_stage_does_not_freeze_the_callers_array():
+    img = page(3, shape=(40, 50))
+    cache = StageCache()
+    out = PreprocessingPipeline([{'op': 'grayscale'}]).run_array(img, cache=cache)
+    assert out is img and img.flags.writeable
+    cached, = cache._entries.values()
+    assert cached is not img and not cached.flags.writeable
+    img[0, 0] ^= 255
+    assert cached[0, 0] != img[0, 0]
+
+
+def test_process_wide_cache_is_opt_in(monkeypatch):
+    monkeypatch.setattr(pipeline, '_stage_cache', None)
+    PreprocessingPipeline(STAGES).run_array(page())
+    assert pipeline.get_stage_cache() is None
+
+    cache = pipeline.enable_stage_cache(max_bytes=1 << 20)
+    assert pipeline.enable_stage_cache(max_bytes=1 << 20) is cache
+    PreprocessingPipeline(STAGES).run_array(page())
+    assert len(cache._entries) == 2
+    pipeline.disable_stage_cache()
+    assert pipeline.get_stage_cache() is None
@@ -0,0 +1,34 @@
+import pytesseract
+from PIL import Image
+
+from OCR.synthetic import render_page
+from OCR.text_extractor import _split_into_bands, extract_text_progressive, iter_extract_text
+
+
+def test_empty_page_list_yields_single_done_event():
+    assert list(iter_extract_text([])) == [{'stage': 'done', 'page': 0, 'pages': 0, 'progress': 1.0, 'text': ''}]
+    assert extract_text_progressive([]) == ''
+
+
+def test_zero_height_page_is_skipped(monkeypatch):
+    monkeypatch.setattr(pytesseract, 'image_to_string', lambda *a, **k: 'never')
+    events = list(iter_extract_text(Image.new('RGB', (50, 0)), psm=None))
+    assert [e['stage'] for e in events] == ['load', 'done']
+    assert events[-1]['progress'] == 1.0 and events[-1]['text'] == ''
+
+
+def test_bands_stream_text_with_increasing_progress(monkeypatch):
+    page, _ = render_page(lines=12, seed=0)
+    bands = _split_into_bands(page, max_bands=3)
+    assert len(bands) == 3
+    assert bands[0][0] == 0 and bands[-1][1] == page.height
+    assert all(a[1] == b[0] for a, b in zip(bands, bands[1:]))
+
+    replies = iter(['first', '', 'third', 'page two'])
+    monkeypatch.setattr(pytesseract, 'image_to_string', lambda *a, **k: next(replies))
+    events = list(iter_extract_text([page, Image.new('RGB', (100, 40), 'white')], max_bands=3, psm=6))
+    progress = [e['progress'] for e in events]
+    assert progress == sorted(progress) and progress[-1] == 1.0
+    assert [e['text'] for e in events if e['stage'] == 'ocr'] == \
+        ['first', 'first', 'first\nthird', 'first\nthird\n\npage two']
+    assert events[-1]['text'] == 'first\nthird\n\npage two'
@@ -0,0 +1,48 @@
+import pytesseract
+from PIL import Image
+
+from OCR.text_extractor import extract_text_with_confidence, refine_low_confidence_words
+from tests.conftest import make_data
+
+
+def word(text, box, conf):
+    return {'word': text, 'confidence': conf, 'position': box[:2], 'box': box, 'line': (1, 1, 1)}
+
+
+WORDS = [word('He1lo', (10, 10, 40, 20), 35), word('big', (60, 10, 30, 20), 96),
+         word('Wor1d', (100, 10, 40, 20), 40)]
+
+
+def test_only_low_confidence_words_are_reread_in_one_call(monkeypatch):
+    calls = []
+
+    def fake_image_to_data(strip, **kwargs):
+        calls.append(strip.shape)
+        # Two 48x28 crops scaled 3x, stacked with 20-pixel gaps: rows 20-104 and 124-208
+        return make_data([('Hello', 30, 40, 100, 40, 92, 1), ('Wor', 30, 140, 60, 40, 30, 2),
+                          ('1d', 95, 140, 30, 40, 38, 2)])
+
+    monkeypatch.setattr(pytesseract, 'image_to_data', fake_image_to_data)
+    refined, improved = refine_low_confidence_words(Image.new('RGB', (200, 60), 'white'), WORDS)
+    assert calls == [(2 * 84 + 3 * 20, 144 + 2 * 20)]
+    assert improved == 1
+    assert [(w['word'], w['confidence']) for w in refined] == [('Hello', 92), ('big', 96), ('Wor1d', 40)]
+    assert refined[0]['box'] == WORDS[0]['box']
+    assert WORDS[0]['word'] == 'He1lo'  # the input list is not modified
+
+
+def test_confident_pages_skip_tesseract(monkeypatch):
+    monkeypatch.setattr(pytesseract, 'image_to_data', lambda *a, **k: calls.append(1))
+    calls = []
+    confident = [dict(w, confidence=90) for w in WORDS]
+    assert refine_low_confidence_words(Image.new('RGB', (200, 60)), confident) == (confident, 0)
+    assert calls == []
+
+
+def test_refine_option_recovers_words_below_the_cutoff(monkeypatch):
+    replies = iter([make_data([('Hi', 10, 10, 30, 20, 91, 1), ('tbere', 50, 10, 40, 20, 25, 1)]),
+                    make_data([('there', 30, 40, 100, 40, 88, 1)])])
+    monkeypatch.setattr(pytesseract, 'image_to_data', lambda *a, **k: next(replies))
+    page = Image.new('RGB', (200, 60), 'white')
+    result = extract_text_with_confidence(page, psm=None, refine=True)
+    assert result['text'] == 'Hi there'
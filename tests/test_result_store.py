@@ -0,0 +1,136 @@
+import os
+
+import pytest
+
+from OCR import result_store
+from OCR.result_store import ResultStore
+
+
+def _word(word, left, line=1, confidence=90):
+    return {'word': word, 'confidence': confidence, 'box': (left, 10, 40, 20), 'line': (1, 1, line)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultStore(str(tmp_path / 'store')) as s:
+        s.append('a', {'words_with_confidence': [_word('Invoice', 0), _word('total', 50)],
+                       'average_confidence': 90.0})
+        s.append('b', 'Ärger im Büro')
+        s.append('c', '')
+        s.append('d', 'second invoice page')
+        yield s
+
+
+def test_round_trip(store):
+    assert store.ids() == ['a', 'b', 'c', 'd']
+    page = store.get('a')
+    assert page['text'] == 'Invoice total'
+    assert [w['word'] for w in page['words_with_confidence']] == ['Invoice', 'total']
+    assert page['words_with_confidence'][1]['box'] == (50, 10, 40, 20)
+    assert store.get_text('b') == 'Ärger im Büro'
+
+
+def test_search_one_hit_per_page(store):
+    assert store.search('invoice') == ['a', 'd']
+    assert store.search('invoice', ignore_case=False) == ['d']
+    assert store.search('invoice', limit=1) == ['a']
+    assert store.search('total second') == []  # no match across page boundaries
+
+
+@pytest.mark.parametrize('pattern', ['x*', '', '(?:)', 'z?'])
+def test_search_empty_matches_terminate(store, pattern):
+    result = store.search(pattern, regex=True)
+    if pattern:
+        # An empty match hits every page with text, each once
+        assert result == ['a', 'b', 'd']
+    else:
+        assert result == []
+
+
+def test_search_empty_match_with_limit_none_and_bytes_path(store):
+    assert store.search('x*', regex=True, ignore_case=False) == ['a', 'b', 'd']
+
+
+def test_search_unicode_ignore_case(store):
+    assert store.search('ärger') == ['b']
+    assert store.search('BÜRO') == ['b']
+    assert store.search('b[üu]ro', regex=True) == ['b']
+    assert store.search('BÜRO', ignore_case=False) == []
+
+
+def test_search_unicode_in_small_chunks(store, monkeypatch):
+    monkeypatch.setattr(result_store, 'SEARCH_CHUNK_BYTES', 4)
+    assert store.search('büro') == ['b']
+    assert store.search('PAGE') == ['d']
+    assert store.search('.', regex=True) == ['a', 'b', 'd']
+
+
+def test_reopen_drops_uncommitted_tail(tmp_path):
+    path = str(tmp_path / 'store')
+    with ResultStore(path) as s:
+        s.append('a', 'first')
+        s.append('b', 'second')
+    # Crash after the data and docs record of 'c' but before its id
+    with open(os.path.join(path, 'text.bin'), 'ab') as f:
+        f.write(b'third')
+    with open(os.path.join(path, 'docs.bin'), 'ab') as f:
+        f.write(b'\0' * 28)
+    with open(os.path.join(path, 'ids.txt'), 'a') as f:
+        f.write('partial-id-without-newline')
+
+    with ResultStore(path) as s:
+        assert s.ids() == ['a', 'b']
+        s.append('c', 'third')
+    with ResultStore(path, readonly=True) as s:
+        assert s.ids() == ['a', 'b', 'c']
+        assert [s.get_text(i) for i in s.ids()] == ['first', 'second', 'third']
+
+
+def test_recovery_never_rewrites_ids(tmp_path, monkeypatch):
+    path = str(tmp_path / 'store')
+    with ResultStore(path) as s:
+        s.append('a', 'first')
+
+    real_open = open
+
+    def guarded_open(file, mode='r', *args, **kwargs):
+        if str(file).endswith('ids.txt') and 'w' in mode:
+            raise AssertionError('ids.txt opened for rewrite')
+        return real_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', guarded_open)
+    with ResultStore(path) as s:
+        assert s.ids() == ['a']
+
+
+@pytest.mark.parametrize('collide', [False, True])
+def test_id_lookup_across_index_rebuilds(tmp_path, monkeypatch, collide):
+    monkeypatch.setattr(result_store, 'RECENT_IDS', 2)
+    if collide:
+        monkeypatch.setattr(result_store, '_id_hash', lambda doc_id: 7)
+    path = str(tmp_path / 'store')
+    ids = [f'scan/{n}.png' for n in range(10)]
+    with ResultStore(path) as s:
+        for n, doc_id in enumerate(ids):
+            s.append(doc_id, f'page {n}')
+            assert doc_id in s
+        with pytest.raises(ValueError):
+            s.append(ids[3], 'again')
+        assert 'scan/10.png' not in s
+    with ResultStore(path, readonly=True) as s:
+        assert len(s) == 10 and s.ids() == ids
+        assert [s.get_text(doc_id) for doc_id in ids] == [f'page {n}' for n in range(10)]
+        assert s.search('page 7') == ['scan/7.png']
+
+
+def test_reader_refresh_sees_new_pages(tmp_path):
+    path = str(tmp_path / 'store')
+    with ResultStore(path) as writer:
+        writer.append('a', 'first')
+        reader = ResultStore(path, readonly=True)
+        assert 'a' in reader
+        writer.append('b', 'second')
+        assert 'b' not in reader
+        reader.refresh()
+        assert reader.get_text('b') == 'second' and reader.ids() == ['a', 'b']
+        reader.close()
@@ -0,0 +1,52 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from OCR.shared_pages import PageRing, attach
+
+
+def _invert_into(page, output):
+    attach(output)[...] = 255 - attach(page)
+
+
+def test_put_and_view_round_trip_without_copying():
+    with PageRing(slots=2, slot_bytes=2000) as ring:
+        array = np.arange(600, dtype=np.uint16).reshape(20, 30)
+        handle = ring.put(array)
+        view = ring.view(handle)
+        np.testing.assert_array_equal(view, array)
+        view[0, 0] = 7
+        assert ring.view(handle)[0, 0] == 7
+
+
+def test_slots_are_handed_out_round_robin():
+    with PageRing(slots=3, slot_bytes=16) as ring:
+        first = ring.reserve((4,))
+        second = ring.reserve((4,))
+        ring.release(first)
+        assert ring.reserve((4,)).slot == 2
+        assert ring.reserve((4,)).slot == first.slot
+        assert ring.free_slots() == 0
+        with pytest.raises(BufferError):
+            ring.reserve((4,))
+        ring.release(second)
+        assert ring.free_slots() == 1
+
+
+def test_oversized_page_is_rejected():
+    with PageRing(slots=1, slot_bytes=16) as ring:
+        with pytest.raises(ValueError):
+            ring.reserve((5,), 'float32')
+        assert ring.free_slots() == 1
+
+
+def test_worker_process_reads_and_writes_slots():
+    with PageRing(slots=2, slot_bytes=4096) as ring:
+        page = ring.put(np.arange(3000, dtype=np.uint8).reshape(50, 60))
+        output = ring.reserve((50, 60))
+        process = multiprocessing.get_context('spawn').Process(target=_invert_into, args=(page, output))
+        process.start()
+        process.join(60)
+        assert process.exitcode == 0
+        np.testing.assert_array_equal(ring.view(output), 255 - ring.view(page))
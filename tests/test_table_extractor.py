@@ -0,0 +1,96 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+import pytesseract
+from PIL import Image, ImageDraw
+
+from OCR import table_extractor
+from OCR.table_extractor import _ocr_strip, detect_tables, extract_tables, table_to_csv
+from tests.conftest import make_data
+
+
+def ruled_table():
+    """
+    3x3 grid at (100, 100) with 200x80 cells; the top row's first two
+    cells are one (colspan) and the last column's lower two cells are one (rowspan).
+    """
+    page = Image.new('L', (800, 500), 255)
+    draw = ImageDraw.Draw(page)
+    xs, ys = [100, 300, 500, 700], [100, 180, 260, 340]
+    for y in ys:
+        draw.line([(xs[0], y), (xs[-1], y)], fill=0, width=3)
+    for x in xs:
+        draw.line([(x, ys[0]), (x, ys[-1])], fill=0, width=3)
+    draw.rectangle([xs[1] - 2, ys[0] + 3, xs[1] + 2, ys[1] - 3], fill=255)
+    draw.rectangle([xs[2] + 3, ys[2] - 2, xs[3] - 3, ys[2] + 2], fill=255)
+    return page
+
+
+def test_detect_tables_finds_grid_and_spans():
+    tables = detect_tables(ruled_table())
+    assert len(tables) == 1
+    table = tables[0]
+    assert (table['rows'], table['cols']) == (3, 3)
+    spans = {(c['row'], c['col']): (c['rowspan'], c['colspan']) for c in table['cells']}
+    assert spans == {(0, 0): (1, 2), (0, 2): (1, 1),
+                     (1, 0): (1, 1), (1, 1): (1, 1), (1, 2): (2, 1),
+                     (2, 0): (1, 1), (2, 1): (1, 1)}
+    tall = next(c for c in table['cells'] if c['rowspan'] == 2)
+    assert abs(tall['box'][3] - 160) <= 4
+
+
+def test_detect_tables_ignores_pages_without_rulings():
+    assert detect_tables(Image.new('L', (400, 300), 255)) == []
+
+
+def test_ocr_strip_assigns_words_to_their_crop(monkeypatch):
+    crops = [np.full((30, 80), 255, np.uint8), np.full((50, 60), 255, np.uint8)]
+    gap = 16
+    # Crop 0 spans rows 16-46 of the strip, crop 1 rows 62-112
+    data = make_data([('Total', 20, 20, 40, 20, 90, 1),
+                      ('due', 70, 20, 30, 20, 90, 1),
+                      ('12', 20, 66, 20, 18, 90, 2),
+                      ('items', 20, 88, 40, 18, 90, 3),
+                      ('', 0, 0, 0, 0, -1, 4)])
+    seen = {}
+
+    def fake_image_to_data(strip, **kwargs):
+        seen['shape'] = strip.shape
+        return data
+
+    monkeypatch.setattr(pytesseract, 'image_to_data', fake_image_to_data)
+    assert _ocr_strip(crops, 'eng', gap) == ['Total due', '12\nitems']
+    assert seen['shape'] == (30 + 50 + 3 * gap, 80 + 2 * gap)
+
+
+def test_extract_tables_fills_data_and_csv(monkeypatch):
+    page = ruled_table()
+    draw = ImageDraw.Draw(page)
+    for x, y in ((150, 130), (350, 210), (600, 250)):
+        draw.text((x, y), '42', fill=0)
+    calls = []
+
+    def fake_strip(crops, lang, gap):
+        calls.append(len(crops))
+        return [f'cell{i}' for i in range(len(crops))]
+
+    monkeypatch.setattr(table_extractor, '_ocr_strip', fake_strip)
+    table, = extract_tables(page, max_workers=1)
+    assert calls == [3]  # empty cells are never sent to Tesseract
+    assert table['data'] == [['cell0', '', ''], ['', 'cell1', 'cell2'], ['', '', '']]
+    assert list(csv.reader(io.StringIO(table_to_csv(table)))) == table['data']
+
+
+def test_word_table_merges_row_and_column_spans():
+    pytest.importorskip('docx')
+    from OCR.word_generator import WordDocumentGenerator
+
+    table = {'data': [['a', '', 'b'], ['c', 'd', 'e'], ['f', 'g', '']],
+             'cells': [{'row': 0, 'col': 0, 'colspan': 2, 'rowspan': 1},
+                       {'row': 1, 'col': 2, 'colspan': 1, 'rowspan': 2}]}
+    doc_table = WordDocumentGenerator().add_table(table)
+    assert doc_table.cell(0, 0)._tc is doc_table.cell(0, 1)._tc
+    assert doc_table.cell(1, 2)._tc is doc_table.cell(2, 2)._tc
+    assert doc_table.cell(1, 1)._tc is not doc_table.cell(2, 1)._tc
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from OCR import tuning
+from OCR.pipeline import PreprocessingPipeline
+from OCR.tuning import (config_stages, edit_distance, error_rates, expand_grid, fastest_at,
+                        pareto_frontier)
+
+
+def reference_distance(a, b):
+    row = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        previous, row[0] = row[0], i
+        for j, y in enumerate(b, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (x != y))
+    return row[-1]
+
+
+def test_edit_distance_matches_textbook_dp():
+    rng = random.Random(0)
+    for _ in range(200):
+        a = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 12)))
+        b = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 12)))
+        assert edit_distance(a, b) == reference_distance(a, b)
+    assert edit_distance(['the', 'cat'], ['the', 'hat', 'sat']) == 2
+
+
+def test_error_rates_ignore_line_breaks():
+    assert error_rates('the quick\nbrown fox', 'the quick brown fox') == (0.0, 0.0)
+    cer, wer = error_rates('the cat', 'the hat')
+    assert cer == pytest.approx(1 / 7) and wer == 0.5
+
+
+def test_every_grid_config_builds_a_valid_pipeline():
+    configs = expand_grid(tuning.DEFAULT_GRID)
+    assert len(configs) == 3 * 2 * 4 * 2 * 1 * 2
+    for config in configs:
+        PreprocessingPipeline(config_stages(config))
+    stages = config_stages({'resize_scale': 1.0, 'threshold_method': 'none', 'clahe_clip': 0, 'morph_kernel': 0})
+    assert stages == [{'op': 'grayscale'}]
+    with pytest.raises(ValueError):
+        config_stages({'threshold_method': 'median'})
+
+
+def test_pareto_frontier_and_fastest_at():
+    results = [{'name': 'slow-good', 'seconds': 3.0, 'cer': 0.01},
+               {'name': 'fast-bad', 'seconds': 0.5, 'cer': 0.20},
+               {'name': 'dominated', 'seconds': 2.0, 'cer': 0.25},
+               {'name': 'middle', 'seconds': 1.0, 'cer': 0.05}]
+    assert [r['name'] for r in pareto_frontier(results)] == ['fast-bad', 'middle', 'slow-good']
+    assert fastest_at(results, 0.05)['name'] == 'middle'
+    assert fastest_at(results, 0.001) is None
+
+
+def test_evaluate_scores_ocr_output_against_ground_truth(monkeypatch):
+    import OCR.text_extractor as text_extractor
+
+    truth = tuning._page(0, 'clean', 2, 20)[1]
+    seen = []
+    monkeypatch.setattr(text_extractor, 'extract_text',
+                        lambda image, **kwargs: seen.append(image.size) or truth.replace('\n', ' '))
+    cer, wer, seconds = tuning._evaluate({'resize_scale': 1.5, 'threshold_method': 'otsu'},
+                                         0, 'clean', 2, 20, 'eng')
+    assert (cer, wer) == (0.0, 0.0) and seconds > 0
+    page = tuning._page(0, 'clean', 2, 20)[0]
+    assert seen == [(int(page.shape[1] * 1.5), int(page.shape[0] * 1.5))]
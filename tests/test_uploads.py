@@ -0,0 +1,93 @@
+import io
+import os
+import time
+import zipfile
+
+import pytest
+from PIL import Image
+
+from OCR import uploads
+from OCR.uploads import run_batch, sweep_batch_zips
+
+OPTIONS = {'method': 'none', 'denoise': False, 'enhance': False, 'fixed_value': None,
+           'detect_formatting': False, 'table_mode': False, 'ensemble_variants': None,
+           'ensemble_budget': None, 'ensemble_merge': False}
+
+
+def upload(name, data=None):
+    """Stand-in for a Streamlit UploadedFile: a file object with a name."""
+    if data is None:
+        buf = io.BytesIO()
+        Image.new('RGB', (40, 20), 'white').save(buf, format='PNG')
+        data = buf.getvalue()
+    uploaded = io.BytesIO(data)
+    uploaded.name = name
+    return uploaded
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    monkeypatch.setattr(uploads, 'extract_text_with_confidence',
+                        lambda img: {'text': 'hello', 'average_confidence': 91.0})
+    monkeypatch.setattr(uploads, 'create_ocr_document_bytes', lambda content: b'docx')
+
+
+def run(files, options=OPTIONS):
+    updates = []
+    rows, zip_path = run_batch(files, options, 2, lambda rows: updates.append(len(rows)))
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            names = sorted(archive.namelist())
+            contents = {name: archive.read(name) for name in names}
+    finally:
+        os.remove(zip_path)
+    return rows, updates, names, contents
+
+
+def test_every_upload_gets_a_row_including_failures(fake_ocr):
+    rows, updates, names, _ = run([upload('a.png'), upload('broken.png', b'not an image'),
+                                   upload('b.png')])
+
+    assert sorted(row['file'] for row in rows) == ['a.png', 'b.png', 'broken.png']
+    by_file = {row['file']: row for row in rows}
+    assert by_file['a.png']['status'] == 'done'
+    assert by_file['a.png']['characters'] == 5
+    assert by_file['broken.png']['status'].startswith('failed: ')
+    assert updates == [1, 2, 3]
+    # The failed file has nothing in the ZIP
+    assert names == ['a.docx', 'a.json', 'a.txt', 'b.docx', 'b.json', 'b.txt']
+
+
+def test_duplicate_names_are_numbered_in_zip(fake_ocr):
+    rows, _, names, contents = run([upload('scan.png'), upload('scan.jpg'), upload('scan.png')])
+
+    assert len(rows) == 3
+    assert names == ['scan.docx', 'scan.json', 'scan.txt',
+                     'scan_2.docx', 'scan_2.json', 'scan_2.txt',
+                     'scan_3.docx', 'scan_3.json', 'scan_3.txt']
+    assert contents['scan_3.txt'] == b'hello'
+
+
+def test_table_mode_writes_one_csv_per_table(monkeypatch, fake_ocr):
+    monkeypatch.setattr(uploads, 'extract_tables', lambda img: ['first', 'second'])
+    monkeypatch.setattr(uploads, 'table_to_csv', lambda table: f'{table},1\n')
+
+    rows, _, names, contents = run([upload('form.png')], dict(OPTIONS, table_mode=True))
+
+    assert rows[0]['status'] == 'done'
+    assert names == ['form.docx', 'form.json', 'form.txt', 'form_table1.csv', 'form_table2.csv']
+    assert contents['form_table2.csv'] == b'second,1\n'
+    assert contents['form.txt'] == b'first,1\n\nsecond,1\n'
+
+
+def test_sweep_removes_only_stale_batch_zips(tmp_path):
+    stale, fresh, other = (tmp_path / name for name in ('ocr_batch_old.zip', 'ocr_batch_new.zip',
+                                                        'unrelated.zip'))
+    for path in (stale, fresh, other):
+        path.write_bytes(b'')
+    hours_ago = time.time() - 3 * 60 * 60
+    for path in (stale, other):
+        os.utime(path, (hours_ago, hours_ago))
+
+    assert sweep_batch_zips(directory=str(tmp_path)) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['ocr_batch_new.zip', 'unrelated.zip']
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from OCR import video
+from OCR.video import _merge_boxes, extract_video_text
+
+
+def frame(bottom_width=120):
+    image = np.full((200, 400, 3), 255, np.uint8)
+    image[20:40, 20:200] = 0
+    image[150:170, 20:20 + bottom_width] = 0
+    return image
+
+
+@pytest.fixture
+def ocr_calls(monkeypatch):
+    """Fake OCR: one word per dark band of the crop, named after the band's ink width."""
+    calls = []
+
+    def fake_extract(image, **kwargs):
+        gray = np.array(image.convert('L'))
+        calls.append(gray.shape)
+        rows = (gray < 128).any(axis=1)
+        words = []
+        top = None
+        for y, dark in enumerate(list(rows) + [False]):
+            if dark and top is None:
+                top = y
+            elif not dark and top is not None:
+                cols = np.flatnonzero((gray[top:y] < 128).any(axis=0))
+                words.append({'word': f'ink{cols.size}', 'confidence': 90, 'line': (1, 1, len(words) + 1),
+                              'box': (int(cols[0]), top, int(cols.size), y - top)})
+                top = None
+        return {'words_with_confidence': words}
+
+    monkeypatch.setattr(video, 'extract_text_with_confidence', fake_extract)
+    return calls
+
+
+def test_unchanged_frames_are_skipped_and_changes_reocr_only_their_region(ocr_calls):
+    frames = [frame(), frame(), frame(200), frame(200)]
+    events = extract_video_text(frames, sample_fps=None, fps=2.0)
+
+    assert [event['frame'] for event in events] == [0, 2]
+    assert events[0]['added'] == ['ink180', 'ink120'] and events[0]['removed'] == []
+    assert events[1]['added'] == ['ink200'] and events[1]['removed'] == ['ink120']
+    assert events[1]['text'] == 'ink180\nink200'
+    assert events[1]['time'] == 1.0
+
+    assert len(ocr_calls) == 2
+    assert ocr_calls[0] == (200, 400)
+    left, top, right, bottom = events[1]['regions'][0]
+    assert top > 40 and bottom - top < 100
+
+
+def test_scene_cut_reocrs_whole_frame(ocr_calls):
+    inverted = 255 - frame()
+    extract_video_text([frame(), inverted], sample_fps=None)
+    assert ocr_calls == [(200, 400), (200, 400)]
+
+
+def test_sampling_skips_frames_between_samples(ocr_calls):
+    frames = [frame(20 + 10 * i) for i in range(10)]
+    events = extract_video_text(frames, sample_fps=1.0, fps=5.0)
+    assert [event['frame'] for event in events] == [0, 5]
+
+
+def test_merge_boxes_joins_overlapping_boxes():
+    assert _merge_boxes([[0, 0, 10, 10], [5, 5, 20, 20], [30, 30, 40, 40]]) == \
+        [[0, 0, 20, 20], [30, 30, 40, 40]]
+    assert _merge_boxes([[0, 0, 10, 10], [10, 0, 20, 10]]) == [[0, 0, 10, 10], [10, 0, 20, 10]]